@@ -1,10 +1,22 @@
+import asyncio
+import json
 import os
+import threading
 import time
-from typing import Any, Dict, List
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
 
-import requests
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+import metrics
+from chat_sessions import CHAT_SESSION_MAX_TOKENS, CHAT_SESSION_SUMMARIZE, ChatSessionState, session_store
+from http_pool import get_async_client, get_pool_status
+import rate_limit
+import scheduler
+from provider_router import ROUTE_EVENTS, provider_router
+from response_cache import cache_key, response_cache
+from scheduler import Overloaded
+from singleflight import SingleFlight
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -29,8 +41,87 @@ MODELS = {
     },
 }
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+OPENROUTER_FALLBACK_MODELS = [
+    "google/gemini-2.0-flash-lite-preview-02-05:free",
+    "google/gemini-flash-1.5",
+    "google/gemini-pro",
+    "mistralai/mistral-7b-instruct:free",
+    "openai/gpt-3.5-turbo",
+]
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY") or 8)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS") or 100)
+
+generate_flight = SingleFlight(wait_timeout=float(os.getenv("SINGLEFLIGHT_WAIT_TIMEOUT") or 120))
+
+UPSTREAM_SECONDS = metrics.histogram(
+    "ai_upstream_request_seconds", "Latency of upstream LLM calls.", ("provider", "model", "outcome")
+)
+TOKENS = metrics.counter("ai_tokens_total", "Tokens reported in provider usage fields.", ("provider", "model", "kind"))
+
+# GEMINI_API_ENDPOINT points the SDK at a local mock for load tests. Plain HTTP needs the REST
+# transport, which google-generativeai only implements for its sync calls.
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP") == "1"
+
+_genai_module: Any = None
+_genai_lock = threading.Lock()
+_gemini_models: Dict[str, Any] = {}
+warmup_state: Dict[str, Any] = {"enabled": WARMUP_ON_STARTUP, "done": False, "seconds": None, "error": None}
+
+
+def _genai() -> Any:
+    """google.generativeai, imported and configured on first use.
+
+    The SDK is most of this service's import time, and OpenRouter-only
+    deployments never need it.
+    """
+    global _genai_module
+    if _genai_module is None:
+        with _genai_lock:
+            if _genai_module is None:
+                import google.generativeai as genai
+
+                if GEMINI_API_ENDPOINT:
+                    genai.configure(
+                        api_key=GEMINI_API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT}
+                    )
+                else:
+                    genai.configure(api_key=GEMINI_API_KEY)
+                _genai_module = genai
+    return _genai_module
+
+
+def _gemini_model(model_name: str) -> Any:
+    model = _gemini_models.get(model_name)
+    if model is None:
+        model = _gemini_models.setdefault(model_name, _genai().GenerativeModel(model_name=model_name))
+    return model
+
+
+def warm_up() -> None:
+    """Pay the lazy initialization cost before the first request does. Blocking; run it in a thread."""
+    started = time.perf_counter()
+    try:
+        if GEMINI_API_KEY:
+            _gemini_model(MODELS["gemini"]["default"])
+            from google.generativeai import client as genai_client
+
+            genai_client.get_default_generative_client()
+        if OPENROUTER_API_KEY:
+            get_async_client("openrouter")
+    except Exception as exc:
+        # Requests still initialize lazily; readiness only reports the failure.
+        warmup_state["error"] = str(exc)
+    finally:
+        warmup_state["seconds"] = round(time.perf_counter() - started, 3)
+        warmup_state["done"] = True
+
+
+def get_readiness() -> Dict[str, Any]:
+    ready = warmup_state["done"] or not WARMUP_ON_STARTUP
+    return {"ready": ready, "warmup": dict(warmup_state), "geminiLoaded": _genai_module is not None}
 
 
 def _normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
@@ -45,34 +136,31 @@ def _normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
     return normalized
 
 
-def generate_with_openrouter(prompt: str, options: Dict[str, Any] | None = None) -> Dict[str, Any]:
-    options = options or {}
-    model = options.get("model") or MODELS["openrouter"]["default"]
-    max_tokens = options.get("maxTokens", 4096)
+def _openrouter_headers(title: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "https://gyan-ai.com",
+        "X-Title": title,
+    }
 
-    if not OPENROUTER_API_KEY:
-        raise RuntimeError("OpenRouter API key not configured")
 
-    response = requests.post(
-        "https://openrouter.ai/api/v1/chat/completions",
-        headers={
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://gyan-ai.com",
-            "X-Title": "GYAN AI",
-        },
-        json={
-            "model": model,
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": max_tokens,
-        },
-        timeout=60,
-    )
-    if not response.ok:
-        detail = response.json().get("error", {}).get("message", response.text)
-        raise RuntimeError(f"OpenRouter Error: {detail}")
+def _openrouter_payload(messages: List[Dict[str, str]], options: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "model": options.get("model") or MODELS["openrouter"]["default"],
+        "messages": messages,
+        "max_tokens": options.get("maxTokens", 4096),
+    }
+
+
+def _openrouter_error_detail(response: Any) -> str:
+    try:
+        return response.json().get("error", {}).get("message", response.text)
+    except ValueError:
+        return response.text
+
 
-    data = response.json()
+def _openrouter_result(data: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "text": data.get("choices", [{}])[0].get("message", {}).get("content", ""),
         "model": data.get("model"),
@@ -81,12 +169,7 @@ def generate_with_openrouter(prompt: str, options: Dict[str, Any] | None = None)
     }
 
 
-def generate_with_gemini(prompt: str, options: Dict[str, Any] | None = None) -> Dict[str, Any]:
-    options = options or {}
-    if not GEMINI_API_KEY:
-        raise RuntimeError("Gemini API key not configured")
-
-    model_name = options.get("model") or MODELS["gemini"]["default"]
+def _gemini_generation_config(options: Dict[str, Any]) -> Dict[str, Any] | None:
     generation_config: Dict[str, Any] = {}
     if "temperature" in options:
         generation_config["temperature"] = options["temperature"]
@@ -94,115 +177,222 @@ def generate_with_gemini(prompt: str, options: Dict[str, Any] | None = None) ->
         generation_config["max_output_tokens"] = options["maxTokens"]
     if options.get("json"):
         generation_config["response_mime_type"] = "application/json"
+    return generation_config or None
+
+
+def _gemini_history(messages: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], str]:
+    history = []
+    for msg in messages[:-1]:
+        role = "model" if msg.get("role") in ("ai", "model") else "user"
+        text = msg.get("text") or msg.get("content") or ""
+        history.append({"role": role, "parts": [text]})
+
+    last_message = messages[-1] if messages else {"text": ""}
+    last_text = last_message.get("text") or last_message.get("content") or ""
+    return history, last_text
+
+
+async def generate_with_openrouter_async(prompt: str, options: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    options = options or {}
+    if not OPENROUTER_API_KEY:
+        raise RuntimeError("OpenRouter API key not configured")
+
+    response = await get_async_client("openrouter").post(
+        "/chat/completions",
+        headers=_openrouter_headers("GYAN AI"),
+        json=_openrouter_payload([{"role": "user", "content": prompt}], options),
+    )
+    if not response.is_success:
+        raise RuntimeError(f"OpenRouter Error: {_openrouter_error_detail(response)}")
+    return _openrouter_result(response.json())
 
-    model = genai.GenerativeModel(model_name=model_name)
-    response = model.generate_content(
+
+async def generate_with_gemini_async(prompt: str, options: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    options = options or {}
+    if not GEMINI_API_KEY:
+        raise RuntimeError("Gemini API key not configured")
+
+    model_name = options.get("model") or MODELS["gemini"]["default"]
+    model = _gemini_model(model_name)
+    response = await model.generate_content_async(
         prompt,
-        generation_config=generation_config if generation_config else None,
+        generation_config=_gemini_generation_config(options),
     )
     return {
         "text": response.text,
         "model": model_name,
         "provider": "gemini",
+        "usage": _gemini_usage(getattr(response, "usage_metadata", None)),
     }
 
 
-def chat_with_openrouter(messages: List[Dict[str, Any]], options: Dict[str, Any] | None = None) -> Dict[str, Any]:
+async def chat_with_openrouter_async(messages: List[Dict[str, Any]], options: Dict[str, Any] | None = None) -> Dict[str, Any]:
     options = options or {}
-    model = options.get("model") or MODELS["openrouter"]["default"]
-    max_tokens = options.get("maxTokens", 4096)
-
-    response = requests.post(
-        "https://openrouter.ai/api/v1/chat/completions",
-        headers={
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://gyan-ai.com",
-            "X-Title": "GYAN AI Chat",
-        },
-        json={
-            "model": model,
-            "messages": _normalize_messages(messages),
-            "max_tokens": max_tokens,
-        },
-        timeout=60,
+    async with _slot("openrouter", options):
+        return await _post_openrouter_chat_async(_normalize_messages(messages), options)
+
+
+async def _post_openrouter_chat_async(messages: List[Dict[str, str]], options: Dict[str, Any]) -> Dict[str, Any]:
+    response = await get_async_client("openrouter").post(
+        "/chat/completions",
+        headers=_openrouter_headers("GYAN AI Chat"),
+        json=_openrouter_payload(messages, options),
     )
-    if not response.ok:
-        detail = response.json().get("error", {}).get("message", response.text)
-        raise RuntimeError(f"OpenRouter Chat Error: {detail}")
+    if not response.is_success:
+        raise RuntimeError(f"OpenRouter Chat Error: {_openrouter_error_detail(response)}")
+    return _openrouter_result(response.json())
 
-    data = response.json()
-    return {
-        "text": data.get("choices", [{}])[0].get("message", {}).get("content", ""),
-        "model": data.get("model"),
-        "usage": data.get("usage"),
-        "provider": "openrouter",
-    }
 
+async def generate_async(prompt: str, options: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """Cached entry point for /generate.
 
-def generate(prompt: str, options: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    Pass ``"cache": False`` to bypass the cache or ``"refreshCache": True`` to
+    regenerate and overwrite the stored response.
+    """
     options = options or {}
-    requested_provider = (options.get("provider") or AI_PROVIDER or "gemini").lower()
+    cached = await response_cache.aget(prompt, options)
+    if cached is not None:
+        return cached
+
+    if not response_cache.cacheable(options):
+        return {**await _generate_uncached_async(prompt, options), "cached": False}
+
+    # Identical concurrent prompts (a whole class opening the same assignment) share one upstream call.
+    # Only calls of the same priority share one, so a standard call never waits in a bulk leader's queue.
+    priority = scheduler.normalize_priority(options.get("priority"))
+    result = await generate_flight.do(
+        f"{priority}\0{cache_key(prompt, options)}",
+        lambda: _generate_and_store(prompt, options),
+    )
+    return {**result, "cached": False}
+
+
+async def _generate_batch_item(
+    index: int, item: Dict[str, Any], defaults: Dict[str, Any], semaphore: asyncio.Semaphore
+) -> Dict[str, Any]:
+    async with semaphore:
+        try:
+            result = await generate_async(item["prompt"], {**defaults, **(item.get("options") or {})})
+            return {"index": index, "ok": True, **result}
+        except Overloaded as error:
+            return {"index": index, "ok": False, "error": str(error), "retryAfter": error.retry_after}
+        except Exception as error:
+            return {"index": index, "ok": False, "error": str(error)}
+
+
+def _batch_tasks(
+    items: List[Dict[str, Any]], options: Dict[str, Any] | None, concurrency: int | None
+) -> List[asyncio.Task]:
+    if len(items) > BATCH_MAX_ITEMS:
+        raise ValueError(f"Batch too large: {len(items)} items (max {BATCH_MAX_ITEMS})")
+    semaphore = asyncio.Semaphore(max(1, min(concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)))
+    return [
+        asyncio.ensure_future(_generate_batch_item(index, item, options or {}, semaphore))
+        for index, item in enumerate(items)
+    ]
+
 
+async def generate_batch(
+    items: List[Dict[str, Any]], options: Dict[str, Any] | None = None, concurrency: int | None = None
+) -> List[Dict[str, Any]]:
+    """Generate many prompts concurrently; results come back in input order with per-item errors."""
+    return list(await asyncio.gather(*_batch_tasks(items, options, concurrency)))
+
+
+async def generate_batch_stream(
+    items: List[Dict[str, Any]], options: Dict[str, Any] | None = None, concurrency: int | None = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Like generate_batch, but yields each item as soon as it finishes."""
+    tasks = _batch_tasks(items, options, concurrency)
+    failed = 0
     try:
-        if requested_provider == "openrouter" and OPENROUTER_API_KEY:
-            return generate_with_openrouter(prompt, options)
-        if requested_provider == "gemini" and GEMINI_API_KEY:
-            return generate_with_gemini(prompt, options)
-        if OPENROUTER_API_KEY:
-            return generate_with_openrouter(prompt, options)
-        if GEMINI_API_KEY:
-            return generate_with_gemini(prompt, options)
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            failed += 0 if result["ok"] else 1
+            yield {"type": "item", **result}
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield {"type": "done", "count": len(tasks), "failed": failed}
+
+
+async def _generate_and_store(prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    result = await _generate_uncached_async(prompt, options)
+    await response_cache.aset(prompt, options, result)
+    return result
+
+
+def record_usage(provider: str, model: str, usage: Dict[str, Any] | None) -> None:
+    for kind in ("prompt", "completion"):
+        count = (usage or {}).get(f"{kind}_tokens")
+        if count:
+            TOKENS.inc(count, provider=provider, model=model, kind=kind)
+
+
+@asynccontextmanager
+async def _slot(provider: str, options: Dict[str, Any]) -> AsyncIterator[None]:
+    """Admission for one upstream call, by the ``priority`` and ``tenant`` the endpoint put in options.
+
+    Every async call to a provider goes through here, so this is also where
+    it takes a token from the provider's rate limit.
+    """
+    async with scheduler.slot(provider, options.get("priority"), options.get("tenant")):
+        await rate_limit.acquire(provider)
+        yield
+
+
+async def _call_provider_async(provider: str, options: Dict[str, Any], prompt: str) -> Dict[str, Any]:
+    async with _slot(provider, options):
+        model = options.get("model") or MODELS[provider]["default"]
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            if provider == "gemini":
+                result = await generate_with_gemini_async(prompt, options)
+            else:
+                result = await generate_with_openrouter_async(prompt, options)
+            outcome = "ok"
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - started, provider=provider, model=model, outcome=outcome)
+    record_usage(provider, result.get("model") or model, result.get("usage"))
+    return result
+
+
+async def _generate_uncached_async(prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    candidates = _generate_candidates(options)
+    if not candidates:
         raise RuntimeError("No AI provider configured. Set OPENROUTER_API_KEY or GEMINI_API_KEY")
-    except Exception as error:
-        primary_error = str(error)
-        if requested_provider == "gemini" and ("503" in primary_error or "overloaded" in primary_error.lower()):
-            time.sleep(2)
-            try:
-                return generate_with_gemini(prompt, options)
-            except Exception:
-                pass
-
-        if requested_provider == "openrouter" and GEMINI_API_KEY:
-            return generate_with_gemini(prompt, {**options, "model": MODELS["gemini"]["default"]})
-
-        if requested_provider == "gemini" and OPENROUTER_API_KEY:
-            for model in [
-                "google/gemini-2.0-flash-lite-preview-02-05:free",
-                "google/gemini-flash-1.5",
-                "google/gemini-pro",
-                "mistralai/mistral-7b-instruct:free",
-                "openai/gpt-3.5-turbo",
-            ]:
-                try:
-                    return generate_with_openrouter(prompt, {**options, "model": model})
-                except Exception:
-                    continue
 
-        raise RuntimeError(f"Primary AI ({requested_provider}) failed: {primary_error}")
+    requested_provider = candidates[0][0]
+    try:
+        return await provider_router.route(
+            candidates,
+            lambda provider, attempt_options: _call_provider_async(provider, attempt_options, prompt),
+            deadline=options.get("deadline"),
+            hedge=options.get("hedge"),
+            pin_first=bool(options.get("provider") or options.get("model")),
+        )
+    except Overloaded:
+        raise
+    except Exception as error:
+        raise RuntimeError(f"Primary AI ({requested_provider}) failed: {error}") from error
 
 
-def chat(messages: List[Dict[str, Any]], options: Dict[str, Any] | None = None) -> Dict[str, Any]:
+async def chat_async(messages: List[Dict[str, Any]], options: Dict[str, Any] | None = None) -> Dict[str, Any]:
     options = options or {}
-    preferred_provider = (options.get("provider") or AI_PROVIDER).lower()
 
-    if preferred_provider == "openrouter" and OPENROUTER_API_KEY:
-        return chat_with_openrouter(messages, options)
     if OPENROUTER_API_KEY:
-        return chat_with_openrouter(messages, options)
+        return await chat_with_openrouter_async(messages, options)
 
     if GEMINI_API_KEY:
-        gemini_model = genai.GenerativeModel(model_name=MODELS["gemini"]["default"])
-        history = []
-        for msg in messages[:-1]:
-            role = "model" if msg.get("role") in ("ai", "model") else "user"
-            text = msg.get("text") or msg.get("content") or ""
-            history.append({"role": role, "parts": [text]})
-
-        last_message = messages[-1] if messages else {"text": ""}
-        last_text = last_message.get("text") or last_message.get("content") or ""
+        gemini_model = _gemini_model(MODELS["gemini"]["default"])
+        history, last_text = _gemini_history(messages)
         chat_session = gemini_model.start_chat(history=history)
-        response = chat_session.send_message(last_text)
+        async with _slot("gemini", options):
+            response = await chat_session.send_message_async(last_text)
         return {
             "text": response.text,
             "model": MODELS["gemini"]["default"],
@@ -212,18 +402,297 @@ def chat(messages: List[Dict[str, Any]], options: Dict[str, Any] | None = None)
     raise RuntimeError("No AI provider configured")
 
 
-def get_available_models() -> List[Dict[str, Any]]:
+def _gemini_usage(usage_metadata: Any) -> Dict[str, int] | None:
+    if usage_metadata is None:
+        return None
+    return {
+        "prompt_tokens": getattr(usage_metadata, "prompt_token_count", 0),
+        "completion_tokens": getattr(usage_metadata, "candidates_token_count", 0),
+        "total_tokens": getattr(usage_metadata, "total_token_count", 0),
+    }
+
+
+async def _stream_openrouter(
+    messages: List[Dict[str, str]], options: Dict[str, Any], title: str
+) -> AsyncIterator[Dict[str, Any]]:
     if not OPENROUTER_API_KEY:
-        return []
+        raise RuntimeError("OpenRouter API key not configured")
 
-    response = requests.get(
-        "https://openrouter.ai/api/v1/models",
-        headers={"Authorization": f"Bearer {OPENROUTER_API_KEY}"},
-        timeout=30,
+    payload = {**_openrouter_payload(messages, options), "stream": True, "stream_options": {"include_usage": True}}
+    summary: Dict[str, Any] = {"type": "done", "model": payload["model"], "provider": "openrouter", "usage": None}
+    async with get_async_client("openrouter").stream(
+        "POST", "/chat/completions", headers=_openrouter_headers(title), json=payload
+    ) as response:
+        if not response.is_success:
+            await response.aread()
+            raise RuntimeError(f"OpenRouter Error: {_openrouter_error_detail(response)}")
+        async for line in response.aiter_lines():
+            # SSE comments (": OPENROUTER PROCESSING") and blank keep-alives carry no data.
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            if chunk.get("error"):
+                raise RuntimeError(f"OpenRouter Error: {chunk['error'].get('message', chunk['error'])}")
+            summary["model"] = chunk.get("model") or summary["model"]
+            if chunk.get("usage"):
+                summary["usage"] = chunk["usage"]
+            for choice in chunk.get("choices") or []:
+                text = (choice.get("delta") or {}).get("content")
+                if text:
+                    yield {"type": "token", "text": text}
+    yield summary
+
+
+async def _stream_gemini_response(response: Any, model_name: str) -> AsyncIterator[Dict[str, Any]]:
+    usage = None
+    async for chunk in response:
+        if chunk.usage_metadata:
+            usage = _gemini_usage(chunk.usage_metadata)
+        if chunk.parts:
+            yield {"type": "token", "text": chunk.text}
+    yield {"type": "done", "model": model_name, "provider": "gemini", "usage": usage}
+
+
+async def stream_with_gemini(prompt: str, options: Dict[str, Any] | None = None) -> AsyncIterator[Dict[str, Any]]:
+    options = options or {}
+    if not GEMINI_API_KEY:
+        raise RuntimeError("Gemini API key not configured")
+
+    model_name = options.get("model") or MODELS["gemini"]["default"]
+    model = _gemini_model(model_name)
+    response = await model.generate_content_async(
+        prompt,
+        generation_config=_gemini_generation_config(options),
+        stream=True,
     )
-    if not response.ok:
-        return []
-    data = response.json().get("data", [])
+    async for event in _stream_gemini_response(response, model_name):
+        yield event
+
+
+async def stream_with_openrouter(prompt: str, options: Dict[str, Any] | None = None) -> AsyncIterator[Dict[str, Any]]:
+    async for event in _stream_openrouter([{"role": "user", "content": prompt}], options or {}, "GYAN AI"):
+        yield event
+
+
+def _generate_candidates(options: Dict[str, Any]) -> List[tuple[str, Dict[str, Any]]]:
+    """Provider attempts in the same order generate() walks them."""
+    requested_provider = (options.get("provider") or AI_PROVIDER or "gemini").lower()
+    candidates: List[tuple[str, Dict[str, Any]]] = []
+    if requested_provider == "openrouter" and OPENROUTER_API_KEY:
+        candidates.append(("openrouter", options))
+    elif requested_provider == "gemini" and GEMINI_API_KEY:
+        candidates.append(("gemini", options))
+    elif OPENROUTER_API_KEY:
+        candidates.append(("openrouter", options))
+    elif GEMINI_API_KEY:
+        candidates.append(("gemini", options))
+
+    if requested_provider == "openrouter" and GEMINI_API_KEY:
+        candidates.append(("gemini", {**options, "model": MODELS["gemini"]["default"]}))
+    if requested_provider == "gemini" and OPENROUTER_API_KEY:
+        candidates.extend(("openrouter", {**options, "model": model}) for model in OPENROUTER_FALLBACK_MODELS)
+    return candidates
+
+
+async def generate_stream(prompt: str, options: Dict[str, Any] | None = None) -> AsyncIterator[Dict[str, Any]]:
+    """Stream a completion as token events followed by a single done event.
+
+    Falls back to the next provider only while nothing has been emitted yet;
+    once tokens have reached the client a failure is surfaced as-is.
+    """
+    options = options or {}
+    candidates = _generate_candidates(options)
+    if not candidates:
+        raise RuntimeError("No AI provider configured. Set OPENROUTER_API_KEY or GEMINI_API_KEY")
+
+    primary_error = None
+    overloaded = []
+    for provider, attempt_options in candidates:
+        streamer = stream_with_gemini if provider == "gemini" else stream_with_openrouter
+        emitted = False
+        model = attempt_options.get("model") or MODELS[provider]["default"]
+        try:
+            async with _slot(provider, attempt_options):
+                started = time.perf_counter()
+                try:
+                    async for event in streamer(prompt, attempt_options):
+                        emitted = True
+                        if event["type"] == "done":
+                            UPSTREAM_SECONDS.observe(
+                                time.perf_counter() - started, provider=provider, model=model, outcome="ok"
+                            )
+                            record_usage(provider, event.get("model") or model, event.get("usage"))
+                        yield event
+                except Exception:
+                    UPSTREAM_SECONDS.observe(time.perf_counter() - started, provider=provider, model=model, outcome="error")
+                    raise
+            return
+        except Overloaded as error:
+            overloaded.append(error)
+        except Exception as error:
+            if emitted:
+                raise
+            ROUTE_EVENTS.inc(event="stream_fallback")
+            primary_error = primary_error or str(error)
+
+    if overloaded and primary_error is None:
+        raise overloaded[0]
+    requested_provider = candidates[0][0]
+    raise RuntimeError(f"Primary AI ({requested_provider}) failed: {primary_error}")
+
+
+async def chat_stream(messages: List[Dict[str, Any]], options: Dict[str, Any] | None = None) -> AsyncIterator[Dict[str, Any]]:
+    options = options or {}
+
+    if OPENROUTER_API_KEY:
+        async with _slot("openrouter", options):
+            async for event in _stream_openrouter(_normalize_messages(messages), options, "GYAN AI Chat"):
+                yield event
+        return
+
+    if GEMINI_API_KEY:
+        model_name = MODELS["gemini"]["default"]
+        gemini_model = _gemini_model(model_name)
+        history, last_text = _gemini_history(messages)
+        chat_session = gemini_model.start_chat(history=history)
+        async with _slot("gemini", options):
+            response = await chat_session.send_message_async(last_text, stream=True)
+            async for event in _stream_gemini_response(response, model_name):
+                yield event
+        return
+
+    raise RuntimeError("No AI provider configured")
+
+
+def _session_openrouter_messages(state: ChatSessionState) -> List[Dict[str, str]]:
+    if not state.summary:
+        return state.messages
+    return [{"role": "system", "content": f"Summary of the earlier conversation: {state.summary}"}] + state.messages
+
+
+def _session_gemini_chat(state: ChatSessionState) -> Any:
+    """Live Gemini ChatSession for everything but the newest user turn, rebuilt only when missing."""
+    if state.gemini is None:
+        history = []
+        if state.summary:
+            history.append({"role": "user", "parts": [f"Summary of our earlier conversation: {state.summary}"]})
+            history.append({"role": "model", "parts": ["Understood."]})
+        for msg in state.messages[:-1]:
+            role = "model" if msg["role"] == "assistant" else "user"
+            history.append({"role": role, "parts": [msg["content"]]})
+        model = _gemini_model(MODELS["gemini"]["default"])
+        state.gemini = model.start_chat(history=history)
+    return state.gemini
+
+
+def open_chat_session(session_id: str | None) -> ChatSessionState:
+    """The stored session, or a new one when ``session_id`` is empty; ``KeyError`` if it is unknown or expired."""
+    if session_id:
+        state = session_store.get(session_id)
+        if state is None:
+            raise KeyError(session_id)
+        return state
+    provider = "openrouter" if OPENROUTER_API_KEY else "gemini" if GEMINI_API_KEY else None
+    if provider is None:
+        raise RuntimeError("No AI provider configured")
+    return session_store.create(provider)
+
+
+async def _add_session_turn(
+    state: ChatSessionState, messages: List[Dict[str, Any]], options: Dict[str, Any]
+) -> None:
+    new_messages = _normalize_messages(messages)
+    if len(new_messages) > 1:
+        # More than one new turn cannot be replayed through send_message; rebuild lazily instead.
+        state.gemini = None
+    for msg in new_messages:
+        state.append(msg)
+
+    dropped = state.trim(CHAT_SESSION_MAX_TOKENS)
+    if dropped:
+        session_store.stats["trimmed"] += 1
+        if CHAT_SESSION_SUMMARIZE:
+            transcript = "\n".join(f"{m['role']}: {m['content']}" for m in dropped)
+            previous = f"Earlier summary: {state.summary}\n" if state.summary else ""
+            summary = await generate_async(
+                f"{previous}Summarize this tutoring conversation in a few sentences, keeping what the "
+                f"student has learned and struggled with:\n{transcript}",
+                # Same admission as the turn it belongs to, so it is queued and billed alike.
+                {"maxTokens": 300, "cache": False,
+                 **{name: options[name] for name in ("priority", "tenant") if name in options}},
+            )
+            state.summary = summary["text"]
+
+
+def _session_last_text(state: ChatSessionState) -> str:
+    return state.messages[-1]["content"] if state.messages else ""
+
+
+async def chat_session_turn(
+    session_id: str | None, messages: List[Dict[str, Any]], options: Dict[str, Any] | None = None
+) -> Dict[str, Any]:
+    """Run one turn of a server-side chat session.
+
+    ``messages`` holds only the new turn(s). Raises ``KeyError`` when
+    ``session_id`` is unknown or expired so the client can resend its history.
+    """
+    options = options or {}
+    state = open_chat_session(session_id)
+    async with state.lock:
+        snapshot = state.snapshot()
+        try:
+            await _add_session_turn(state, messages, options)
+            async with _slot(state.provider, options):
+                if state.provider == "openrouter":
+                    result = await _post_openrouter_chat_async(_session_openrouter_messages(state), options)
+                else:
+                    response = await _session_gemini_chat(state).send_message_async(_session_last_text(state))
+                    result = {
+                        "text": response.text,
+                        "model": MODELS["gemini"]["default"],
+                        "provider": "gemini",
+                    }
+        except BaseException:
+            state.restore(snapshot)
+            raise
+        state.append({"role": "assistant", "content": result["text"]})
+    return {**result, "sessionId": state.id}
+
+
+async def chat_session_stream(
+    state: ChatSessionState, messages: List[Dict[str, Any]], options: Dict[str, Any] | None = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Stream one turn of a session the caller has already opened with ``open_chat_session``."""
+    options = options or {}
+    async with state.lock:
+        snapshot = state.snapshot()
+        parts = []
+        try:
+            await _add_session_turn(state, messages, options)
+            async with _slot(state.provider, options):
+                if state.provider == "openrouter":
+                    events = _stream_openrouter(_session_openrouter_messages(state), options, "GYAN AI Chat")
+                else:
+                    response = await _session_gemini_chat(state).send_message_async(
+                        _session_last_text(state), stream=True
+                    )
+                    events = _stream_gemini_response(response, MODELS["gemini"]["default"])
+                async for event in events:
+                    if event["type"] == "token":
+                        parts.append(event["text"])
+                    else:
+                        event = {**event, "sessionId": state.id}
+                    yield event
+        except BaseException:
+            state.restore(snapshot)
+            raise
+        state.append({"role": "assistant", "content": "".join(parts)})
+
+
+def _models_result(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return [
         {
             "id": m.get("id"),
@@ -235,6 +704,20 @@ def get_available_models() -> List[Dict[str, Any]]:
     ]
 
 
+async def get_available_models_async() -> List[Dict[str, Any]]:
+    if not OPENROUTER_API_KEY:
+        return []
+
+    response = await get_async_client("openrouter").get(
+        "/models",
+        headers={"Authorization": f"Bearer {OPENROUTER_API_KEY}"},
+        timeout=30,
+    )
+    if not response.is_success:
+        return []
+    return _models_result(response.json().get("data", []))
+
+
 def get_status() -> Dict[str, Any]:
     return {
         "provider": AI_PROVIDER,
@@ -246,4 +729,12 @@ def get_status() -> Dict[str, Any]:
             "configured": bool(GEMINI_API_KEY),
             "defaultModel": MODELS["gemini"]["default"],
         },
+        "connectionPool": get_pool_status(),
+        "cache": response_cache.get_status(),
+        "coalescing": generate_flight.get_status(),
+        "routing": provider_router.get_status(),
+        "chatSessions": session_store.get_status(),
+        "rateLimits": rate_limit.get_status(),
+        "scheduler": scheduler.get_status(),
+        "startup": get_readiness(),
     }
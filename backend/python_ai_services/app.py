@@ -1,23 +1,101 @@
-from typing import Any, Dict, List
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, WebSocket
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
-from ai_service import chat, generate, get_status
-from gemini_socket_proxy import proxy_gemini_stream
+from ai_service import (
+    BATCH_MAX_ITEMS,
+    WARMUP_ON_STARTUP,
+    chat_async,
+    chat_session_stream,
+    chat_session_turn,
+    chat_stream,
+    generate_async,
+    generate_batch,
+    generate_batch_stream,
+    generate_stream,
+    get_available_models_async,
+    get_readiness,
+    get_status,
+    open_chat_session,
+    warm_up,
+)
+from chat_sessions import session_store
+from gemini_socket_proxy import (
+    close_upstream_pool,
+    proxy_gemini_stream,
+    session_limiter,
+    start_upstream_pool,
+    upstream_pool,
+)
+from http_pool import close_clients
+import metrics
+from scheduler import PRIORITIES, Overloaded
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    await start_upstream_pool()
+    # Startup itself stays fast; the warm-up runs in the background and /ready reports when it is done.
+    warmup = asyncio.create_task(asyncio.to_thread(warm_up)) if WARMUP_ON_STARTUP else None
+    yield
+    if warmup:
+        warmup.cancel()
+    await close_upstream_pool()
+    await close_clients()
+
+
+app = FastAPI(title="GYAN Backend AI Services (Python)", version="1.0.0", lifespan=lifespan)
 
 
-app = FastAPI(title="GYAN Backend AI Services (Python)", version="1.0.0")
+class GenerateRequest(BaseModel):
+    prompt: str
+    options: Dict[str, Any] = Field(default_factory=dict)
 
 
-class GenerateRequest(BaseModel):
+class BatchItem(BaseModel):
     prompt: str
     options: Dict[str, Any] = Field(default_factory=dict)
 
 
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    # Shared defaults; each item's own options win.
+    options: Dict[str, Any] = Field(default_factory=dict)
+    concurrency: Optional[int] = None
+    stream: bool = False
+
+
 class ChatRequest(BaseModel):
     messages: List[Dict[str, Any]]
     options: Dict[str, Any] = Field(default_factory=dict)
+    # Server-side sessions: start one with session=true, then send only new turns with sessionId.
+    session: bool = False
+    sessionId: Optional[str] = None
+
+    @property
+    def uses_session(self) -> bool:
+        return self.session or bool(self.sessionId)
+
+
+SESSION_EXPIRED = "Chat session not found or expired; resend the full history with session=true"
+
+
+def _with_admission(options: Dict[str, Any], priority: str, tenant: Optional[str]) -> Dict[str, Any]:
+    """Endpoint priority and the X-Tenant-Id tenant; ``options`` may only lower the priority."""
+    requested = options.get("priority")
+    if requested in PRIORITIES and PRIORITIES.index(requested) > PRIORITIES.index(priority):
+        priority = requested
+    return {**options, "priority": priority, "tenant": tenant}
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(_request: Request, exc: Overloaded):
+    return JSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": str(exc.retry_after)})
 
 
 @app.get("/health")
@@ -25,25 +103,133 @@ def health():
     return {"status": "ok", "service": "python-ai-services"}
 
 
+@app.get("/ready")
+def ready():
+    """Readiness for load balancers; unlike /health it is 503 until the opt-in warm-up finishes."""
+    readiness = get_readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+
 @app.get("/status")
 def status():
-    return get_status()
+    return {**get_status(), "voiceProxy": {**upstream_pool.get_status(), "relay": session_limiter.get_status()}}
+
+
+@app.get("/models")
+async def models_endpoint():
+    """OpenRouter models available to this key; empty when OpenRouter is not configured or unreachable."""
+    return {"models": await get_available_models_async()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def profile_endpoint(seconds: float = 5.0, interval: float = 0.005):
+    """Collapsed stacks from a short sampling run; only with PROFILER_ENABLED=1."""
+    if not metrics.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler disabled; set PROFILER_ENABLED=1")
+    stacks = await asyncio.to_thread(metrics.sample_profile, seconds, interval)
+    if stacks is None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return stacks
 
 
 @app.post("/generate")
-def generate_endpoint(body: GenerateRequest):
+async def generate_endpoint(body: GenerateRequest, x_tenant_id: Optional[str] = Header(None)):
     try:
-        return generate(body.prompt, body.options)
+        return await generate_async(body.prompt, _with_admission(body.options, "standard", x_tenant_id))
+    except Overloaded:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
 @app.post("/chat")
-def chat_endpoint(body: ChatRequest):
+async def chat_endpoint(body: ChatRequest, x_tenant_id: Optional[str] = Header(None)):
+    options = _with_admission(body.options, "interactive", x_tenant_id)
+    try:
+        if body.uses_session:
+            return await chat_session_turn(body.sessionId, body.messages, options)
+        return await chat_async(body.messages, options)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=SESSION_EXPIRED) from exc
+    except Overloaded:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+async def _ndjson(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    # Headers are already sent once streaming starts, so failures become a final error event.
     try:
-        return chat(body.messages, body.options)
+        async for event in events:
+            yield json.dumps(event) + "\n"
     except Exception as exc:
+        yield json.dumps({"type": "error", "detail": str(exc)}) + "\n"
+
+
+async def _prepend(first: Dict[str, Any], events: Optional[AsyncIterator[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+    yield first
+    if events is not None:
+        async for event in events:
+            yield event
+
+
+async def _stream_response(events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """Start the stream before sending headers, so a call shed by admission control is a real 429."""
+    try:
+        first = await events.__anext__()
+    except Overloaded:
+        raise
+    except StopAsyncIteration:
+        return StreamingResponse(iter(()), media_type="application/x-ndjson")
+    except Exception as exc:
+        first, events = {"type": "error", "detail": str(exc)}, None
+    return StreamingResponse(_ndjson(_prepend(first, events)), media_type="application/x-ndjson")
+
+
+@app.post("/generate/stream")
+async def generate_stream_endpoint(body: GenerateRequest, x_tenant_id: Optional[str] = Header(None)):
+    return await _stream_response(
+        generate_stream(body.prompt, _with_admission(body.options, "standard", x_tenant_id))
+    )
+
+
+@app.post("/generate/batch")
+async def generate_batch_endpoint(body: BatchRequest, x_tenant_id: Optional[str] = Header(None)):
+    if len(body.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large: {len(body.items)} items (max {BATCH_MAX_ITEMS})")
+    items = [item.model_dump() for item in body.items]
+    options = _with_admission(body.options, "bulk", x_tenant_id)
+    if body.stream:
+        events = generate_batch_stream(items, options, body.concurrency)
+        return StreamingResponse(_ndjson(events), media_type="application/x-ndjson")
+    return {"results": await generate_batch(items, options, body.concurrency)}
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(body: ChatRequest, x_tenant_id: Optional[str] = Header(None)):
+    options = _with_admission(body.options, "interactive", x_tenant_id)
+    if not body.uses_session:
+        return await _stream_response(chat_stream(body.messages, options))
+    # Opened here, once, so an expired session is a real 404 rather than an error event.
+    try:
+        state = open_chat_session(body.sessionId)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=SESSION_EXPIRED) from exc
+    except RuntimeError as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
+    return await _stream_response(chat_session_stream(state, body.messages, options))
+
+
+@app.delete("/chat/sessions/{session_id}")
+def delete_chat_session(session_id: str):
+    if not session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return {"deleted": session_id}
 
 
 @app.websocket("/gemini-stream")
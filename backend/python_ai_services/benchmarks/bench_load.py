@@ -0,0 +1,426 @@
+"""
+Offline load test for both Python services against mock LLM providers.
+
+Run from backend/python_ai_services/:
+    python -m benchmarks.bench_load --requests 200 --concurrency 20 --latency 0.3 --output run.json
+    python -m benchmarks.bench_load --scenarios generate chat --compare run.json
+
+Starts ``benchmarks.mock_providers``, this service and ``python-service``
+as child processes with every provider URL pointed at the mock, so nothing
+leaves the machine. Each scenario then runs ``requests`` calls from
+``concurrency`` closed-loop workers:
+
+- ``generate``, ``chat``: POST /generate and /chat, which reach OpenRouter.
+- ``gemini-stream``: one /gemini-stream voice session per call. The session
+  sends ``--ws-chunks`` mic chunks. Latency runs from connect to the first
+  audio reply; requests/sec counts whole sessions.
+- ``mindmap-pdf``, ``mindmap-docx``: POST /generate-mindmap with generated
+  fixtures (``--pages`` / ``--paragraphs``). Every upload differs by a few
+  trailing bytes, so the document cache never answers.
+- ``mindmap-text``: POST /generate-mindmap-from-text with unique text.
+
+The report has requests/sec, p50/p95/p99 latency, errors and peak RSS of the
+service under test (children such as the PDF worker pool are included). With
+``--output`` it is saved as JSON tagged with the git commit; ``--compare``
+prints the change against a saved run.
+
+Provider rate limits and the admission scheduler would otherwise cap
+throughput at the production quotas (OpenRouter's 200 rpm is about 3.3
+req/s), which measures the quota rather than the service. Both services
+therefore run with ``--rate-limit-rpm`` (default ``0``, off) and
+``--max-in-flight`` (default ``0``, scheduler off). Set them to measure
+behaviour under the real limits; the report records the values used.
+
+/generate and /chat use the OpenRouter path (``AI_PROVIDER=openrouter``): the
+Gemini mock is HTTP-only, and google-generativeai's async calls cannot reach
+it because they only work over gRPC.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import websockets
+
+from benchmarks import mock_providers
+from benchmarks.bench_voice_relay import MIC_CHUNK
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.dirname(os.path.dirname(SERVICE_DIR))
+MINDMAP_DIR = os.path.join(REPO_ROOT, "python-service")
+
+BACKEND_SCENARIOS = ("generate", "chat", "gemini-stream")
+MINDMAP_SCENARIOS = ("mindmap-pdf", "mindmap-docx", "mindmap-text")
+SCENARIOS = BACKEND_SCENARIOS + MINDMAP_SCENARIOS
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid: int) -> List[int]:
+    found = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                found += [int(child) for child in f.read().split()]
+    except (FileNotFoundError, ProcessLookupError):
+        pass
+    return found
+
+
+def tree_rss_mb(pid: int) -> float:
+    """RSS of a process and all its descendants, from /proc (Linux only)."""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        member = pending.pop()
+        pending += _children(member)
+        try:
+            with open(f"/proc/{member}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+        except FileNotFoundError:
+            pass
+    return total_kb / 1024
+
+
+def percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_fixtures():
+    # python-service/benchmarks is also a package called "benchmarks", so load the file directly.
+    spec = importlib.util.spec_from_file_location(
+        "mindmap_fixtures", os.path.join(MINDMAP_DIR, "benchmarks", "fixtures.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Service:
+    """A child process serving HTTP on a free port."""
+
+    def __init__(self, name: str, args: List[str], cwd: str, env: Dict[str, str]):
+        self.name = name
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process = subprocess.Popen(
+            [sys.executable, *args, "--host", "127.0.0.1", "--port", str(self.port)],
+            cwd=cwd, env={**os.environ, **env},
+        )
+
+    async def wait_ready(self, http: httpx.AsyncClient, path: str, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited with code {self.process.returncode}")
+            try:
+                if (await http.get(self.url + path)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+        raise RuntimeError(f"{self.name} did not become ready within {timeout:.0f}s")
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+UVICORN_ARGS = ["-m", "uvicorn", "--log-level", "warning", "--ws-max-size", str(16 * 1024 * 1024)]
+
+
+def mock_service(config: mock_providers.MockConfig) -> Service:
+    args = [f"--{name.replace('_', '-')}={value}" for name, value in vars(config).items()]
+    return Service("mock", ["-m", "benchmarks.mock_providers", *args], SERVICE_DIR, {})
+
+
+def limit_env(args: argparse.Namespace) -> Dict[str, str]:
+    """Token buckets and scheduler caps for both services, from the CLI."""
+    env = {"SCHEDULER_MAX_QUEUE": str(args.max_queue)}
+    for provider in ("GEMINI", "OPENROUTER"):
+        env[f"{provider}_RATE_LIMIT_RPM"] = str(args.rate_limit_rpm)
+        env[f"{provider}_MAX_IN_FLIGHT"] = str(args.max_in_flight)
+    return env
+
+
+def upstream_env(mock: Service, args: argparse.Namespace) -> Dict[str, str]:
+    return {
+        **limit_env(args),
+        "OPENROUTER_API_KEY": "load-test",
+        "OPENROUTER_BASE_URL": f"{mock.url}/api/v1",
+        "GEMINI_API_KEY": "load-test",
+        "GEMINI_API_ENDPOINT": mock.url,
+        "GEMINI_LIVE_WS_URL": mock.url.replace("http://", "ws://") + "/ws/live",
+    }
+
+
+def backend_env(mock: Service, args: argparse.Namespace) -> Dict[str, str]:
+    return {
+        **upstream_env(mock, args),
+        "AI_PROVIDER": "openrouter",
+        "RESPONSE_CACHE_DISK": "0",
+        "GEMINI_WS_POOL_SIZE": "0",
+        "GEMINI_WS_POOL_BARE": "0",
+    }
+
+
+def mindmap_env(mock: Service, workdir: str, args: argparse.Namespace) -> Dict[str, str]:
+    return {
+        **upstream_env(mock, args),
+        "JOB_DB_PATH": os.path.join(workdir, "jobs.sqlite"),
+        "DOCUMENT_CACHE_PATH": os.path.join(workdir, "documents.sqlite"),
+        "SEMANTIC_CACHE_PATH": os.path.join(workdir, "semantic"),
+    }
+
+
+async def run_scenario(
+    name: str,
+    call: Callable[[int], Awaitable[Optional[float]]],
+    requests: int,
+    concurrency: int,
+    pid: int,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    next_index = 0
+    baseline = tree_rss_mb(pid)
+    peak = baseline
+
+    async def worker():
+        nonlocal next_index
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                # A call may report its own latency (seconds) when only part of it should count.
+                measured = await call(index)
+                latencies.append((measured if measured is not None else time.perf_counter() - started) * 1000)
+            except Exception as e:
+                key = str(e)[:80] or type(e).__name__
+                errors[key] = errors.get(key, 0) + 1
+
+    async def sample_rss():
+        nonlocal peak
+        while True:
+            peak = max(peak, tree_rss_mb(pid))
+            await asyncio.sleep(0.2)
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    peak = max(peak, tree_rss_mb(pid))
+
+    ordered = sorted(latencies)
+    return {
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": sum(errors.values()),
+        "errorKinds": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50": percentile(ordered, 0.5),
+        "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99),
+        "mean": round(sum(ordered) / len(ordered), 2) if ordered else None,
+        "baselineRssMb": round(baseline, 1),
+        "peakRssMb": round(peak, 1),
+    }
+
+
+def _check(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text[:60]}")
+
+
+def backend_calls(url: str, http: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Callable]:
+    async def generate(i: int) -> None:
+        _check(await http.post(f"{url}/generate", json={"prompt": f"Explain photosynthesis, variant {i}"}))
+
+    async def chat(i: int) -> None:
+        messages = [
+            {"role": "user", "content": "What is a fraction?"},
+            {"role": "assistant", "content": "A part of a whole."},
+            {"role": "user", "content": f"Give example number {i}."},
+        ]
+        _check(await http.post(f"{url}/chat", json={"messages": messages}))
+
+    async def gemini_stream(i: int) -> float:
+        ws_url = url.replace("http://", "ws://") + "/gemini-stream?grade=Grade%2010&subject=Science"
+        started = time.perf_counter()
+        async with websockets.connect(ws_url, max_size=None) as ws:
+            if "setupComplete" not in await ws.recv():
+                raise RuntimeError("no setupComplete")
+            await ws.send(MIC_CHUNK)
+            while "inlineData" not in await ws.recv():
+                pass
+            first_audio = time.perf_counter() - started
+            for _ in range(args.ws_chunks - 1):
+                await asyncio.sleep(args.ws_interval)
+                await ws.send(MIC_CHUNK)
+        return first_audio
+
+    return {"generate": generate, "chat": chat, "gemini-stream": gemini_stream}
+
+
+def mindmap_calls(url: str, http: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Callable]:
+    fixtures = load_fixtures()
+    pdf = fixtures.make_pdf(args.pages)
+    docx = fixtures.make_docx(args.paragraphs)
+    text = " ".join(fixtures.WORDS * 60)
+
+    def unique_docx(i: int) -> bytes:
+        # The zip comment is outside every archive member, so the content is unchanged.
+        return docx[:-2] + len(f"{i}").to_bytes(2, "little") + f"{i}".encode()
+
+    async def upload(name: str, body: bytes) -> None:
+        _check(await http.post(f"{url}/generate-mindmap", files={"file": (name, body)}))
+
+    async def mindmap_pdf(i: int) -> None:
+        await upload("notes.pdf", pdf + f"%request {i}\n".encode())
+
+    async def mindmap_docx(i: int) -> None:
+        await upload("notes.docx", unique_docx(i))
+
+    async def mindmap_text(i: int) -> None:
+        _check(await http.post(f"{url}/generate-mindmap-from-text", json={"text": f"Lesson {i}. {text}"}))
+
+    return {"mindmap-pdf": mindmap_pdf, "mindmap-docx": mindmap_docx, "mindmap-text": mindmap_text}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="bench-load-")
+    mock = mock_service(mock_providers.config_from_args(args))
+    mock_url = mock.url
+    services = [mock]
+    scenarios = [name for name in SCENARIOS if name in args.scenarios]
+    results: Dict[str, Any] = {}
+    limits = limit_env(args)
+    print("limits: " + "  ".join(f"{name}={value}" for name, value in limits.items()), flush=True)
+
+    try:
+        async with httpx.AsyncClient(timeout=300, limits=httpx.Limits(max_connections=None)) as http:
+            await mock.wait_ready(http, "/mock/stats")
+            calls: Dict[str, Callable] = {}
+            owners: Dict[str, Service] = {}
+            if any(name in BACKEND_SCENARIOS for name in scenarios):
+                backend = Service("backend", [*UVICORN_ARGS, "app:app"], SERVICE_DIR, {
+                    **backend_env(mock, args),
+                    "GEMINI_WS_MAX_SESSIONS": str(max(args.concurrency, 200)),
+                })
+                services.append(backend)
+                await backend.wait_ready(http, "/health")
+                calls.update(backend_calls(backend.url, http, args))
+                owners.update({name: backend for name in BACKEND_SCENARIOS})
+            if any(name in MINDMAP_SCENARIOS for name in scenarios):
+                mindmap = Service("python-service", [*UVICORN_ARGS, "main:app"], MINDMAP_DIR, mindmap_env(mock, workdir, args))
+                services.append(mindmap)
+                await mindmap.wait_ready(http, "/health")
+                calls.update(mindmap_calls(mindmap.url, http, args))
+                owners.update({name: mindmap for name in MINDMAP_SCENARIOS})
+
+            for name in scenarios:
+                await http.post(f"{mock_url}/mock/reset")
+                result = await run_scenario(name, calls[name], args.requests, args.concurrency,
+                                            owners[name].process.pid)
+                result["upstreamCalls"] = (await http.get(f"{mock_url}/mock/stats")).json()["calls"]
+                results[name] = result
+                print(format_row(name, result), flush=True)
+    finally:
+        for service in reversed(services):
+            service.stop()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "mock": vars(mock_providers.config_from_args(args)),
+        "limits": limits,
+        "scenarios": results,
+    }
+
+
+def format_row(name: str, result: Dict[str, Any]) -> str:
+    def ms(value):
+        return f"{value:8.1f}" if value is not None else "       -"
+    return (f"{name:>14}: {result['rps']:8.2f} req/s  p50 {ms(result['p50'])}  p95 {ms(result['p95'])}  "
+            f"p99 {ms(result['p99'])} ms  errors {result['errors']:>4}  peak RSS {result['peakRssMb']:7.1f} MB")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(f"\nchange against {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp')}):")
+    if baseline.get("limits") != report.get("limits"):
+        print(f"  note: limits differ (baseline {baseline.get('limits')}), so the runs are not comparable")
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        parts = []
+        for field in ("rps", "p50", "p95", "p99", "peakRssMb"):
+            old, new = before.get(field), result.get(field)
+            if old and new is not None:
+                parts.append(f"{field} {(new - old) / old * 100:+6.1f}%")
+        print(f"{name:>14}: " + "  ".join(parts))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20, help="pages in the PDF fixture")
+    parser.add_argument("--paragraphs", type=int, default=200, help="paragraphs in the DOCX fixture")
+    parser.add_argument("--ws-chunks", type=int, default=8, help="mic chunks per voice session")
+    parser.add_argument("--ws-interval", type=float, default=0.05)
+    parser.add_argument("--rate-limit-rpm", type=float, default=0,
+                        help="*_RATE_LIMIT_RPM for both providers; 0 turns the token buckets off")
+    parser.add_argument("--max-in-flight", type=int, default=0,
+                        help="*_MAX_IN_FLIGHT for both providers; 0 turns the scheduler off")
+    parser.add_argument("--max-queue", type=int, default=10000, help="SCHEDULER_MAX_QUEUE")
+    parser.add_argument("--output", help="save the report as JSON")
+    parser.add_argument("--compare", help="a saved report to compare against")
+    mock_providers.add_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nsaved {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main_cli()
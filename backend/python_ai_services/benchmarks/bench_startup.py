@@ -0,0 +1,147 @@
+"""
+Cold-start benchmark: import time, time to ready and first-request latency.
+
+Run from backend/python_ai_services/:
+    python -m benchmarks.bench_startup --runs 3 --output startup.json
+
+For each service (this one and ``python-service``) it measures:
+
+- ``import``: wall time to import the app module in a fresh interpreter.
+- ``health`` / ``ready``: process spawn to the first 200 from /health and
+  from /ready.
+- ``first`` / ``second``: latency of the first and second request after
+  /ready. The backend sends /generate through the OpenRouter mock. The
+  mindmap service sends a text mindmap, which needs the Gemini SDK, and then
+  a PDF upload, which needs pypdf and the worker pool.
+
+It runs each service both ways: lazy initialization (the default), and with
+``WARMUP_ON_STARTUP=1``, where the warm-up happens before /ready. Providers
+are the local mocks from ``benchmarks.mock_providers`` with ``--latency``
+seconds of latency, so the first-request numbers are initialization cost
+plus that latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks import mock_providers
+from benchmarks.bench_load import (
+    MINDMAP_DIR, SERVICE_DIR, UVICORN_ARGS, Service, backend_env, git_commit, load_fixtures, mindmap_env,
+    mock_service,
+)
+
+SERVICES = {
+    "backend": {"dir": SERVICE_DIR, "module": "app"},
+    "python-service": {"dir": MINDMAP_DIR, "module": "main"},
+}
+
+
+def import_seconds(directory: str, module: str, env: Dict[str, str]) -> float:
+    code = f"import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=directory, env={**os.environ, **env},
+                         capture_output=True, text=True, check=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+async def wait_for(http: httpx.AsyncClient, url: str, started: float, timeout: float = 60.0) -> float:
+    while time.perf_counter() - started < timeout:
+        try:
+            if (await http.get(url)).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.01)
+    raise RuntimeError(f"{url} not ready within {timeout:.0f}s")
+
+
+async def timed_post(http: httpx.AsyncClient, url: str, **kwargs) -> float:
+    started = time.perf_counter()
+    response = await http.post(url, **kwargs)
+    if response.status_code >= 400:
+        raise RuntimeError(f"HTTP {response.status_code} from {url}: {response.text[:80]}")
+    return time.perf_counter() - started
+
+
+async def measure(name: str, env: Dict[str, str], http: httpx.AsyncClient, fixtures) -> Dict[str, float]:
+    spec = SERVICES[name]
+    result = {"import": import_seconds(spec["dir"], spec["module"], env)}
+    started = time.perf_counter()
+    service = Service(name, [*UVICORN_ARGS, f"{spec['module']}:app"], spec["dir"], env)
+    try:
+        result["health"] = await wait_for(http, f"{service.url}/health", started)
+        result["ready"] = await wait_for(http, f"{service.url}/ready", started)
+        if name == "backend":
+            for label in ("first", "second"):
+                result[label] = await timed_post(http, f"{service.url}/generate",
+                                                 json={"prompt": f"Define osmosis ({label})"})
+        else:
+            for label in ("first", "second"):
+                result[label] = await timed_post(http, f"{service.url}/generate-mindmap-from-text",
+                                                 json={"text": f"{label} lesson on the water cycle"})
+            pdf = fixtures.make_pdf(5)
+            for label in ("firstPdf", "secondPdf"):
+                result[label] = await timed_post(http, f"{service.url}/generate-mindmap",
+                                                 files={"file": (f"{label}.pdf", pdf + label.encode())})
+    finally:
+        service.stop()
+    return result
+
+
+def summarize(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    return {key: round(statistics.median(run[key] for run in runs) * 1000, 1) for key in runs[0]}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    fixtures = load_fixtures()
+    mock = mock_service(mock_providers.MockConfig(latency=args.latency, jitter=0.0))
+    results: Dict[str, Any] = {}
+    try:
+        async with httpx.AsyncClient(timeout=120) as http:
+            await mock.wait_ready(http, "/mock/stats")
+            for name in args.services:
+                for mode in ("lazy", "warmup"):
+                    runs = []
+                    for _ in range(args.runs):
+                        workdir = tempfile.mkdtemp(prefix="bench-startup-")
+                        env = backend_env(mock) if name == "backend" else mindmap_env(mock, workdir)
+                        env["WARMUP_ON_STARTUP"] = "1" if mode == "warmup" else "0"
+                        runs.append(await measure(name, env, http, fixtures))
+                    results.setdefault(name, {})[mode] = summary = summarize(runs)
+                    print(f"{name:>14} {mode:>6}: " + "  ".join(f"{key} {value:7.1f}" for key, value in summary.items())
+                          + "  (ms, median)", flush=True)
+    finally:
+        mock.stop()
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "runs": args.runs,
+        "mockLatency": args.latency,
+        "services": results,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", nargs="+", choices=list(SERVICES), default=list(SERVICES))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="mock provider latency in seconds")
+    parser.add_argument("--output", help="save the report as JSON")
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nsaved {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
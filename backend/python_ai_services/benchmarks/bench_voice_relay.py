@@ -0,0 +1,149 @@
+"""
+Load test: /gemini-stream relay memory under many concurrent voice sessions.
+
+Run from backend/python_ai_services/:
+    python -m benchmarks.bench_voice_relay --sessions 300 --duration 30 --slow 0.1
+
+Starts a fake Gemini Live server in this process (it answers setup, then
+streams ~24 kHz PCM replies for every mic chunk), runs the proxy with
+uvicorn in a child process pointed at it via GEMINI_LIVE_WS_URL, and opens
+``sessions`` clients that send a 4096-sample mic chunk every 256 ms, like
+VoiceTutor.tsx. A ``slow`` fraction of clients barely reads, which is where
+an unbounded relay would grow. The proxy's RSS is sampled every second; with
+bounded queues it should level off instead of climbing with time.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import websockets
+from websockets.asyncio.server import serve
+
+MIC_CHUNK = json.dumps({
+    "realtimeInput": {"mediaChunks": [{"mimeType": "audio/pcm;rate=16000", "data": base64.b64encode(bytes(8192)).decode()}]}
+}, separators=(",", ":"))
+REPLY_CHUNK = json.dumps({
+    "serverContent": {"modelTurn": {"parts": [{"inlineData": {"mimeType": "audio/pcm;rate=24000",
+                                                              "data": base64.b64encode(bytes(12288)).decode()}}]}}
+})
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    return 0.0
+
+
+async def fake_gemini(ws):
+    try:
+        await ws.recv()
+        await ws.send(json.dumps({"setupComplete": {}}))
+        async for _ in ws:
+            # Every 256 ms of mic audio gets ~256 ms of 24 kHz reply audio back.
+            await ws.send(REPLY_CHUNK)
+    except websockets.ConnectionClosed:
+        pass
+
+
+async def client(url: str, stop_at: float, slow: bool, counts: dict) -> None:
+    try:
+        async with websockets.connect(url, max_size=None, max_queue=4) as ws:
+            async def reader():
+                async for _ in ws:
+                    counts["received"] += 1
+                    if slow:
+                        await asyncio.sleep(2)
+
+            read_task = asyncio.create_task(reader())
+            while time.monotonic() < stop_at:
+                await ws.send(MIC_CHUNK)
+                counts["sent"] += 1
+                await asyncio.sleep(0.256)
+            read_task.cancel()
+    except (OSError, websockets.InvalidStatus, websockets.ConnectionClosed) as e:
+        counts["errors"] += 1
+        counts.setdefault("lastError", repr(e))
+
+
+async def run(sessions: int, duration: float, slow_fraction: float) -> None:
+    upstream_port, proxy_port = free_port(), free_port()
+    upstream = await serve(fake_gemini, "127.0.0.1", upstream_port, max_size=None)
+    env = {
+        **os.environ,
+        "GEMINI_API_KEY": "load-test",
+        "GEMINI_LIVE_WS_URL": f"ws://127.0.0.1:{upstream_port}",
+        "GEMINI_WS_POOL_SIZE": "0",
+        "GEMINI_WS_POOL_BARE": "0",
+        "GEMINI_WS_MAX_SESSIONS": str(max(sessions, 1)),
+    }
+    proxy = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(proxy_port),
+         "--log-level", "warning", "--ws-max-size", str(16 * 1024 * 1024)],
+        env=env,
+    )
+    async with httpx.AsyncClient() as http:
+        for _ in range(200):
+            try:
+                await http.get(f"http://127.0.0.1:{proxy_port}/health")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+
+        baseline = rss_mb(proxy.pid)
+        counts = {"sent": 0, "received": 0, "errors": 0}
+        stop_at = time.monotonic() + duration
+        url = f"ws://127.0.0.1:{proxy_port}/gemini-stream?grade=Grade%2010&subject=Science"
+        slow_count = int(sessions * slow_fraction)
+        clients = [asyncio.create_task(client(url, stop_at, i < slow_count, counts)) for i in range(sessions)]
+
+        samples = []
+        while time.monotonic() < stop_at:
+            await asyncio.sleep(1)
+            samples.append(rss_mb(proxy.pid))
+            print(f"t={len(samples):>3}s RSS {samples[-1]:7.1f} MB  sent {counts['sent']:>7} received {counts['received']:>7}")
+        await asyncio.gather(*clients)
+        status = (await http.get(f"http://127.0.0.1:{proxy_port}/status")).json()["voiceProxy"]["relay"]
+
+    proxy.terminate()
+    proxy.wait()
+    upstream.close()
+
+    half = len(samples) // 2
+    print(f"\n{sessions} sessions ({slow_count} slow) for {duration:.0f}s, client errors {counts['errors']}")
+    if counts["errors"]:
+        print(f"last client error: {counts.get('lastError')}")
+    print(f"proxy RSS baseline {baseline:.0f} MB, peak {max(samples):.0f} MB, "
+          f"first-half mean {sum(samples[:half]) / max(half, 1):.0f} MB, "
+          f"second-half mean {sum(samples[half:]) / max(len(samples) - half, 1):.0f} MB")
+    print(f"relay: {json.dumps(status)}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--slow", type=float, default=0.1, help="fraction of clients that barely read")
+    args = parser.parse_args()
+    asyncio.run(run(args.sessions, args.duration, args.slow))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,276 @@
+"""
+Local stand-ins for the LLM providers, so load tests cost no quota.
+
+Run from backend/python_ai_services/:
+    python -m benchmarks.mock_providers --port 9100 --latency 0.3 --error-rate 0.02
+
+One uvicorn server answers all three upstream APIs the services call:
+
+- OpenRouter chat completions at ``/api/v1/chat/completions``, with SSE when
+  the request has ``"stream": true``. Point a service at it with
+  ``OPENROUTER_BASE_URL=http://127.0.0.1:9100/api/v1``.
+- Gemini ``generateContent`` and ``streamGenerateContent`` at
+  ``/v1beta/models/<model>:<method>``. Use
+  ``GEMINI_API_ENDPOINT=http://127.0.0.1:9100``. Prompts that ask for a mind
+  map get a valid node/edge graph back.
+- Gemini Live (BidiGenerateContent) at ``/ws/live``. It answers setup, then
+  sends ``--audio-replies`` PCM messages for every mic chunk. Use
+  ``GEMINI_LIVE_WS_URL=ws://127.0.0.1:9100/ws/live``.
+
+Every call waits ``latency`` (± ``jitter``) seconds before its first byte.
+A share of calls given by ``error_rate`` fails with ``error_status``; a
+failing Live session is closed with 1011. Streams send ``stream_chunks``
+pieces spaced ``chunk_interval`` apart. ``GET /mock/stats`` counts calls per
+API, which shows how many upstream calls caching and coalescing saved.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+from collections import Counter
+from dataclasses import asdict, dataclass
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+WORDS = "the cell uses light energy to build sugar from water and carbon dioxide in its leaves".split()
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.2
+    jitter: float = 0.05
+    error_rate: float = 0.0
+    error_status: int = 503
+    stream_chunks: int = 8
+    chunk_interval: float = 0.02
+    completion_words: int = 60
+    mindmap_nodes: int = 12
+    audio_replies: int = 1
+    audio_bytes: int = 12288
+
+
+def _words(count: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def mindmap_json(nodes: int) -> str:
+    graph = {
+        "nodes": [{"id": "root", "label": "Central Concept", "type": "input", "position": {"x": 0, "y": 0}}],
+        "edges": [],
+    }
+    for i in range(1, nodes):
+        parent = "root" if i <= 4 else str((i - 1) // 3)
+        graph["nodes"].append({"id": str(i), "label": f"Concept {i}", "position": {"x": 0, "y": 0}})
+        graph["edges"].append({"id": f"e{i}", "source": parent, "target": str(i)})
+    return json.dumps(graph)
+
+
+def _split(text: str, parts: int) -> list:
+    size = max(1, -(-len(text) // max(parts, 1)))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class MockProviders:
+    def __init__(self, config: MockConfig, seed: int = 7):
+        self.config = config
+        self.rng = random.Random(seed)
+        self.calls: Counter = Counter()
+
+    async def _wait(self) -> None:
+        c = self.config
+        await asyncio.sleep(max(0.0, c.latency + self.rng.uniform(-c.jitter, c.jitter)))
+
+    def _fails(self) -> bool:
+        return self.rng.random() < self.config.error_rate
+
+    def _answer(self, prompt: str) -> str:
+        if "mind map" in prompt:
+            return mindmap_json(self.config.mindmap_nodes)
+        return _words(self.config.completion_words, self.rng)
+
+    def _usage(self, prompt: str, answer: str) -> dict:
+        prompt_tokens, completion_tokens = len(prompt) // 4 + 1, len(answer) // 4 + 1
+        return {"prompt": prompt_tokens, "completion": completion_tokens}
+
+    # OpenRouter
+
+    async def openrouter_chat(self, request: Request):
+        body = await request.json()
+        stream = bool(body.get("stream"))
+        self.calls["openrouter.stream" if stream else "openrouter.chat"] += 1
+        await self._wait()
+        if self._fails():
+            self.calls["openrouter.errors"] += 1
+            status = self.config.error_status
+            return JSONResponse({"error": {"message": "mock upstream error", "code": status}}, status_code=status)
+
+        prompt = " ".join(str(m.get("content", "")) for m in body.get("messages") or [])
+        answer = self._answer(prompt)
+        counts = self._usage(prompt, answer)
+        usage = {
+            "prompt_tokens": counts["prompt"],
+            "completion_tokens": counts["completion"],
+            "total_tokens": counts["prompt"] + counts["completion"],
+        }
+        model = body.get("model") or "mock/model"
+        if not stream:
+            return JSONResponse({
+                "id": "mock", "model": model, "usage": usage,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            })
+
+        async def sse():
+            yield ": OPENROUTER PROCESSING\n\n"
+            for piece in _split(answer, self.config.stream_chunks):
+                chunk = {"id": "mock", "model": model, "choices": [{"index": 0, "delta": {"content": piece}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(self.config.chunk_interval)
+            yield f"data: {json.dumps({'id': 'mock', 'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    # Gemini generateContent
+
+    def _gemini_response(self, text: str, usage: dict = None, finished: bool = True) -> dict:
+        candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+        if finished:
+            candidate["finishReason"] = "STOP"
+        response = {"candidates": [candidate]}
+        if usage:
+            response["usageMetadata"] = {
+                "promptTokenCount": usage["prompt"],
+                "candidatesTokenCount": usage["completion"],
+                "totalTokenCount": usage["prompt"] + usage["completion"],
+            }
+        return response
+
+    async def gemini(self, request: Request):
+        model, _, method = request.path_params["target"].partition(":")
+        if method not in ("generateContent", "streamGenerateContent"):
+            return JSONResponse({"error": {"code": 404, "message": f"Unknown method {method}"}}, status_code=404)
+        body = await request.json()
+        self.calls[f"gemini.{method}"] += 1
+        await self._wait()
+        if self._fails():
+            self.calls["gemini.errors"] += 1
+            status = self.config.error_status
+            return JSONResponse({"error": {"code": status, "message": "mock upstream error", "status": "UNAVAILABLE"}},
+                                status_code=status)
+
+        prompt = " ".join(
+            part.get("text", "") for content in body.get("contents") or [] for part in content.get("parts") or []
+        )
+        answer = self._answer(prompt)
+        usage = self._usage(prompt, answer)
+        if method == "generateContent":
+            return JSONResponse(self._gemini_response(answer, usage))
+
+        pieces = _split(answer, self.config.stream_chunks)
+        sse = request.query_params.get("alt") == "sse"
+
+        async def chunks():
+            # The REST transport reads one JSON array element by element; alt=sse gets SSE instead.
+            if not sse:
+                yield "["
+            for index, piece in enumerate(pieces):
+                last = index == len(pieces) - 1
+                payload = json.dumps(self._gemini_response(piece, usage if last else None, finished=last))
+                yield f"data: {payload}\r\n\r\n" if sse else payload + ("" if last else ",")
+                if not last:
+                    await asyncio.sleep(self.config.chunk_interval)
+            if not sse:
+                yield "]"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream" if sse else "application/json")
+
+    # Gemini Live
+
+    async def live(self, websocket: WebSocket):
+        await websocket.accept()
+        self.calls["live.sessions"] += 1
+        audio = {"serverContent": {"modelTurn": {"parts": [{"inlineData": {
+            "mimeType": "audio/pcm;rate=24000",
+            "data": base64.b64encode(bytes(self.config.audio_bytes)).decode(),
+        }}]}}}
+        reply = json.dumps(audio)
+        try:
+            await websocket.receive_text()
+            await self._wait()
+            if self._fails():
+                self.calls["live.errors"] += 1
+                await websocket.close(code=1011)
+                return
+            await websocket.send_text(json.dumps({"setupComplete": {}}))
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                text = message.get("text") or (message.get("bytes") or b"").decode("utf-8", "replace")
+                self.calls["live.messages"] += 1
+                if "realtimeInput" in text:
+                    for _ in range(self.config.audio_replies):
+                        await websocket.send_text(reply)
+                elif "clientContent" in text:
+                    await websocket.send_text(json.dumps(
+                        {"serverContent": {"modelTurn": {"parts": [{"text": _words(20, self.rng)}]}}}
+                    ))
+                    await websocket.send_text(json.dumps({"serverContent": {"turnComplete": True}}))
+        except WebSocketDisconnect:
+            pass
+
+    async def stats(self, request: Request):
+        return JSONResponse({"config": asdict(self.config), "calls": dict(self.calls)})
+
+    async def reset(self, request: Request):
+        self.calls.clear()
+        return JSONResponse({"ok": True})
+
+
+def create_app(config: MockConfig) -> Starlette:
+    mock = MockProviders(config)
+    return Starlette(routes=[
+        Route("/api/v1/chat/completions", mock.openrouter_chat, methods=["POST"]),
+        Route("/v1beta/models/{target:path}", mock.gemini, methods=["POST"]),
+        WebSocketRoute("/ws/live", mock.live),
+        Route("/mock/stats", mock.stats),
+        Route("/mock/reset", mock.reset, methods=["POST"]),
+    ])
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = MockConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="seconds before the first byte")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--stream-chunks", type=int, default=defaults.stream_chunks)
+    parser.add_argument("--chunk-interval", type=float, default=defaults.chunk_interval)
+    parser.add_argument("--completion-words", type=int, default=defaults.completion_words)
+    parser.add_argument("--mindmap-nodes", type=int, default=defaults.mindmap_nodes)
+    parser.add_argument("--audio-replies", type=int, default=defaults.audio_replies)
+    parser.add_argument("--audio-bytes", type=int, default=defaults.audio_bytes)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(**{name: getattr(args, name) for name in MockConfig.__dataclass_fields__})
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning",
+                ws_max_size=16 * 1024 * 1024)
+
+
+if __name__ == "__main__":
+    main_cli()
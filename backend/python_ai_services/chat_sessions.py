@@ -0,0 +1,188 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".cache")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def estimate_tokens(message: Dict[str, str]) -> int:
+    # Roughly four characters per token plus per-message framing; good enough for budgeting.
+    return len(message.get("content") or "") // 4 + 4
+
+
+class ChatSessionState:
+    """Server-side state for one tutoring conversation.
+
+    ``messages`` holds the normalized OpenRouter-style history. ``gemini`` is
+    the live SDK ``ChatSession`` when the conversation runs on Gemini; it is
+    never persisted and is rebuilt from ``messages`` after a spill or trim.
+    """
+
+    def __init__(self, session_id: str, provider: str, messages: Optional[List[Dict[str, str]]] = None,
+                 summary: str = "", updated_at: Optional[float] = None):
+        self.id = session_id
+        self.provider = provider
+        self.messages: List[Dict[str, str]] = messages or []
+        self.summary = summary
+        self.updated_at = updated_at or time.time()
+        self.tokens = sum(estimate_tokens(m) for m in self.messages)
+        self.gemini: Any = None
+        self.lock = asyncio.Lock()
+
+    def append(self, message: Dict[str, str]) -> None:
+        self.messages.append(message)
+        self.tokens += estimate_tokens(message)
+        self.updated_at = time.time()
+
+    def trim(self, max_tokens: int) -> List[Dict[str, str]]:
+        """Drop the oldest turns until the history fits ``max_tokens``; returns what was dropped."""
+        dropped: List[Dict[str, str]] = []
+        if self.tokens <= max_tokens:
+            return dropped
+        # Trim to three quarters of the budget so we are not trimming again on the very next turn.
+        target = max_tokens * 3 // 4
+        keep_from = 0
+        while self.tokens > target and keep_from < len(self.messages) - 2:
+            self.tokens -= estimate_tokens(self.messages[keep_from])
+            keep_from += 1
+        dropped = self.messages[:keep_from]
+        self.messages = self.messages[keep_from:]
+        self.gemini = None
+        return dropped
+
+    def snapshot(self) -> tuple:
+        return list(self.messages), self.summary, self.tokens
+
+    def restore(self, snapshot: tuple) -> None:
+        """Roll back a failed turn; the live Gemini session may be out of step, so drop it."""
+        self.messages, self.summary, self.tokens = list(snapshot[0]), snapshot[1], snapshot[2]
+        self.gemini = None
+
+    def to_row(self) -> tuple:
+        return (self.id, self.provider, json.dumps(self.messages), self.summary, self.updated_at)
+
+
+class SessionStore:
+    """Bounded LRU of chat sessions with idle expiry and an optional SQLite spill tier.
+
+    Sessions evicted from memory by the LRU are written to SQLite (when
+    enabled) and transparently reloaded on their next turn.
+    """
+
+    def __init__(self, max_sessions: int = 500, idle_ttl: float = 3600, spill_path: Optional[str] = None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.spill_path = spill_path
+        self._sessions: "OrderedDict[str, ChatSessionState]" = OrderedDict()
+        self.stats = {"created": 0, "resumed": 0, "spilled": 0, "reloaded": 0, "expired": 0, "trimmed": 0}
+        if spill_path:
+            os.makedirs(os.path.dirname(spill_path), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                    "id TEXT PRIMARY KEY, provider TEXT NOT NULL, messages TEXT NOT NULL, "
+                    "summary TEXT NOT NULL, updated_at REAL NOT NULL)"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.spill_path, timeout=5)
+
+    def _expired(self, state: ChatSessionState) -> bool:
+        return time.time() - state.updated_at > self.idle_ttl
+
+    def create(self, provider: str) -> ChatSessionState:
+        state = ChatSessionState(uuid.uuid4().hex, provider)
+        self._put(state)
+        self.stats["created"] += 1
+        return state
+
+    def get(self, session_id: str) -> Optional[ChatSessionState]:
+        state = self._sessions.get(session_id)
+        if state is not None:
+            if self._expired(state):
+                del self._sessions[session_id]
+                self.stats["expired"] += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self.stats["resumed"] += 1
+            return state
+
+        state = self._load(session_id)
+        if state is None:
+            return None
+        self._put(state)
+        self.stats["reloaded"] += 1
+        return state
+
+    def delete(self, session_id: str) -> bool:
+        removed = self._sessions.pop(session_id, None) is not None
+        if self.spill_path:
+            with self._connect() as conn:
+                removed = conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,)).rowcount > 0 or removed
+        return removed
+
+    def _put(self, state: ChatSessionState) -> None:
+        self._sessions[state.id] = state
+        self._sessions.move_to_end(state.id)
+        while len(self._sessions) > self.max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            if not self._expired(evicted):
+                self._spill(evicted)
+
+    def _spill(self, state: ChatSessionState) -> None:
+        if not self.spill_path:
+            return
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO chat_sessions VALUES (?, ?, ?, ?, ?)", state.to_row())
+            conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (time.time() - self.idle_ttl,))
+        self.stats["spilled"] += 1
+
+    def _load(self, session_id: str) -> Optional[ChatSessionState]:
+        if not self.spill_path:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT provider, messages, summary, updated_at FROM chat_sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+        if row is None:
+            return None
+        state = ChatSessionState(session_id, row[0], json.loads(row[1]), row[2], row[3])
+        if self._expired(state):
+            self.stats["expired"] += 1
+            return None
+        return state
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "active": len(self._sessions),
+            "maxSessions": self.max_sessions,
+            "idleTtl": self.idle_ttl,
+            "spill": bool(self.spill_path),
+        }
+
+
+CHAT_SESSION_MAX_TOKENS = int(_env_float("CHAT_SESSION_MAX_TOKENS", 6000))
+CHAT_SESSION_SUMMARIZE = os.getenv("CHAT_SESSION_SUMMARIZE") == "1"
+
+session_store = SessionStore(
+    max_sessions=int(_env_float("CHAT_SESSION_MAX_SESSIONS", 500)),
+    idle_ttl=_env_float("CHAT_SESSION_IDLE_TTL", 3600),
+    spill_path=(os.getenv("CHAT_SESSION_SPILL_PATH") or os.path.join(CACHE_DIR, "chat_sessions.sqlite"))
+    if os.getenv("CHAT_SESSION_SPILL") == "1" else None,
+)
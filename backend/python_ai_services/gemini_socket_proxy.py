@@ -1,11 +1,19 @@
 import asyncio
 import json
 import os
+import time
+from typing import List, Optional
 from urllib.parse import parse_qs, urlparse
 
 import websockets
 from fastapi import WebSocket
 
+import metrics
+import scheduler
+from scheduler import Overloaded
+from upstream_pool import Key, UpstreamPool
+from ws_relay import Channel, SessionLimiter, SlowConsumer
+
 
 MODEL = "gemini-2.5-flash-native-audio-preview-12-2025"
 HOST = "generativelanguage.googleapis.com"
@@ -66,49 +74,190 @@ def build_setup_message(grade: str, subject: str) -> str:
     return json.dumps(payload)
 
 
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _api_key() -> str:
+    return os.getenv("GEMINI_AUDIO_API_KEY") or os.getenv("GEMINI_API_KEY") or ""
+
+
+async def _connect_upstream():
+    # GEMINI_LIVE_WS_URL points the proxy at a local mock for load tests.
+    base = os.getenv("GEMINI_LIVE_WS_URL") or (
+        f"wss://{HOST}/ws/google.ai.generativelanguage.v1beta.GenerativeService.BidiGenerateContent"
+    )
+    uri = f"{base}?key={_api_key()}"
+    return await websockets.connect(uri, max_size=MAX_MESSAGE_BYTES)
+
+
+MAX_MESSAGE_BYTES = int(_env_float("GEMINI_WS_MAX_MESSAGE_MB", 16) * 1024 * 1024)
+QUEUE_FRAMES = int(_env_float("GEMINI_WS_QUEUE_FRAMES", 64))
+QUEUE_BYTES = int(_env_float("GEMINI_WS_QUEUE_KB", 4096) * 1024)
+UPSTREAM_POLICY = os.getenv("GEMINI_WS_UPSTREAM_POLICY") or "block"
+DOWNSTREAM_POLICY = os.getenv("GEMINI_WS_DOWNSTREAM_POLICY") or "drop"
+COALESCE_WINDOW = _env_float("GEMINI_WS_COALESCE_MS", 20) / 1000
+COALESCE_MAX_BYTES = int(_env_float("GEMINI_WS_COALESCE_KB", 64) * 1024)
+
+session_limiter = SessionLimiter(int(_env_float("GEMINI_WS_MAX_SESSIONS", 200)))
+
+metrics.callback("voice_sessions_active", "Open /gemini-stream sessions.", lambda: session_limiter.active)
+metrics.callback(
+    "voice_sessions_rejected_total", "Sessions refused at the session cap.", lambda: session_limiter.rejected,
+    kind="counter",
+)
+
+def _parse_keys(value: Optional[str]) -> List[Key]:
+    # "Grade 10|Science;Grade 8|Mathematics"
+    keys = []
+    for item in (value or "").split(";"):
+        grade, _, subject = item.partition("|")
+        if grade.strip() and subject.strip():
+            keys.append((grade.strip(), subject.strip()))
+    return keys
+
+
+POOL_ALLOWED_KEYS = set(_parse_keys(os.getenv("GEMINI_WS_POOL_ALLOWED_KEYS")))
+POOL_KEY_MAX_CHARS = 64
+
+
+def _poolable_key(key: Key) -> bool:
+    """Whether a client-supplied (grade, subject) may be kept warm in the pool."""
+    if POOL_ALLOWED_KEYS:
+        return key in POOL_ALLOWED_KEYS
+    return all(0 < len(part) <= POOL_KEY_MAX_CHARS and part.isprintable() for part in key)
+
+
+upstream_pool = UpstreamPool(
+    _connect_upstream,
+    build_setup_message,
+    size=int(_env_float("GEMINI_WS_POOL_SIZE", 1)),
+    bare=int(_env_float("GEMINI_WS_POOL_BARE", 1)),
+    max_keys=int(_env_float("GEMINI_WS_POOL_MAX_KEYS", 8)),
+    max_idle=_env_float("GEMINI_WS_POOL_MAX_IDLE", 60.0),
+    health_interval=_env_float("GEMINI_WS_POOL_HEALTH_INTERVAL", 15.0),
+    setup_timeout=_env_float("GEMINI_WS_SETUP_TIMEOUT", 10.0),
+    key_ttl=_env_float("GEMINI_WS_POOL_KEY_TTL", 600.0),
+    allow_key=_poolable_key,
+)
+
+
+metrics.callback(
+    "voice_pool_acquire_total",
+    "Upstream sessions handed out, by pool tier.",
+    lambda: {"warm": upstream_pool.stats["hits"], "bare": upstream_pool.stats["bareHits"],
+             "new": upstream_pool.stats["misses"]},
+    labels=("result",),
+    kind="counter",
+)
+FIRST_AUDIO_SECONDS = metrics.histogram(
+    "voice_first_audio_seconds", "Time from client accept to the first upstream audio message."
+)
+
+
+def _prewarm_keys() -> List[Key]:
+    return _parse_keys(os.getenv("GEMINI_WS_POOL_PREWARM"))
+
+
+async def start_upstream_pool() -> None:
+    if _api_key():
+        await upstream_pool.start(_prewarm_keys())
+
+
+async def close_upstream_pool() -> None:
+    await upstream_pool.close()
+
+
+def _has_audio(message) -> bool:
+    marker = b'"inlineData"' if isinstance(message, bytes) else '"inlineData"'
+    return marker in message
+
+
 async def proxy_gemini_stream(websocket: WebSocket):
-    api_key = os.getenv("GEMINI_AUDIO_API_KEY") or os.getenv("GEMINI_API_KEY")
-    if not api_key:
+    if not _api_key():
         await websocket.close(code=1011, reason="Missing GEMINI_API_KEY")
         return
+    if not session_limiter.try_acquire():
+        await websocket.close(code=1013, reason="Voice tutor is at capacity; retry shortly")
+        return
+    to_upstream = to_client = None
+    try:
+        await websocket.accept()
+        accepted_at = time.monotonic()
 
-    await websocket.accept()
+        parsed = urlparse(str(websocket.url))
+        query = parse_qs(parsed.query)
+        grade = query.get("grade", ["Grade 10"])[0]
+        subject = query.get("subject", ["General Knowledge"])[0]
 
-    parsed = urlparse(str(websocket.url))
-    query = parse_qs(parsed.query)
-    grade = query.get("grade", ["Grade 10"])[0]
-    subject = query.get("subject", ["General Knowledge"])[0]
+        tenant = query.get("tenant", [websocket.headers.get("x-tenant-id")])[0]
 
-    uri = (
-        "wss://"
-        f"{HOST}/ws/google.ai.generativelanguage.v1beta."
-        f"GenerativeService.BidiGenerateContent?key={api_key}"
-    )
+        try:
+            # Only the upstream handshake takes a scheduler slot; the session itself is
+            # capped by session_limiter, and holding a slot for minutes would starve text calls.
+            async with scheduler.slot("gemini", "interactive", tenant):
+                session = await upstream_pool.acquire(grade, subject)
+        except Overloaded as exc:
+            await websocket.close(code=1013, reason=f"Voice tutor is busy; retry in {exc.retry_after}s")
+            return
+        except Exception:
+            await websocket.close(code=1011, reason="Gemini upstream unavailable")
+            return
 
-    async with websockets.connect(uri, max_size=None) as upstream:
-        await upstream.send(build_setup_message(grade, subject))
-
-        async def client_to_upstream():
-            while True:
-                message = await websocket.receive()
-                if message.get("type") == "websocket.disconnect":
-                    break
-                payload = message.get("bytes") or message.get("text")
-                if payload is not None:
-                    await upstream.send(payload)
-
-        async def upstream_to_client():
-            async for message in upstream:
-                if isinstance(message, bytes):
-                    await websocket.send_bytes(message)
+        async with session.ws as upstream:
+            async def send_to_client(frame):
+                if isinstance(frame, str):
+                    await websocket.send_text(frame)
                 else:
-                    await websocket.send_text(message)
-
-        done, pending = await asyncio.wait(
-            [asyncio.create_task(client_to_upstream()), asyncio.create_task(upstream_to_client())],
-            return_when=asyncio.FIRST_COMPLETED,
-        )
-        for task in pending:
-            task.cancel()
-        for task in done:
-            _ = task.exception()
+                    await websocket.send_bytes(frame)
+
+            to_upstream = Channel(
+                "upstream",
+                upstream.send, QUEUE_FRAMES, QUEUE_BYTES, UPSTREAM_POLICY, COALESCE_WINDOW, COALESCE_MAX_BYTES
+            )
+            to_client = Channel("downstream", send_to_client, QUEUE_FRAMES, QUEUE_BYTES, DOWNSTREAM_POLICY)
+
+            if session.setup_reply is not None:
+                # Pre-setup session: the client still gets the setup reply it would have seen.
+                await to_client.put(session.setup_reply)
+
+            async def read_client():
+                while True:
+                    message = await websocket.receive()
+                    if message.get("type") == "websocket.disconnect":
+                        break
+                    if message.get("bytes") is not None:
+                        # Binary audio goes upstream as-is, without a copy or re-encoding.
+                        await to_upstream.put(memoryview(message["bytes"]))
+                    elif message.get("text") is not None:
+                        await to_upstream.put(message["text"])
+
+            async def read_upstream():
+                waiting_for_audio = True
+                async for message in upstream:
+                    if waiting_for_audio and _has_audio(message):
+                        waiting_for_audio = False
+                        upstream_pool.record_first_audio(time.monotonic() - accepted_at)
+                        FIRST_AUDIO_SECONDS.observe(time.monotonic() - accepted_at)
+                    await to_client.put(message)
+
+            tasks = [
+                asyncio.create_task(read_client()),
+                asyncio.create_task(read_upstream()),
+                asyncio.create_task(to_upstream.run()),
+                asyncio.create_task(to_client.run()),
+            ]
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if any(isinstance(task.exception(), SlowConsumer) for task in done if not task.cancelled()):
+                try:
+                    await websocket.close(code=1013, reason="Connection too slow for live audio")
+                except RuntimeError:
+                    pass
+    finally:
+        session_limiter.release(to_upstream, to_client)
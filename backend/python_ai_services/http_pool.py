@@ -0,0 +1,76 @@
+import importlib.util
+import os
+from typing import Any, Dict
+
+import httpx
+
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+PROVIDER_BASE_URLS = {
+    "openrouter": os.getenv("OPENROUTER_BASE_URL") or "https://openrouter.ai/api/v1",
+}
+
+DEFAULT_POOL_CONFIG = {
+    "max_connections": 200,
+    "max_keepalive": 50,
+    "keepalive_expiry": 30.0,
+    "timeout": 60.0,
+    "connect_timeout": 10.0,
+}
+
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return type(default)(value)
+    except ValueError:
+        return default
+
+
+def get_pool_config(provider: str) -> Dict[str, Any]:
+    """Pool limits for a provider, overridable with e.g. OPENROUTER_POOL_MAX_CONNECTIONS."""
+    prefix = f"{provider.upper()}_POOL_"
+    return {
+        key: _env_number(prefix + key.upper(), default)
+        for key, default in DEFAULT_POOL_CONFIG.items()
+    }
+
+
+def get_async_client(provider: str) -> httpx.AsyncClient:
+    """Shared keep-alive client for a provider, created on first use."""
+    client = _async_clients.get(provider)
+    if client is None or client.is_closed:
+        config = get_pool_config(provider)
+        client = httpx.AsyncClient(
+            base_url=PROVIDER_BASE_URLS.get(provider, ""),
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=config["max_connections"],
+                max_keepalive_connections=config["max_keepalive"],
+                keepalive_expiry=config["keepalive_expiry"],
+            ),
+            timeout=httpx.Timeout(config["timeout"], connect=config["connect_timeout"]),
+        )
+        _async_clients[provider] = client
+    return client
+
+
+async def close_clients() -> None:
+    for client in list(_async_clients.values()):
+        await client.aclose()
+    _async_clients.clear()
+
+
+def get_pool_status() -> Dict[str, Any]:
+    return {
+        "http2": HTTP2_AVAILABLE,
+        "providers": {
+            provider: {"open": not client.is_closed, **get_pool_config(provider)}
+            for provider, client in _async_clients.items()
+        },
+    }
@@ -0,0 +1,255 @@
+"""
+Dependency-free metrics for the Python services.
+
+- ``counter`` / ``gauge`` / ``histogram`` register labelled metrics that
+  ``render()`` writes in the Prometheus text exposition format for /metrics.
+- ``callback`` exposes numbers a module already keeps (cache stats, pool
+  counters) without double bookkeeping; the function runs at scrape time.
+- ``span("name")`` times a block into ``span_duration_seconds`` and, with
+  METRICS_TIMING_LOG=1, prints one JSON line per span.
+- ``sample_profile`` is a wall-clock sampling profiler over every thread,
+  returning collapsed stacks for flamegraph tools; endpoints only expose it
+  when PROFILER_ENABLED=1.
+
+The same module is used by both services, so keep the copies in sync.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+TIMING_LOG = os.getenv("METRICS_TIMING_LOG") == "1"
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED") == "1"
+PROFILER_MAX_SECONDS = 60.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}  # bucket counts..., sum, count
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {_format_value(cumulative)}")
+            inf = _format_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {_format_value(series[-1])}")
+        return lines
+
+
+CallbackResult = Union[float, Dict[Union[str, LabelValues], float]]
+
+
+class Callback(Metric):
+    """A counter or gauge whose values come from ``fn()`` at scrape time."""
+
+    def __init__(self, name, help_text, fn: Callable[[], CallbackResult], labels=(), kind="gauge"):
+        super().__init__(name, help_text, labels)
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.fn()
+        except Exception:
+            return []
+        if not isinstance(values, dict):
+            return [f"{self.name} {_format_value(values or 0)}"]
+        lines = []
+        for key, value in values.items():
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value or 0)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            # Re-registering (module reloads, both services importing a helper) returns the original.
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            samples = metric.samples()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def counter(name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+    return registry.register(Counter(name, help_text, labels))
+
+
+def gauge(name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+    return registry.register(Gauge(name, help_text, labels))
+
+
+def histogram(name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, help_text, labels, buckets))
+
+
+def callback(name: str, help_text: str, fn: Callable[[], CallbackResult], labels: Tuple[str, ...] = (), kind: str = "gauge") -> Callback:
+    return registry.register(Callback(name, help_text, fn, labels, kind))
+
+
+def render() -> str:
+    return registry.render()
+
+
+SPAN_SECONDS = histogram("span_duration_seconds", "Duration of instrumented code spans.", ("span",))
+
+
+@contextmanager
+def span(name: str, **fields):
+    """Time a block: ``with span("pdf.extract", pages=n): ...``. Extra fields only go to the timing log."""
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        SPAN_SECONDS.observe(elapsed, span=name)
+        if TIMING_LOG:
+            print(json.dumps({"span": name, "ms": round(elapsed * 1000, 3), "ok": not failed, **fields}, default=str))
+
+
+_profile_lock = threading.Lock()
+
+
+def sample_profile(seconds: float = 5.0, interval: float = 0.005) -> Optional[str]:
+    """Sample every thread's stack for ``seconds``; returns collapsed stacks, or None if one is already running.
+
+    Blocking: call it from a worker thread (``asyncio.to_thread``), never on the event loop.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        seconds = min(max(seconds, 0.1), PROFILER_MAX_SECONDS)
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks: _Tally = _Tally()
+        ends_at = time.monotonic() + seconds
+        while time.monotonic() < ends_at:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                parts.append(names.get(ident, str(ident)))
+                stacks[";".join(reversed(parts))] += 1
+            time.sleep(interval)
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,266 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import metrics
+from scheduler import Overloaded
+
+
+ROUTE_EVENTS = metrics.counter(
+    "ai_route_events_total", "Provider fallbacks, hedges and circuit-open skips, streamed or not.", ("event",)
+)
+
+Candidate = Tuple[str, Dict[str, Any]]
+CallFn = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures, half-open after a cooldown.
+
+    In half-open state a single probe is let through; success closes the
+    breaker, failure re-opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+            self.probe_in_flight = False
+        if self.state == "half_open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class LatencyStats:
+    """EWMA of latency and error rate plus a window of recent latencies for p95."""
+
+    def __init__(self, alpha: float = 0.2, window: int = 100):
+        self.alpha = alpha
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, latency: Optional[float], ok: bool) -> None:
+        self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        if ok and latency is not None:
+            self.samples.append(latency)
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency += self.alpha * (latency - self.ewma_latency)
+
+    def p95(self) -> Optional[float]:
+        if len(self.samples) < 5:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class ProviderRouter:
+    """Deadline-aware walk over provider candidates with optional hedging."""
+
+    def __init__(
+        self,
+        deadline: float = 45.0,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        default_latency: float = 5.0,
+        hedge: bool = False,
+        hedge_min_delay: float = 1.0,
+    ):
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.default_latency = default_latency
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.latency: Dict[str, LatencyStats] = {}
+
+    @staticmethod
+    def _key(candidate: Candidate) -> str:
+        provider, options = candidate
+        return f"{provider}:{options.get('model') or 'default'}"
+
+    def _breaker(self, key: str) -> CircuitBreaker:
+        if key not in self.breakers:
+            self.breakers[key] = CircuitBreaker(self.failure_threshold, self.cooldown)
+        return self.breakers[key]
+
+    def _stats(self, key: str) -> LatencyStats:
+        if key not in self.latency:
+            self.latency[key] = LatencyStats()
+        return self.latency[key]
+
+    def _score(self, candidate: Candidate) -> float:
+        stats = self._stats(self._key(candidate))
+        latency = stats.ewma_latency if stats.ewma_latency is not None else self.default_latency
+        return latency * (1 + 4 * stats.error_rate)
+
+    def order(self, candidates: List[Candidate], pin_first: bool = False) -> List[Candidate]:
+        """Fastest healthy candidates first; an explicitly requested primary stays in front."""
+        if pin_first and candidates:
+            return candidates[:1] + sorted(candidates[1:], key=self._score)
+        return sorted(candidates, key=self._score)
+
+    def record(self, candidate: Candidate, latency: Optional[float], ok: bool) -> None:
+        key = self._key(candidate)
+        self._stats(key).record(latency, ok)
+        if ok:
+            self._breaker(key).record_success()
+        else:
+            self._breaker(key).record_failure()
+
+    def hedge_delay(self, candidate: Candidate) -> float:
+        p95 = self._stats(self._key(candidate)).p95()
+        return max(self.hedge_min_delay, p95 if p95 is not None else self.default_latency)
+
+    async def _attempt(self, candidate: Candidate, call: CallFn, timeout: float) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call(*candidate), timeout)
+        except (asyncio.CancelledError, Overloaded):
+            # Lost a hedge race, the client went away or we shed the call ourselves;
+            # none of that says anything about provider health.
+            self._breaker(self._key(candidate)).probe_in_flight = False
+            raise
+        except asyncio.TimeoutError as exc:
+            self.record(candidate, None, ok=False)
+            raise RuntimeError(f"timed out after {timeout:.1f}s") from exc
+        except Exception:
+            self.record(candidate, None, ok=False)
+            raise
+        self.record(candidate, time.monotonic() - started, ok=True)
+        return result
+
+    async def route(
+        self,
+        candidates: List[Candidate],
+        call: CallFn,
+        deadline: Optional[float] = None,
+        hedge: Optional[bool] = None,
+        pin_first: bool = False,
+    ) -> Dict[str, Any]:
+        """Return the first successful result, trying candidates within one overall deadline.
+
+        With hedging on, a second candidate is started once the running one
+        exceeds its p95 latency and whichever succeeds first wins.
+        """
+        hedge = self.hedge if hedge is None else hedge
+        expires_at = time.monotonic() + (deadline or self.deadline)
+        pending = list(self.order(candidates, pin_first=pin_first))
+        running: Dict[asyncio.Task, Candidate] = {}
+        errors: List[str] = []
+        overloaded: List[Overloaded] = []
+
+        def launch_next() -> bool:
+            while pending:
+                candidate = pending.pop(0)
+                if not self._breaker(self._key(candidate)).allow():
+                    ROUTE_EVENTS.inc(event="circuit_open")
+                    errors.append(f"{self._key(candidate)}: circuit open")
+                    continue
+                remaining = expires_at - time.monotonic()
+                task = asyncio.ensure_future(self._attempt(candidate, call, remaining))
+                running[task] = candidate
+                return True
+            return False
+
+        try:
+            launch_next()
+            while running:
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                wait_for = remaining
+                if hedge and len(running) == 1 and pending:
+                    newest = next(iter(running.values()))
+                    wait_for = min(remaining, self.hedge_delay(newest))
+                done, _ = await asyncio.wait(running, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Hedge timer fired: race another candidate against the slow one.
+                    if launch_next():
+                        ROUTE_EVENTS.inc(event="hedge")
+                    continue
+                for task in done:
+                    candidate = running.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    if isinstance(task.exception(), Overloaded):
+                        overloaded.append(task.exception())
+                    errors.append(f"{self._key(candidate)}: {task.exception()}")
+                if not running and launch_next():
+                    ROUTE_EVENTS.inc(event="fallback")
+        finally:
+            for task in running:
+                task.cancel()
+
+        if overloaded and len(overloaded) == len(errors):
+            # Every candidate was shed locally: surface that (429) rather than a provider failure.
+            raise overloaded[0]
+        if time.monotonic() >= expires_at:
+            errors.append(f"deadline of {deadline or self.deadline}s exceeded")
+        if not errors:
+            errors.append("no provider candidates available")
+        raise RuntimeError("; ".join(errors))
+
+    def get_status(self) -> Dict[str, Any]:
+        status = {}
+        for key in sorted(set(self.breakers) | set(self.latency)):
+            breaker = self._breaker(key)
+            stats = self._stats(key)
+            p95 = stats.p95()
+            status[key] = {
+                "state": breaker.state,
+                "consecutiveFailures": breaker.failures,
+                "ewmaLatencyMs": round(stats.ewma_latency * 1000) if stats.ewma_latency is not None else None,
+                "p95LatencyMs": round(p95 * 1000) if p95 is not None else None,
+                "errorRate": round(stats.error_rate, 4),
+                "samples": len(stats.samples),
+            }
+        return {
+            "deadline": self.deadline,
+            "hedge": self.hedge,
+            "candidates": status,
+        }
+
+
+provider_router = ProviderRouter(
+    deadline=_env_float("ROUTER_DEADLINE", 45.0),
+    failure_threshold=int(_env_float("ROUTER_FAILURE_THRESHOLD", 3)),
+    cooldown=_env_float("ROUTER_COOLDOWN", 30.0),
+    default_latency=_env_float("ROUTER_DEFAULT_LATENCY", 5.0),
+    hedge=os.getenv("ROUTER_HEDGE") == "1",
+    hedge_min_delay=_env_float("ROUTER_HEDGE_MIN_DELAY", 1.0),
+)
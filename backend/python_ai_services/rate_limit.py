@@ -0,0 +1,78 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second with bursts up to ``capacity``.
+
+    Waiters are served in arrival order so a burst of batch items cannot
+    starve a single interactive call that queued first.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.stats = {"acquired": 0, "waited": 0, "waitSeconds": 0.0}
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                self.stats["waited"] += 1
+                self.stats["waitSeconds"] += wait
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= 1
+            self.stats["acquired"] += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "ratePerMinute": round(self.rate * 60, 2),
+            "burst": self.capacity,
+            "acquired": self.stats["acquired"],
+            "waited": self.stats["waited"],
+            "waitSeconds": round(self.stats["waitSeconds"], 3),
+        }
+
+
+def _bucket_from_env(provider: str, default_rpm: float) -> TokenBucket:
+    rpm = _env_float(f"{provider}_RATE_LIMIT_RPM", default_rpm)
+    burst = _env_float(f"{provider}_RATE_LIMIT_BURST", max(1.0, rpm / 6))
+    return TokenBucket(rate=rpm / 60, capacity=burst)
+
+
+# Defaults follow the free-tier quotas we run on; set *_RATE_LIMIT_RPM=0 to disable a limit.
+provider_limits = {
+    "gemini": _bucket_from_env("GEMINI", 60),
+    "openrouter": _bucket_from_env("OPENROUTER", 200),
+}
+
+
+async def acquire(provider: str) -> None:
+    bucket = provider_limits.get(provider)
+    if bucket is not None:
+        await bucket.acquire()
+
+
+def get_status() -> Dict[str, Any]:
+    return {provider: bucket.get_status() for provider, bucket in provider_limits.items()}
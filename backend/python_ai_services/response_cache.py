@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".cache")
+
+# Options that change what the model returns; anything else (cache flags, tenant ids) is ignored.
+KEY_OPTIONS = ("provider", "model", "temperature", "maxTokens", "json")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def normalize_prompt(prompt: str) -> str:
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def cache_key(prompt: str, options: Dict[str, Any]) -> str:
+    material = {"prompt": normalize_prompt(prompt)}
+    material.update({name: options[name] for name in KEY_OPTIONS if options.get(name) is not None})
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache for generate() results: in-process LRU in front of SQLite.
+
+    The SQLite file runs in WAL mode so several uvicorn workers on the same
+    host can share it. Entries expire after ``ttl`` seconds in both tiers.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        max_entries: int = 1000,
+        ttl: float = 24 * 3600,
+        max_temperature: float = 0.7,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_purge = 0
+        self.stats = {"memoryHits": 0, "diskHits": 0, "misses": 0, "skipped": 0, "writes": 0}
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def cacheable(self, options: Dict[str, Any]) -> bool:
+        if options.get("cache") is False:
+            return False
+        temperature = options.get("temperature")
+        return temperature is None or float(temperature) <= self.max_temperature
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return value
+
+    def _memory_set(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        if not self.path:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[1], json.loads(row[0])
+
+    def _disk_set(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        if not self.path:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            self._writes_since_purge += 1
+            if self._writes_since_purge >= 100:
+                conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+                self._writes_since_purge = 0
+
+    def get(self, prompt: str, options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self.cacheable(options) or options.get("refreshCache"):
+            self.stats["skipped"] += 1
+            return None
+        key = cache_key(prompt, options)
+        value = self._memory_get(key)
+        if value is not None:
+            self.stats["memoryHits"] += 1
+            return {**value, "cached": True}
+        entry = self._disk_get(key)
+        if entry is not None:
+            expires_at, value = entry
+            self._memory_set(key, value, expires_at)
+            self.stats["diskHits"] += 1
+            return {**value, "cached": True}
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, prompt: str, options: Dict[str, Any], value: Dict[str, Any]) -> None:
+        if not self.cacheable(options):
+            return
+        key = cache_key(prompt, options)
+        expires_at = time.time() + self.ttl
+        self._memory_set(key, value, expires_at)
+        self._disk_set(key, value, expires_at)
+        self.stats["writes"] += 1
+
+    async def aget(self, prompt: str, options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, prompt, options)
+
+    async def aset(self, prompt: str, options: Dict[str, Any], value: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.set, prompt, options, value)
+
+    def get_status(self) -> Dict[str, Any]:
+        hits = self.stats["memoryHits"] + self.stats["diskHits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hits": hits,
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+            "memoryEntries": len(self._memory),
+            "maxEntries": self.max_entries,
+            "persistent": bool(self.path),
+        }
+
+
+response_cache = ResponseCache(
+    path=None if os.getenv("RESPONSE_CACHE_DISK") == "0" else (
+        os.getenv("RESPONSE_CACHE_PATH") or os.path.join(CACHE_DIR, "responses.sqlite")
+    ),
+    max_entries=int(_env_float("RESPONSE_CACHE_MAX_ENTRIES", 1000)),
+    ttl=_env_float("RESPONSE_CACHE_TTL", 24 * 3600),
+    max_temperature=_env_float("RESPONSE_CACHE_MAX_TEMPERATURE", 0.7),
+)
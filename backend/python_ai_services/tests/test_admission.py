@@ -0,0 +1,11 @@
+from app import _with_admission
+
+
+def test_options_cannot_raise_priority_or_pick_a_tenant():
+    options = _with_admission({"priority": "interactive", "tenant": "other-school", "model": "m"}, "bulk", "school-a")
+    assert options == {"priority": "bulk", "tenant": "school-a", "model": "m"}
+
+
+def test_options_may_lower_priority():
+    assert _with_admission({"priority": "bulk"}, "interactive", None)["priority"] == "bulk"
+    assert _with_admission({"priority": "urgent"}, "standard", None)["priority"] == "standard"
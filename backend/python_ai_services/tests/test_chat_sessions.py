@@ -0,0 +1,56 @@
+import chat_sessions
+from chat_sessions import ChatSessionState, SessionStore
+
+
+def test_lru_eviction_spills_and_the_next_turn_restores_it(tmp_path):
+    store = SessionStore(max_sessions=2, spill_path=str(tmp_path / "sessions.sqlite"))
+    first = store.create("gemini")
+    first.append({"role": "user", "content": "What is osmosis?"})
+    first.summary = "Biology revision"
+    store.create("gemini")
+    store.create("openrouter")
+    assert store.get_status()["active"] == 2
+    assert store.stats["spilled"] == 1
+
+    restored = store.get(first.id)
+    assert restored is not first
+    assert restored.messages == [{"role": "user", "content": "What is osmosis?"}]
+    assert (restored.provider, restored.summary, restored.tokens) == ("gemini", "Biology revision", first.tokens)
+    assert restored.gemini is None
+    assert store.stats["reloaded"] == 1
+
+
+def test_eviction_without_a_spill_tier_drops_the_session():
+    store = SessionStore(max_sessions=1)
+    first = store.create("gemini")
+    store.create("gemini")
+    assert store.get(first.id) is None
+    assert store.stats["spilled"] == 0
+
+
+def test_idle_sessions_expire_in_memory_and_on_disk(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(chat_sessions.time, "time", lambda: now[0])
+    store = SessionStore(max_sessions=1, idle_ttl=60, spill_path=str(tmp_path / "sessions.sqlite"))
+    spilled = store.create("gemini")
+    kept = store.create("gemini")
+    now[0] += 61
+    assert store.get(kept.id) is None
+    assert store.get(spilled.id) is None
+    assert store.stats["expired"] == 2
+
+
+def test_trim_keeps_the_latest_turns_and_restore_rolls_back():
+    state = ChatSessionState("s", "gemini")
+    for i in range(10):
+        state.append({"role": "user" if i % 2 == 0 else "assistant", "content": "x" * 400})
+    snapshot = state.snapshot()
+    state.gemini = object()
+
+    dropped = state.trim(max_tokens=500)
+    assert dropped and state.messages == snapshot[0][len(dropped):]
+    assert state.tokens <= 500 * 3 // 4
+    assert state.gemini is None
+
+    state.restore(snapshot)
+    assert (state.messages, state.tokens) == (snapshot[0], snapshot[2])
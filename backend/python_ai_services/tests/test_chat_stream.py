@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+
+import ai_service
+import app
+from chat_sessions import SessionStore
+
+
+def test_session_stream_loads_the_session_once_and_summarizes_at_the_turn_priority(monkeypatch):
+    store = SessionStore()
+    monkeypatch.setattr(ai_service, "session_store", store)
+    monkeypatch.setattr(app, "session_store", store)
+    monkeypatch.setattr(ai_service, "CHAT_SESSION_MAX_TOKENS", 20)
+    monkeypatch.setattr(ai_service, "CHAT_SESSION_SUMMARIZE", True)
+    summaries = []
+
+    async def fake_generate(prompt, options):
+        summaries.append(options)
+        return {"text": "summary"}
+
+    async def fake_stream(messages, options, title):
+        yield {"type": "token", "text": "Hello"}
+        yield {"type": "done", "model": "m"}
+
+    monkeypatch.setattr(ai_service, "generate_async", fake_generate)
+    monkeypatch.setattr(ai_service, "_stream_openrouter", fake_stream)
+    state = store.create("openrouter")
+    for i in range(4):
+        state.append({"role": "user" if i % 2 == 0 else "assistant", "content": "earlier turn " * 5})
+
+    async def post():
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/chat/stream",
+                json={"sessionId": state.id, "messages": [{"role": "user", "content": "next"}],
+                      "options": {"priority": "bulk"}},
+                headers={"X-Tenant-Id": "school-a"},
+            )
+
+    response = asyncio.run(post())
+    assert response.status_code == 200
+    assert '"sessionId"' in response.text
+    assert store.stats["resumed"] == 1
+    assert summaries == [{"maxTokens": 300, "cache": False, "priority": "bulk", "tenant": "school-a"}]
+
+
+def test_expired_session_stream_is_a_404(monkeypatch):
+    monkeypatch.setattr(ai_service, "session_store", SessionStore())
+
+    async def post():
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/chat/stream", json={"sessionId": "gone", "messages": [{"role": "user", "content": "hi"}]}
+            )
+
+    assert asyncio.run(post()).status_code == 404
@@ -0,0 +1,30 @@
+import asyncio
+
+import ai_service
+
+
+def test_generate_only_coalesces_calls_of_the_same_priority(monkeypatch):
+    calls = []
+
+    async def fake_generate(prompt, options):
+        calls.append(options["priority"])
+        await asyncio.sleep(0.05)
+        return {"text": options["priority"]}
+
+    async def miss(prompt, options):
+        return None
+
+    monkeypatch.setattr(ai_service, "_generate_and_store", fake_generate)
+    monkeypatch.setattr(ai_service.response_cache, "aget", miss)
+
+    async def scenario():
+        return await asyncio.gather(
+            ai_service.generate_async("same prompt", {"priority": "bulk"}),
+            ai_service.generate_async("same prompt", {"priority": "standard"}),
+            ai_service.generate_async("same prompt", {"priority": "standard"}),
+        )
+
+    bulk, first, second = asyncio.run(scenario())
+    assert sorted(calls) == ["bulk", "standard"]
+    assert bulk["text"] == "bulk"
+    assert first["text"] == second["text"] == "standard"
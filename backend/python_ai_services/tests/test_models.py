@@ -0,0 +1,23 @@
+import asyncio
+
+import httpx
+
+import ai_service
+import app
+
+
+def test_models_endpoint_lists_openrouter_models(monkeypatch):
+    async def handler(request):
+        assert request.url.path.endswith("/models")
+        return httpx.Response(200, json={"data": [{"id": "m", "name": "Model", "context_length": 8192}]})
+
+    upstream = httpx.AsyncClient(base_url="http://openrouter.test", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(ai_service, "OPENROUTER_API_KEY", "key")
+    monkeypatch.setattr(ai_service, "get_async_client", lambda provider: upstream)
+
+    async def get():
+        async with upstream, httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://test") as client:
+            return await client.get("/models")
+
+    response = asyncio.run(get())
+    assert response.json() == {"models": [{"id": "m", "name": "Model", "context": 8192, "pricing": None}]}
@@ -0,0 +1,81 @@
+import asyncio
+
+import provider_router
+from provider_router import CircuitBreaker, ProviderRouter
+
+
+def test_breaker_opens_then_lets_one_probe_through_after_the_cooldown(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(provider_router.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # one probe at a time
+
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def route_events(event):
+    return provider_router.ROUTE_EVENTS._values.get((event,), 0)
+
+
+def test_open_circuit_is_skipped_for_the_next_candidate():
+    router = ProviderRouter(failure_threshold=1, cooldown=60)
+    before = {event: route_events(event) for event in ("fallback", "circuit_open")}
+    calls = []
+
+    async def call(provider, options):
+        calls.append(provider)
+        if provider == "gemini":
+            raise RuntimeError("503 from upstream")
+        return {"provider": provider}
+
+    candidates = [("gemini", {}), ("openrouter", {})]
+
+    async def scenario():
+        first = await router.route(candidates, call, pin_first=True)
+        second = await router.route(candidates, call, pin_first=True)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == {"provider": "openrouter"}
+    assert calls == ["gemini", "openrouter", "openrouter"]
+    assert router.get_status()["candidates"]["gemini:default"]["state"] == "open"
+    assert route_events("fallback") - before["fallback"] == 1
+    assert route_events("circuit_open") - before["circuit_open"] == 1
+
+
+def test_hedge_winner_cancels_the_slow_attempt():
+    router = ProviderRouter(hedge=True, hedge_min_delay=0.02, default_latency=0.02)
+    cancelled = []
+
+    async def call(provider, options):
+        if provider == "slow":
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(provider)
+                raise
+        return {"provider": provider}
+
+    async def scenario():
+        result = await router.route([("slow", {}), ("fast", {})], call, pin_first=True)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == {"provider": "fast"}
+    assert cancelled == ["slow"]
+    # Losing the race is not a failure of the slow provider.
+    assert router.breakers["slow:default"].state == "closed"
+    assert router.breakers["slow:default"].failures == 0
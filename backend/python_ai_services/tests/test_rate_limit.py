@@ -0,0 +1,24 @@
+import asyncio
+
+import httpx
+
+import ai_service
+import rate_limit
+
+
+def test_chat_call_takes_a_rate_limit_token(monkeypatch):
+    async def handler(request):
+        return httpx.Response(200, json={"model": "test", "choices": [{"message": {"content": "hi"}}]})
+
+    client = httpx.AsyncClient(base_url="http://openrouter.test", transport=httpx.MockTransport(handler))
+    bucket = rate_limit.TokenBucket(rate=1, capacity=5)
+    monkeypatch.setitem(rate_limit.provider_limits, "openrouter", bucket)
+    monkeypatch.setattr(ai_service, "get_async_client", lambda provider: client)
+
+    async def scenario():
+        async with client:
+            return await ai_service.chat_with_openrouter_async([{"role": "user", "content": "hello"}])
+
+    result = asyncio.run(scenario())
+    assert result["text"] == "hi"
+    assert bucket.stats["acquired"] == 1
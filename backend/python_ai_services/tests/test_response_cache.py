@@ -0,0 +1,49 @@
+import response_cache
+from response_cache import ResponseCache, cache_key
+
+
+def test_key_ignores_whitespace_and_options_that_do_not_change_the_answer():
+    options = {"model": "gemini", "temperature": 0.2}
+    key = cache_key("Explain  photosynthesis\n", options)
+    assert key == cache_key(" Explain photosynthesis", {**options, "tenant": "a", "cache": True, "priority": "bulk"})
+    assert key != cache_key("Explain photosynthesis", {**options, "temperature": 0.3})
+    assert key != cache_key("Explain photosynthesis", {**options, "model": "other"})
+
+
+def test_disk_hit_survives_a_new_process(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    ResponseCache(path).set("prompt", {}, {"text": "answer"})
+
+    cache = ResponseCache(path)
+    assert cache.get("prompt", {}) == {"text": "answer", "cached": True}
+    assert cache.get("prompt", {}) == {"text": "answer", "cached": True}
+    assert (cache.stats["diskHits"], cache.stats["memoryHits"]) == (1, 1)
+
+
+def test_entries_expire_in_both_tiers(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), ttl=60)
+    cache.set("prompt", {}, {"text": "answer"})
+    now[0] += 61
+    assert cache.get("prompt", {}) is None
+    assert cache.stats["misses"] == 1
+
+
+def test_hot_or_opted_out_requests_are_not_cached():
+    cache = ResponseCache(None, max_temperature=0.7)
+    cache.set("prompt", {"temperature": 0.9}, {"text": "creative"})
+    cache.set("prompt", {"cache": False}, {"text": "fresh"})
+    assert cache.get("prompt", {}) is None
+    cache.set("prompt", {}, {"text": "answer"})
+    assert cache.get("prompt", {"refreshCache": True}) is None
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResponseCache(None, max_entries=2)
+    for prompt in ("a", "b"):
+        cache.set(prompt, {}, {"text": prompt})
+    cache.get("a", {})
+    cache.set("c", {}, {"text": "c"})
+    assert cache.get("b", {}) is None
+    assert cache.get("a", {}) == {"text": "a", "cached": True}
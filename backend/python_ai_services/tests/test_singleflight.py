@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight, SingleFlightTimeout
+
+
+def test_followers_share_the_leader_failure_and_the_key_is_freed():
+    flight = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append("fail")
+        await asyncio.sleep(0.02)
+        raise RuntimeError("upstream down")
+
+    async def succeeding():
+        calls.append("ok")
+        return "answer"
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+        return results, await flight.do("key", succeeding)
+
+    results, retried = asyncio.run(scenario())
+    assert calls == ["fail", "ok"]
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retried == "answer"
+    assert flight.get_status()["inFlight"] == 0
+
+
+def test_follower_times_out_without_cancelling_the_leader():
+    flight = SingleFlight(wait_timeout=0.02)
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "answer"
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do("key", slow))
+        await asyncio.sleep(0)
+        with pytest.raises(SingleFlightTimeout):
+            await flight.do("key", slow)
+        return await leader
+
+    assert asyncio.run(scenario()) == "answer"
+    assert flight.stats == {"leaders": 1, "coalesced": 1, "timeouts": 1}
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do("key", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("key", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == "answer"
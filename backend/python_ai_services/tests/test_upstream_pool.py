@@ -0,0 +1,69 @@
+import asyncio
+
+from websockets.protocol import State
+
+from upstream_pool import UpstreamPool
+
+
+class FakeSocket:
+    def __init__(self):
+        self.state = State.OPEN
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def recv(self):
+        return '{"setupComplete": {}}'
+
+    async def close(self):
+        self.state = State.CLOSED
+
+
+def make_pool(**kwargs):
+    async def connect():
+        return FakeSocket()
+
+    return UpstreamPool(connect, lambda grade, subject: f"setup {grade} {subject}", health_interval=3600, **kwargs)
+
+
+async def settle(pool):
+    while pool._refill_task and not pool._refill_task.done():
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+def test_idle_keys_expire_but_prewarm_keys_stay():
+    async def scenario():
+        pool = make_pool(key_ttl=0.05)
+        await pool.start([("Grade 10", "Science")])
+        (await pool.acquire("Grade 8", "History")).ws.state = State.CLOSED
+        await settle(pool)
+        assert set(pool._keys) == {("Grade 10", "Science"), ("Grade 8", "History")}
+        history = list(pool._idle[("Grade 8", "History")])
+
+        await asyncio.sleep(0.1)
+        pool._schedule_refill()
+        await settle(pool)
+        assert set(pool._keys) == {("Grade 10", "Science")}
+        assert ("Grade 8", "History") not in pool._idle
+        assert all(session.ws.state is State.CLOSED for session in history)
+        assert pool.stats["keysExpired"] == 1
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_refused_keys_are_served_but_not_kept_warm():
+    async def scenario():
+        pool = make_pool(allow_key=lambda key: key[1] in {"Science", "Mathematics"})
+        await pool.start()
+        session = await pool.acquire("Grade 9", "x" * 5000)
+        assert session.ws.sent == ["setup Grade 9 " + "x" * 5000]
+        await pool.acquire("Grade 9", "Science")
+        await settle(pool)
+        assert list(pool._keys) == [("Grade 9", "Science")]
+        assert pool.stats["keysRefused"] == 1
+        await pool.close()
+
+    asyncio.run(scenario())
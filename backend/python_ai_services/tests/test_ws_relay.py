@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+from ws_relay import Channel, is_audio
+
+AUDIO = json.dumps({"serverContent": {"modelTurn": {"parts": [{"inlineData": {"data": "AAAA"}}]}}}).encode()
+TOOL_CALL = json.dumps({"toolCall": {"functionCalls": [{"name": "report_gaps", "args": {}}]}}).encode()
+TURN_COMPLETE = json.dumps({"serverContent": {"turnComplete": True}}).encode()
+
+
+def test_binary_control_frames_are_not_audio():
+    assert is_audio(AUDIO)
+    assert is_audio(memoryview(AUDIO))
+    assert not is_audio(TOOL_CALL)
+    assert not is_audio(memoryview(TURN_COMPLETE))
+    assert not is_audio(b'{"setupComplete":{}}')
+
+
+def test_drop_policy_keeps_binary_tool_call_on_full_channel():
+    async def scenario():
+        sent = []
+
+        async def send(frame):
+            sent.append(bytes(frame))
+
+        channel = Channel("downstream", send, max_frames=2, max_bytes=1 << 20, policy="drop")
+        await channel.put(TOOL_CALL)
+        await channel.put(AUDIO)
+        # Full: the next frames may only push out audio, never the tool call.
+        await channel.put(TURN_COMPLETE)
+        assert channel.stats.counters["dropped"] == 1
+
+        blocked = asyncio.create_task(channel.put(AUDIO))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()  # nothing droppable left, so the writer waits
+
+        writer = asyncio.create_task(channel.run())
+        await blocked
+        while len(sent) < 3:
+            await asyncio.sleep(0.01)
+        writer.cancel()
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert sent == [TOOL_CALL, TURN_COMPLETE, AUDIO]
@@ -0,0 +1,245 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from websockets.protocol import State
+
+
+Key = Tuple[str, str]  # (grade, subject)
+ConnectFn = Callable[[], Awaitable[Any]]
+SetupFn = Callable[[str, str], str]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _percentile(samples: Deque[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 4)
+
+
+@dataclass
+class PooledSession:
+    ws: Any
+    key: Optional[Key]
+    created_at: float
+    # Upstream's reply to the setup message; replayed to the client of a pre-setup session.
+    setup_reply: Any = None
+
+
+class UpstreamPool:
+    """Idle upstream WebSocket sessions, ready before a student connects.
+
+    Two tiers: sessions already set up for a recently requested
+    ``(grade, subject)`` (a hit skips DNS, TLS, the upgrade and the setup
+    round trip), and bare connections that only need the setup message sent.
+    Idle sessions older than ``max_idle`` or failing a ping are closed, and
+    both tiers are refilled in the background.
+
+    Requested keys come from clients, so a key is only kept warm if
+    ``allow_key`` accepts it, and stops being kept warm once it has gone
+    ``key_ttl`` seconds without an acquire. Prewarm keys are kept for good.
+    """
+
+    def __init__(
+        self,
+        connect: ConnectFn,
+        build_setup: SetupFn,
+        size: int = 1,
+        bare: int = 1,
+        max_keys: int = 8,
+        max_idle: float = 60.0,
+        health_interval: float = 15.0,
+        setup_timeout: float = 10.0,
+        key_ttl: float = 600.0,
+        allow_key: Optional[Callable[[Key], bool]] = None,
+    ):
+        self.connect = connect
+        self.build_setup = build_setup
+        self.size = size
+        self.bare = bare
+        self.max_keys = max_keys
+        self.max_idle = max_idle
+        self.health_interval = health_interval
+        self.setup_timeout = setup_timeout
+        self.key_ttl = key_ttl
+        self.allow_key = allow_key
+        self._pinned: Set[Key] = set()
+        self._idle: Dict[Optional[Key], Deque[PooledSession]] = {}
+        self._keys: "OrderedDict[Key, float]" = OrderedDict()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "bareHits": 0, "misses": 0, "connectFailures": 0, "expired": 0,
+                      "keysRefused": 0, "keysExpired": 0}
+        self.ready_latency: Deque[float] = deque(maxlen=200)
+        self.first_audio_latency: Deque[float] = deque(maxlen=200)
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0 or self.bare > 0
+
+    async def start(self, prewarm: List[Key] = ()) -> None:
+        if not self.enabled:
+            return
+        for key in prewarm:
+            self._pinned.add(key)
+            self._remember(key)
+        self._schedule_refill()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        for task in (self._refill_task, self._health_task):
+            if task:
+                task.cancel()
+        for queue in self._idle.values():
+            while queue:
+                await self._close(queue.popleft())
+
+    async def acquire(self, grade: str, subject: str) -> PooledSession:
+        """A session with setup for ``(grade, subject)`` sent; the caller owns and closes it."""
+        key = (grade, subject)
+        started = time.monotonic()
+        if self.enabled:
+            if key in self._pinned or self.allow_key is None or self.allow_key(key):
+                self._remember(key)
+            else:
+                self.stats["keysRefused"] += 1
+        session = self._take(key)
+        if session is not None:
+            self.stats["hits"] += 1
+        else:
+            session = self._take(None)
+            if session is not None:
+                self.stats["bareHits"] += 1
+            else:
+                self.stats["misses"] += 1
+                session = PooledSession(await self.connect(), None, time.monotonic())
+            await session.ws.send(self.build_setup(grade, subject))
+            session.key = key
+        self.ready_latency.append(time.monotonic() - started)
+        if self.enabled:
+            self._schedule_refill()
+        return session
+
+    def record_first_audio(self, seconds: float) -> None:
+        self.first_audio_latency.append(seconds)
+
+    def _remember(self, key: Key) -> None:
+        self._keys[key] = time.monotonic()
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_keys:
+            old, _ = self._keys.popitem(last=False)
+            self._forget(old)
+
+    def _forget(self, key: Key) -> None:
+        self._keys.pop(key, None)
+        for session in self._idle.pop(key, ()):
+            asyncio.create_task(self._close(session))
+
+    def _expire_keys(self) -> None:
+        cutoff = time.monotonic() - self.key_ttl
+        for key, last_acquired in list(self._keys.items()):
+            if last_acquired < cutoff and key not in self._pinned:
+                self.stats["keysExpired"] += 1
+                self._forget(key)
+
+    def _healthy(self, session: PooledSession) -> bool:
+        return session.ws.state is State.OPEN and time.monotonic() - session.created_at < self.max_idle
+
+    def _take(self, key: Optional[Key]) -> Optional[PooledSession]:
+        queue = self._idle.get(key)
+        while queue:
+            session = queue.popleft()
+            if self._healthy(session):
+                return session
+            self.stats["expired"] += 1
+            asyncio.create_task(self._close(session))
+        return None
+
+    async def _open(self, key: Optional[Key]) -> PooledSession:
+        ws = await self.connect()
+        session = PooledSession(ws, key, time.monotonic())
+        if key is not None:
+            try:
+                await ws.send(self.build_setup(*key))
+                session.setup_reply = await asyncio.wait_for(ws.recv(), self.setup_timeout)
+            except BaseException:
+                await ws.close()
+                raise
+        return session
+
+    async def _close(self, session: PooledSession) -> None:
+        try:
+            await session.ws.close()
+        except Exception:
+            pass
+
+    def _schedule_refill(self) -> None:
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        self._expire_keys()
+        targets: List[Tuple[Optional[Key], int]] = [(None, self.bare)]
+        targets += [(key, self.size) for key in reversed(self._keys)]  # most recently requested first
+        for key, target in targets:
+            queue = self._idle.setdefault(key, deque())
+            while len(queue) < target:
+                try:
+                    session = await self._open(key)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    # Back off until the next health check rather than hammering a failing upstream.
+                    self.stats["connectFailures"] += 1
+                    return
+                if key is not None and key not in self._keys:
+                    await self._close(session)
+                    break
+                queue.append(session)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for queue in list(self._idle.values()):
+                for session in list(queue):
+                    if self._healthy(session) and await self._ping(session):
+                        continue
+                    if session in queue:
+                        queue.remove(session)
+                        self.stats["expired"] += 1
+                        await self._close(session)
+            self._schedule_refill()
+
+    async def _ping(self, session: PooledSession) -> bool:
+        try:
+            pong = await session.ws.ping()
+            await asyncio.wait_for(pong, 5)
+            return True
+        except Exception:
+            return False
+
+    def get_status(self) -> Dict[str, Any]:
+        acquired = self.stats["hits"] + self.stats["bareHits"] + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "sizePerKey": self.size,
+            "bare": self.bare,
+            "maxIdle": self.max_idle,
+            "idle": {"/".join(key) if key else "bare": len(queue) for key, queue in self._idle.items()},
+            **self.stats,
+            "hitRate": round(self.stats["hits"] / acquired, 4) if acquired else 0.0,
+            "readyP50": _percentile(self.ready_latency, 0.5),
+            "readyP95": _percentile(self.ready_latency, 0.95),
+            "firstAudioP50": _percentile(self.first_audio_latency, 0.5),
+            "firstAudioP95": _percentile(self.first_audio_latency, 0.95),
+        }
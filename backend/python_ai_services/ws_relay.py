@@ -0,0 +1,213 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, Union
+
+import metrics
+
+Frame = Union[str, bytes, memoryview]
+SendFn = Callable[[Frame], Awaitable[None]]
+
+# Exactly what the browser's JSON.stringify writes for one microphone chunk in VoiceTutor.tsx.
+AUDIO_INPUT_PREFIX = '{"realtimeInput":{"mediaChunks":['
+AUDIO_INPUT_SUFFIX = "]}}"
+POLICIES = ("block", "drop", "close")
+
+RELAY_BYTES = metrics.counter("voice_relay_bytes_total", "Bytes relayed by /gemini-stream.", ("direction",))
+RELAY_MESSAGES = metrics.counter("voice_relay_messages_total", "Messages relayed by /gemini-stream.", ("direction",))
+RELAY_DROPPED = metrics.counter("voice_relay_dropped_total", "Audio frames dropped on a full relay queue.", ("direction",))
+
+
+class SlowConsumer(Exception):
+    pass
+
+
+def frame_size(frame: Frame) -> int:
+    # len() of a str counts characters; close enough for a memory bound on ASCII JSON.
+    return frame.nbytes if isinstance(frame, memoryview) else len(frame)
+
+
+def is_audio(frame: Frame) -> bool:
+    """Audio-bearing frames are the only ones a drop policy may discard."""
+    if isinstance(frame, str):
+        return frame.startswith(AUDIO_INPUT_PREFIX) or '"inlineData"' in frame
+    # Gemini Live sends its JSON (setupComplete, toolCall, turnComplete) as binary
+    # frames too, so bytes only count as audio when they carry inline audio data.
+    if isinstance(frame, memoryview):
+        frame = frame.obj if isinstance(frame.obj, bytes) and frame.nbytes == len(frame.obj) else frame.tobytes()
+    return b'"inlineData"' in frame
+
+
+def is_coalescable(frame: Frame) -> bool:
+    return isinstance(frame, str) and frame.startswith(AUDIO_INPUT_PREFIX) and frame.endswith(AUDIO_INPUT_SUFFIX)
+
+
+def coalesce(frames: list) -> str:
+    """Splice several single-message mic chunks into one realtimeInput with all their mediaChunks.
+
+    Pure string slicing: the base64 payloads are neither decoded nor re-encoded.
+    """
+    start, end = len(AUDIO_INPUT_PREFIX), -len(AUDIO_INPUT_SUFFIX)
+    return AUDIO_INPUT_PREFIX + ",".join(frame[start:end] for frame in frames) + AUDIO_INPUT_SUFFIX
+
+
+class RelayStats:
+    def __init__(self):
+        self.counters: Dict[str, int] = {
+            "messages": 0,
+            "bytes": 0,
+            "sent": 0,
+            "dropped": 0,
+            "coalesced": 0,
+        }
+
+    def add(self, other: "RelayStats") -> None:
+        for name, value in other.counters.items():
+            self.counters[name] += value
+
+
+class Channel:
+    """One relay direction: a frame- and byte-bounded queue drained by a single writer.
+
+    When the queue is full, ``block`` makes the reader wait (backpressure flows
+    on to the source socket), ``drop`` discards the oldest queued audio frame,
+    and ``close`` raises ``SlowConsumer`` so the session is closed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        send: SendFn,
+        max_frames: int,
+        max_bytes: int,
+        policy: str = "block",
+        coalesce_window: float = 0.0,
+        coalesce_max_bytes: int = 64 * 1024,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy}'; use one of {POLICIES}")
+        self.name = name
+        self.send = send
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.coalesce_window = coalesce_window
+        self.coalesce_max_bytes = coalesce_max_bytes
+        self.stats = RelayStats()
+        self._frames: Deque[Tuple[Frame, int]] = deque()
+        self._bytes = 0
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    def _full(self, size: int) -> bool:
+        return bool(self._frames) and (len(self._frames) >= self.max_frames or self._bytes + size > self.max_bytes)
+
+    async def put(self, frame: Frame) -> None:
+        size = frame_size(frame)
+        self.stats.counters["messages"] += 1
+        self.stats.counters["bytes"] += size
+        RELAY_MESSAGES.inc(direction=self.name)
+        RELAY_BYTES.inc(size, direction=self.name)
+        while self._full(size):
+            if self.policy == "close":
+                raise SlowConsumer("relay queue full")
+            if self.policy == "drop" and self._drop_oldest_audio():
+                continue
+            self._writable.clear()
+            await self._writable.wait()
+        self._frames.append((frame, size))
+        self._bytes += size
+        self._readable.set()
+
+    def _drop_oldest_audio(self) -> bool:
+        for index, (frame, size) in enumerate(self._frames):
+            if is_audio(frame):
+                del self._frames[index]
+                self._bytes -= size
+                self.stats.counters["dropped"] += 1
+                RELAY_DROPPED.inc(direction=self.name)
+                return True
+        return False
+
+    def _pop(self) -> Frame:
+        frame, size = self._frames.popleft()
+        self._bytes -= size
+        self._writable.set()
+        return frame
+
+    async def _next(self) -> Frame:
+        while not self._frames:
+            self._readable.clear()
+            await self._readable.wait()
+        return self._pop()
+
+    async def run(self) -> None:
+        while True:
+            frame = await self._next()
+            if self.coalesce_window > 0 and is_coalescable(frame):
+                frame = await self._gather(frame)
+            await self.send(frame)
+            self.stats.counters["sent"] += 1
+
+    async def _gather(self, first: str) -> str:
+        """Collect mic chunks that arrive within the window (or are already queued) into one frame."""
+        batch = [first]
+        size = len(first)
+        deadline = time.monotonic() + self.coalesce_window
+        while size < self.coalesce_max_bytes:
+            if not self._frames:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._readable.clear()
+                try:
+                    await asyncio.wait_for(self._readable.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                continue
+            frame, frame_bytes = self._frames[0]
+            if not is_coalescable(frame) or size + frame_bytes > self.coalesce_max_bytes:
+                break
+            batch.append(self._pop())
+            size += frame_bytes
+        if len(batch) == 1:
+            return first
+        self.stats.counters["coalesced"] += len(batch) - 1
+        return coalesce(batch)
+
+
+class SessionLimiter:
+    """Per-process cap on concurrent relay sessions, plus totals across finished ones."""
+
+    def __init__(self, max_sessions: int):
+        self.max_sessions = max_sessions
+        self.active = 0
+        self.rejected = 0
+        self.completed = 0
+        self.totals = {"upstream": RelayStats(), "downstream": RelayStats()}
+
+    def try_acquire(self) -> bool:
+        if self.max_sessions and self.active >= self.max_sessions:
+            self.rejected += 1
+            return False
+        self.active += 1
+        return True
+
+    def release(self, upstream: Optional[Channel] = None, downstream: Optional[Channel] = None) -> None:
+        self.active -= 1
+        self.completed += 1
+        if upstream:
+            self.totals["upstream"].add(upstream.stats)
+        if downstream:
+            self.totals["downstream"].add(downstream.stats)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "activeSessions": self.active,
+            "maxSessions": self.max_sessions,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "upstream": dict(self.totals["upstream"].counters),
+            "downstream": dict(self.totals["downstream"].counters),
+        }
@@ -0,0 +1,95 @@
+"""
+Benchmark: streaming DOCX extraction vs. the old python-docx paragraph loop.
+
+Run from python-service/:
+    python -m benchmarks.bench_docx_extraction --paragraphs 20000 80000
+
+Every synthetic document has a worksheet table per chapter. Each measurement
+runs in a fresh interpreter and reports wall time, peak RSS growth over the
+interpreter's baseline (python-docx's lxml tree lives outside the Python
+allocator, so tracemalloc would miss it), and the characters extracted. The
+old path reads paragraphs only, so its character count leaves out tables.
+"""
+import argparse
+import importlib
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from benchmarks.fixtures import make_docx
+
+
+def extract_python_docx(path: str) -> str:
+    """The previous implementation: the whole document as a python-docx object model."""
+    from docx import Document
+
+    doc = Document(path)
+    text = ""
+    for para in doc.paragraphs:
+        text += para.text + "\n"
+    return text
+
+
+def extract_streaming(path: str, max_chars: Optional[int] = None) -> str:
+    from docx_extraction import extract_docx
+
+    return extract_docx(path, max_chars=max_chars).text
+
+
+def _status_mb(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _measure(method: str, path: str, budget: Optional[int]) -> Tuple[float, float, int]:
+    """Runs in a fresh process: (seconds, peak RSS growth in MB, characters)."""
+    # Import the method's parser first, so its import cost is not billed to the extraction.
+    importlib.import_module("docx" if method == "python-docx" else "docx_extraction")
+    # Reset the RSS high-water mark so only the extraction's peak counts.
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    baseline = _status_mb("VmRSS")
+    started = time.perf_counter()
+    text = extract_python_docx(path) if method == "python-docx" else extract_streaming(path, budget)
+    elapsed = time.perf_counter() - started
+    return elapsed, _status_mb("VmHWM") - baseline, len(text)
+
+
+def measure(label: str, method: str, path: str, budget: Optional[int] = None) -> None:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        elapsed, peak_mb, chars = pool.submit(_measure, method, path, budget).result()
+    print(f"  {label:<30} {elapsed * 1000:9.1f} ms   peak RSS +{peak_mb:7.1f} MB   {chars:>10} chars")
+
+
+def run(paragraph_counts, table_rows: int, budget: int) -> None:
+    for paragraphs in paragraph_counts:
+        content = make_docx(paragraphs, table_rows=table_rows)
+        fd, path = tempfile.mkstemp(suffix=".docx")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        try:
+            print(f"{paragraphs} paragraphs, {table_rows}-row table per chapter ({len(content) / 1e6:.1f} MB zipped)")
+            measure("python-docx paragraphs (old)", "python-docx", path)
+            measure("streaming", "streaming", path)
+            measure(f"streaming, {budget} char budget", "streaming", path, budget)
+        finally:
+            os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[20000, 80000])
+    parser.add_argument("--table-rows", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=288000, help="characters; the service uses MAX_DOCUMENT_CHARS")
+    args = parser.parse_args()
+    run(args.paragraphs, args.table_rows, args.budget)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark: server-side mindmap layout on large merged graphs.
+
+Run from python-service/:
+    python -m benchmarks.bench_layout --nodes 1000 5000 --repeat 20
+
+Builds random trees the shape of a merged chunked mindmap (a root with one
+sub-root per chunk, bushy branches) plus a few cross-links, then times cold
+``compute_positions`` for both layouts and the cached ``layout_graph`` path.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from mindmap_layout import LAYOUTS, compute_positions, layout_graph
+
+
+def merged_graph(count: int, chunks: int = 12, cross_links: float = 0.05, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    nodes = [{"id": "root", "label": "Document", "type": "input"}]
+    edges = []
+    for i in range(1, count):
+        parent = nodes[rng.randrange(0, min(i, chunks + 1)) if i <= chunks else rng.randrange(1, i)]["id"]
+        nodes.append({"id": str(i), "label": f"Concept {i}"})
+        edges.append({"source": parent, "target": str(i)})
+    for _ in range(int(count * cross_links)):
+        a, b = rng.randrange(1, count), rng.randrange(1, count)
+        edges.append({"source": str(a), "target": str(b)})
+    return {"nodes": nodes, "edges": edges}
+
+
+def timed(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for count in args.nodes:
+        graph = merged_graph(count)
+        for algorithm in LAYOUTS:
+            cold = timed(lambda: compute_positions(graph, algorithm), args.repeat)
+            layout_graph(graph, algorithm)
+            cached = timed(lambda: layout_graph(graph, algorithm), args.repeat)
+            print(f"{count:>6} nodes {algorithm:>6}: compute median {statistics.median(cold):7.2f} ms "
+                  f"(max {max(cold):7.2f}), cached median {statistics.median(cached):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main_cli()
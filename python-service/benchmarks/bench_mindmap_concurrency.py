@@ -0,0 +1,121 @@
+"""
+Concurrency timings: N simultaneous mindmap requests against mocked providers.
+
+Run from python-service/:
+    python -m benchmarks.bench_mindmap_concurrency --requests 50 --latency 0.5
+
+The app runs in-process, driven through httpx's ASGI transport. Gemini's
+model handle is replaced by a fake whose ``generate_content_async`` sleeps
+``--latency`` seconds, and OpenRouter answers through an ``httpx.MockTransport``
+with the same delay. ``--requests`` distinct text mindmaps are sent at once
+(scheduler caps are lifted, so only the providers limit concurrency) while
+/health is polled to catch event-loop stalls. Scenarios:
+
+- ``gemini``: Gemini answers every call.
+- ``fallback``: Gemini fails every call at once (a 503) and the OpenRouter chain answers.
+- ``timeout``: Gemini hangs past ``MINDMAP_TIMEOUT`` and every request gets 504.
+
+With a non-blocking path, the first two finish in about one ``--latency`` and
+the third in about one timeout. The script exits non-zero otherwise. The same
+scenarios run at a small scale as a regression test in
+``tests/test_mindmap_concurrency.py``; this script is for the timing numbers.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-concurrency-")
+os.environ.update({
+    "GEMINI_API_KEY": "bench",
+    "OPENROUTER_API_KEY": "bench",
+    "GEMINI_MAX_IN_FLIGHT": "0",
+    "OPENROUTER_MAX_IN_FLIGHT": "0",
+    "JOB_DB_PATH": os.path.join(WORKDIR, "jobs.sqlite"),
+    "DOCUMENT_CACHE_PATH": os.path.join(WORKDIR, "documents.sqlite"),
+    "SEMANTIC_CACHE_PATH": os.path.join(WORKDIR, "semantic"),
+})
+os.environ.pop("GEMINI_API_ENDPOINT", None)
+
+import httpx  # noqa: E402
+
+from benchmarks.fixtures import FakeGeminiModel, openrouter_transport  # noqa: E402
+
+
+async def run_scenario(main, scenario: str, requests: int, latency: float, timeout: float) -> bool:
+    import gemini_client
+    import providers
+
+    gemini_latency = timeout + latency if scenario == "timeout" else latency
+    fake = FakeGeminiModel(gemini_latency, fail=scenario == "fallback")
+    gemini_client.get_model = lambda name: fake
+    gemini_client._genai = gemini_client._genai or object()  # skip the SDK import; the fake needs none
+    await providers.close()
+    providers._client = httpx.AsyncClient(base_url=providers.OPENROUTER_BASE_URL, transport=openrouter_transport(latency))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout * 4) as client:
+        stalls = []
+        running = True
+
+        async def probe_health():
+            while running:
+                started = time.perf_counter()
+                await client.get("/health")
+                stalls.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        async def one(index: int):
+            started = time.perf_counter()
+            response = await client.post(
+                "/generate-mindmap-from-text", json={"text": f"{scenario} lesson {index} on the water cycle"}
+            )
+            return response.status_code, time.perf_counter() - started
+
+        probe = asyncio.create_task(probe_health())
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+        running = False
+        await probe
+
+    expected_status = 504 if scenario == "timeout" else 200
+    expected_seconds = timeout if scenario == "timeout" else latency
+    statuses = sorted({status for status, _ in results})
+    latencies = [seconds for _, seconds in results]
+    ok = statuses == [expected_status] and elapsed < expected_seconds * 1.5 + 0.1
+    print(
+        f"{scenario:>9}: {requests} requests in {elapsed * 1000:7.1f} ms "
+        f"(one upstream call {expected_seconds * 1000:.0f} ms)  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  max {max(latencies) * 1000:7.1f} ms  "
+        f"statuses {statuses}  slowest /health {max(stalls) * 1000:6.1f} ms  {'ok' if ok else 'FAIL'}"
+    )
+    return ok
+
+
+async def run(args: argparse.Namespace) -> bool:
+    os.environ["MINDMAP_TIMEOUT"] = str(args.timeout)
+    import main
+
+    ok = True
+    for scenario in args.scenarios:
+        ok &= await run_scenario(main, scenario, args.requests, args.latency, args.timeout)
+    return ok
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="mocked upstream latency in seconds")
+    parser.add_argument("--timeout", type=float, default=1.5, help="MINDMAP_TIMEOUT for the run")
+    parser.add_argument("--scenarios", nargs="+", choices=["gemini", "fallback", "timeout"],
+                        default=["gemini", "fallback", "timeout"])
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,99 @@
+"""
+Memory check: concurrent large uploads to /generate-mindmap.
+
+Run from python-service/:
+    python -m benchmarks.bench_upload_memory --concurrency 8 --size-mb 40
+
+Starts the service in-process with Gemini stubbed out, uploads
+``concurrency`` copies of a large synthetic PDF at once (streamed from disk
+by the client), and samples the process RSS. With uploads streamed to disk
+peak RSS growth should stay far below ``concurrency * size``; extraction
+happens in pool worker processes, which are not counted here.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+
+import main
+from benchmarks.fixtures import make_pdf
+
+PAGE_BYTES = 4700  # approximate size of one fixture page
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def upload(client: httpx.AsyncClient, path: str) -> int:
+    with open(path, "rb") as f:
+        response = await client.post("/generate-mindmap", files={"file": ("chapter.pdf", f, "application/pdf")})
+    return response.status_code
+
+
+async def run(concurrency: int, size_mb: int) -> None:
+    async def stub(prompt, priority="standard", tenant=None):
+        return {"nodes": [{"id": "root", "label": "Stub"}], "edges": []}
+
+    main.generate_mindmap_graph = stub
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(make_pdf(size_mb * 1024 * 1024 // PAGE_BYTES))
+    size = os.path.getsize(path) / 1e6
+
+    peak = baseline = rss_mb()
+    sampling = True
+
+    async def sampler():
+        nonlocal peak
+        while sampling:
+            peak = max(peak, rss_mb())
+            await asyncio.sleep(0.01)
+
+    sample_task = asyncio.create_task(sampler())
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=600) as client:
+        statuses = await asyncio.gather(*(upload(client, path) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sampling = False
+    await sample_task
+    server.should_exit = True
+    os.unlink(path)
+
+    print(f"{concurrency} concurrent uploads of {size:.1f} MB ({concurrency * size:.0f} MB total) in {elapsed:.1f}s")
+    print(f"statuses: {sorted(statuses)}")
+    print(f"RSS baseline {baseline:.0f} MB, peak {peak:.0f} MB, growth {peak - baseline:.0f} MB")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--size-mb", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.size_mb))
+
+
+if __name__ == "__main__":
+    main_cli()
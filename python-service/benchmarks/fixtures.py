@@ -0,0 +1,157 @@
+"""Synthetic documents and mock providers for the python-service benchmarks and tests."""
+import asyncio
+import io
+import json
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+WORDS = (
+    "photosynthesis chlorophyll energy light plant cell membrane nucleus mitochondria "
+    "equation fraction decimal ratio algebra geometry triangle angle history empire "
+    "revolution trade river climate monsoon soil erosion democracy constitution rights"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 16))]
+    return " ".join(words).capitalize() + "."
+
+
+def make_pdf(pages: int, lines_per_page: int = 40, seed: int = 7) -> bytes:
+    """Build a minimal multi-page PDF with a Helvetica text layer on every page."""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page_no in range(pages):
+        lines = [f"Chapter {page_no // 20 + 1} page {page_no + 1}"]
+        lines += [_sentence(rng) for _ in range(lines_per_page - 1)]
+        ops = ["BT", "/F1 10 Tf", "12 TL", "40 800 Td"]
+        for line in lines:
+            ops.append("(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        " ".join(f"{k} 0 R" for k in kids).encode(), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at)
+    return bytes(out)
+
+
+_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    "</Types>"
+)
+_DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    "</Relationships>"
+)
+
+
+def _docx_table(rng: random.Random, rows: int, cols: int = 3) -> str:
+    cell = "<w:tc><w:p><w:r><w:t>{}</w:t></w:r></w:p></w:tc>"
+    return "<w:tbl>" + "".join(
+        "<w:tr>" + "".join(cell.format(escape(_sentence(rng))) for _ in range(cols)) + "</w:tr>" for _ in range(rows)
+    ) + "</w:tbl>"
+
+
+def make_docx(paragraphs: int, seed: int = 7, table_rows: int = 0) -> bytes:
+    """Build a minimal DOCX (document part only) with one sentence-filled paragraph per entry.
+
+    With ``table_rows``, every chapter also gets a worksheet table of that many three-cell rows.
+    """
+    rng = random.Random(seed)
+    body = []
+    for index in range(paragraphs):
+        if index % 25 == 0:
+            body.append(f"<w:p><w:r><w:t>Chapter {index // 25 + 1}</w:t></w:r></w:p>")
+            if table_rows:
+                body.append(_docx_table(rng, table_rows))
+        text = " ".join(_sentence(rng) for _ in range(rng.randint(2, 5)))
+        body.append(f"<w:p><w:r><w:t>{escape(text)}</w:t></w:r></w:p>")
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        "<w:body>" + "".join(body) + "</w:body></w:document>"
+    )
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _DOCX_CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _DOCX_RELS)
+        archive.writestr("word/document.xml", document)
+    return out.getvalue()
+
+
+MINDMAP_JSON = json.dumps({
+    "nodes": [{"id": "root", "label": "Water cycle", "type": "input", "position": {"x": 0, "y": 0}}]
+    + [{"id": str(i), "label": f"Stage {i}", "position": {"x": 0, "y": 0}} for i in range(1, 8)],
+    "edges": [{"id": f"e{i}", "source": "root", "target": str(i)} for i in range(1, 8)],
+})
+
+
+class FakeGeminiResponse:
+    text = MINDMAP_JSON
+    usage_metadata = None
+    candidates = [None]
+    parts = [MINDMAP_JSON]
+
+
+class FakeGeminiModel:
+    """Stands in for a ``GenerativeModel``: answers ``MINDMAP_JSON`` after ``latency`` seconds, or fails at once."""
+
+    def __init__(self, latency: float, fail: bool = False):
+        self.latency = latency
+        self.fail = fail
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        if self.fail:
+            raise RuntimeError("503 The model is overloaded")
+        await asyncio.sleep(self.latency)
+        if stream:
+            return self._stream()
+        return FakeGeminiResponse()
+
+    async def _stream(self):
+        yield FakeGeminiResponse()
+
+
+def openrouter_transport(latency: float):
+    """An ``httpx.MockTransport`` answering OpenRouter chat completions with ``MINDMAP_JSON``."""
+    import httpx
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        model = json.loads(request.content)["model"]
+        return httpx.Response(200, json={"model": model, "choices": [{"message": {"content": MINDMAP_JSON}}]})
+
+    return httpx.MockTransport(handler)
@@ -0,0 +1,116 @@
+"""
+Content-addressed cache for uploaded documents.
+
+Keyed by the SHA-256 of the uploaded bytes, with two levels:
+  1. the extracted text, so a re-upload skips PDF/DOCX parsing;
+  2. the final mindmap for that content and model, so a re-upload skips Gemini.
+
+Both live in one local SQLite file. Text is zlib-compressed, and when the
+file grows past DOCUMENT_CACHE_MAX_MB the least recently used entries are
+evicted across both levels.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+DOCUMENT_CACHE_PATH = os.getenv("DOCUMENT_CACHE_PATH") or os.path.join(
+    os.path.dirname(__file__), ".cache", "documents.sqlite"
+)
+DOCUMENT_CACHE_MAX_BYTES = int(float(os.getenv("DOCUMENT_CACHE_MAX_MB") or 256) * 1024 * 1024)
+
+
+class DocumentCache:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"mindmapHits": 0, "textHits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, level TEXT NOT NULL, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return row[0] if row else None
+
+    def _put(self, key: str, level: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, level, value, size, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, level, value, len(value), time.time()),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # Evict least recently used entries until the store fits its budget again.
+            for old_key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+                total -= size
+                self.stats["evictions"] += 1
+
+    def get_mindmap(self, sha256: str, model: str) -> Optional[dict]:
+        value = self._get(f"mindmap:{model}:{sha256}")
+        if value is None:
+            return None
+        self.stats["mindmapHits"] += 1
+        return json.loads(value)
+
+    def put_mindmap(self, sha256: str, model: str, graph: dict) -> None:
+        self._put(f"mindmap:{model}:{sha256}", "mindmap", json.dumps(graph).encode("utf-8"))
+
+    def get_text(self, sha256: str) -> Optional[str]:
+        value = self._get(f"text:{sha256}")
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["textHits"] += 1
+        return zlib.decompress(value).decode("utf-8")
+
+    def put_text(self, sha256: str, text: str) -> None:
+        self._put(f"text:{sha256}", "text", zlib.compress(text.encode("utf-8"), 6))
+
+    async def aget_mindmap(self, sha256: str, model: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.get_mindmap, sha256, model)
+
+    async def aput_mindmap(self, sha256: str, model: str, graph: dict) -> None:
+        await asyncio.to_thread(self.put_mindmap, sha256, model, graph)
+
+    async def aget_text(self, sha256: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get_text, sha256)
+
+    async def aput_text(self, sha256: str, text: str) -> None:
+        await asyncio.to_thread(self.put_text, sha256, text)
+
+    def get_status(self) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT level, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY level").fetchall()
+        return {
+            **self.stats,
+            "entries": {level: count for level, count, _ in rows},
+            "bytes": sum(size for _, _, size in rows),
+            "maxBytes": self.max_bytes,
+        }
+
+
+document_cache = DocumentCache(DOCUMENT_CACHE_PATH, DOCUMENT_CACHE_MAX_BYTES)
@@ -0,0 +1,149 @@
+"""
+Streaming DOCX text extraction.
+
+A .docx is a zip archive whose body text lives in one XML part (normally
+``word/document.xml``). Instead of building python-docx's object model for
+the whole document, the part is read straight from the archive with
+``ElementTree.iterparse``. Each paragraph is emitted as soon as its closing
+tag is parsed and is then dropped from the tree, so memory stays bounded by
+the largest paragraph or table row rather than by the document. Table rows
+become one line with their cells separated by tabs. Extraction stops once
+``max_chars`` of text have been collected.
+
+python-docx is only a fallback, used when the document part is missing or
+cannot be parsed this way and the package is installed.
+"""
+import posixpath
+import zipfile
+from dataclasses import dataclass
+from typing import IO, Iterator, List, Optional, Union
+from xml.etree import ElementTree
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_P, _T, _TAB, _BR, _CR, _TR, _TC, _BODY = (
+    W + tag for tag in ("p", "t", "tab", "br", "cr", "tr", "tc", "body")
+)
+_NO_BREAK_HYPHEN = W + "noBreakHyphen"
+# Subtrees whose content is not document text: paragraph properties (their
+# w:tab elements are tab stops) and the fallback copy of alternate content.
+_SKIP = {W + "pPr", "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"}
+
+_RELS = "_rels/.rels"
+_OFFICE_DOCUMENT = "/officeDocument"
+_DEFAULT_PART = "word/document.xml"
+
+Source = Union[str, IO[bytes]]
+
+
+@dataclass
+class DocxResult:
+    text: str
+    blocks: int  # paragraphs and table rows extracted
+    stopped_early: Optional[str] = None  # "char_budget"
+    fallback: bool = False
+
+
+def _main_part(archive: zipfile.ZipFile) -> str:
+    """Name of the main document part, from the package relationships."""
+    try:
+        rels = ElementTree.fromstring(archive.read(_RELS))
+    except (KeyError, ElementTree.ParseError):
+        return _DEFAULT_PART
+    for rel in rels:
+        if rel.get("Type", "").endswith(_OFFICE_DOCUMENT) and rel.get("Target"):
+            return posixpath.normpath(rel.get("Target").lstrip("/"))
+    return _DEFAULT_PART
+
+
+def iter_docx_blocks(source: Source) -> Iterator[str]:
+    """Yield the text of each paragraph and table row in document order."""
+    with zipfile.ZipFile(source) as archive, archive.open(_main_part(archive)) as part:
+        # Open paragraphs, rows and cells, innermost last. Text boxes nest
+        # paragraphs inside paragraphs, and tables nest inside cells.
+        stack: List[tuple] = []
+        skipping = 0
+        body = None
+        for event, elem in ElementTree.iterparse(part, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if skipping or tag in _SKIP:
+                    skipping += tag in _SKIP
+                elif tag in (_P, _TR, _TC):
+                    stack.append((tag, []))
+                elif tag == _BODY:
+                    body = elem
+                continue
+
+            if tag in _SKIP:
+                skipping -= 1
+                elem.clear()
+                continue
+            if skipping:
+                continue
+            if tag == _T:
+                if stack and stack[-1][0] == _P:
+                    stack[-1][1].append(elem.text or "")
+            elif tag in (_TAB, _BR, _CR, _NO_BREAK_HYPHEN):
+                if stack and stack[-1][0] == _P:
+                    stack[-1][1].append("-" if tag == _NO_BREAK_HYPHEN else "\t" if tag == _TAB else "\n")
+            elif tag in (_P, _TC, _TR):
+                parts = stack.pop()[1]
+                if tag == _P:
+                    text = "".join(parts)
+                elif tag == _TC:
+                    text = " ".join(part for part in parts if part)
+                else:
+                    text = "\t".join(parts)
+                if tag == _TC:
+                    if stack:
+                        stack[-1][1].append(text)
+                elif stack and stack[-1][0] == _TC:
+                    # A paragraph or nested table row belongs to its cell.
+                    if text:
+                        stack[-1][1].append(text)
+                else:
+                    yield text
+                    if not stack and body is not None:
+                        # Finished top-level block: drop it (and anything before it) from the tree.
+                        body.clear()
+                elem.clear()
+
+
+def _extract_with_python_docx(source: Source, max_chars: Optional[int]) -> DocxResult:
+    from docx import Document
+
+    doc = Document(source)
+    blocks = [para.text for para in doc.paragraphs]
+    for table in doc.tables:
+        blocks.extend("\t".join(cell.text for cell in row.cells) for row in table.rows)
+    text = "\n".join(blocks)
+    stopped_early = None
+    if max_chars is not None and len(text) > max_chars:
+        text, stopped_early = text[:max_chars], "char_budget"
+    return DocxResult(text=text, blocks=len(blocks), stopped_early=stopped_early, fallback=True)
+
+
+def extract_docx(source: Source, max_chars: Optional[int] = None) -> DocxResult:
+    """Extract the text of a DOCX file or binary stream. Blocking; run it in a thread.
+
+    Raises the streaming parser's error when the document cannot be read and
+    python-docx is not installed to try instead.
+    """
+    parts: List[str] = []
+    collected = 0
+    try:
+        for block in iter_docx_blocks(source):
+            parts.append(block)
+            collected += len(block) + 1
+            if max_chars is not None and collected >= max_chars:
+                return DocxResult(text="\n".join(parts), blocks=len(parts), stopped_early="char_budget")
+    except (KeyError, ElementTree.ParseError) as error:
+        # A zip with an unexpected layout or markup; python-docx may still cope.
+        try:
+            import docx  # noqa: F401
+        except ImportError:
+            raise error from None
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return _extract_with_python_docx(source, max_chars)
+    return DocxResult(text="\n".join(parts), blocks=len(parts))
@@ -0,0 +1,84 @@
+"""
+Lazily initialized Gemini SDK.
+
+``google.generativeai`` takes most of the service's import time, so it is
+imported and configured by the first call that needs it (or by the startup
+warm-up) instead of at module load. Model handles are created once per
+model name and shared.
+"""
+import asyncio
+import os
+import threading
+from typing import Any, AsyncIterator, Dict
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("VITE_GEMINI_API_KEY")
+# Points the SDK at a local mock for load tests (plain HTTP needs the REST transport)
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+_genai: Any = None
+_lock = threading.Lock()
+_models: Dict[str, Any] = {}
+
+
+def get_genai() -> Any:
+    """The configured ``google.generativeai`` module, imported on first use."""
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                import google.generativeai as genai
+
+                if GEMINI_API_ENDPOINT:
+                    genai.configure(
+                        api_key=GEMINI_API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT}
+                    )
+                else:
+                    genai.configure(api_key=GEMINI_API_KEY)
+                _genai = genai
+    return _genai
+
+
+def get_model(name: str) -> Any:
+    """A shared ``GenerativeModel`` for ``name``."""
+    model = _models.get(name)
+    if model is None:
+        model = _models.setdefault(name, get_genai().GenerativeModel(name))
+    return model
+
+
+async def generate_async(name: str, prompt: str) -> Any:
+    """``generate_content`` for model ``name`` without blocking the event loop."""
+    if _genai is None:
+        # The first import takes a while; keep it off the loop too.
+        await asyncio.to_thread(get_genai)
+    model = get_model(name)
+    if GEMINI_API_ENDPOINT:
+        # The SDK's REST transport has no async client; its coroutine API fails there.
+        return await asyncio.to_thread(model.generate_content, prompt)
+    return await model.generate_content_async(prompt)
+
+
+async def stream_async(name: str, prompt: str) -> AsyncIterator[Any]:
+    """Streamed ``generate_content`` chunks for model ``name``, without blocking the event loop."""
+    if _genai is None:
+        await asyncio.to_thread(get_genai)
+    model = get_model(name)
+    if GEMINI_API_ENDPOINT:
+        # Nor does it stream asynchronously: the whole answer arrives as one chunk.
+        yield await asyncio.to_thread(model.generate_content, prompt)
+        return
+    response = await model.generate_content_async(prompt, stream=True)
+    async for chunk in response:
+        yield chunk
+
+
+def warm_up(name: str) -> None:
+    """Import the SDK, create the model handle and the SDK's default client. Blocking."""
+    get_model(name)
+    from google.generativeai import client
+
+    client.get_default_generative_client()
+
+
+def is_loaded() -> bool:
+    return _genai is not None
@@ -0,0 +1,240 @@
+"""
+Background job queue for mindmap generation.
+
+Long uploads can outlive proxy/Render HTTP timeouts, so clients may submit
+work as a job instead: the POST returns a job id at once, a fixed pool of
+asyncio workers runs the job, and its state lives in SQLite so it can be
+polled (``GET /jobs/{id}``) or followed as server-sent events
+(``GET /jobs/{id}/events``). Finished jobs are removed after JOB_TTL.
+
+Every write goes through one writer thread, in order, so progress updates
+never run SQLite on the event loop. Progress writes are queued without
+waiting; a job's final state is written before subscribers hear of it.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH") or os.path.join(os.path.dirname(__file__), ".cache", "jobs.sqlite")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS") or 2)
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE") or 100)
+JOB_TTL = float(os.getenv("JOB_TTL") or 3600)
+
+FINAL_STATES = ("done", "failed")
+
+Progress = Callable[[str, Optional[dict]], None]
+JobFn = Callable[[Progress], Awaitable[dict]]
+
+
+class JobManager:
+    def __init__(self, path: str, workers: int, queue_size: int, ttl: float):
+        self.path = path
+        self.workers = workers
+        self.ttl = ttl
+        self.queue: Optional[asyncio.Queue] = None
+        self.queue_size = queue_size
+        self._tasks: List[asyncio.Task] = []
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._pending: Dict[str, tuple] = {}
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, detail TEXT, "
+                "result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _execute(self, sql: str, params: tuple) -> None:
+        with self._connect() as conn:
+            conn.execute(sql, params)
+
+    def _write(self, sql: str, params: tuple) -> Future:
+        """Queue one statement for the writer thread; statements run in the order they were queued."""
+        future = self._writer.submit(self._execute, sql, params)
+        future.add_done_callback(_report_write_error)
+        return future
+
+    async def _flush(self) -> None:
+        await asyncio.wrap_future(self._writer.submit(lambda: None))
+
+    async def start(self) -> None:
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        # Jobs that were queued or running when the process died will never finish.
+        await asyncio.wrap_future(self._write(
+            "UPDATE jobs SET status = 'failed', error = 'Interrupted by a service restart', updated_at = ? "
+            "WHERE status NOT IN ('done', 'failed')",
+            (time.time(),),
+        ))
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._cleanup_loop()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._flush()
+        for _, cleanup in self._pending.values():
+            if cleanup:
+                cleanup()
+        self._pending.clear()
+
+    async def submit(self, kind: str, fn: JobFn, cleanup: Optional[Callable[[], None]] = None) -> str:
+        """Queue ``fn`` and return its job id; ``cleanup`` runs once the job has finished either way."""
+        if self.queue is None:
+            raise HTTPException(status_code=503, detail="Job queue is not running.")
+        if self.queue.full():
+            raise HTTPException(
+                status_code=503, detail="Job queue is full. Please retry shortly.", headers={"Retry-After": "10"}
+            )
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        # Queued on the writer before the job is, so the worker's updates land after the row exists.
+        inserted = self._write(
+            "INSERT INTO jobs (id, kind, status, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?)",
+            (job_id, kind, now, now),
+        )
+        self._pending[job_id] = (fn, cleanup)
+        self.queue.put_nowait(job_id)
+        try:
+            await asyncio.wrap_future(inserted)
+        except BaseException:
+            self._pending.pop(job_id, None)  # the worker skips it; the caller owns the cleanup
+            raise
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, detail, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "detail": json.loads(row[3]) if row[3] else None,
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "createdAt": row[6],
+            "updatedAt": row[7],
+        }
+
+    def _record(self, job_id: str, status: str, detail: Optional[dict] = None,
+                result: Optional[dict] = None, error: Optional[str] = None) -> Future:
+        return self._write(
+            "UPDATE jobs SET status = ?, detail = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, json.dumps(detail) if detail else None, json.dumps(result) if result is not None else None,
+             error, time.time(), job_id),
+        )
+
+    def _update(self, job_id: str, status: str, detail: Optional[dict] = None,
+                result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        """Progress: queue the write and tell subscribers at once."""
+        self._record(job_id, status, detail, result, error)
+        self._notify(job_id, status, detail, result, error)
+
+    async def _finish(self, job_id: str, status: str,
+                      result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        """Final state: written before subscribers hear of it, so a GET after the event sees it too."""
+        try:
+            await asyncio.wrap_future(self._record(job_id, status, result=result, error=error))
+        finally:
+            self._notify(job_id, status, None, result, error)
+
+    def _notify(self, job_id: str, status: str, detail: Optional[dict],
+                result: Optional[dict], error: Optional[str]) -> None:
+        event = {"id": job_id, "status": status, "detail": detail}
+        if result is not None:
+            event["result"] = result
+        if error is not None:
+            event["error"] = error
+        for queue in self._subscribers.get(job_id, []):
+            queue.put_nowait(event)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            if job_id not in self._pending:
+                self.queue.task_done()
+                continue
+            fn, cleanup = self._pending.pop(job_id)
+            try:
+                result = await fn(lambda stage, detail=None: self._update(job_id, stage, detail))
+            except asyncio.CancelledError:
+                # stop() flushes the writer after the workers are gone.
+                self._update(job_id, "failed", error="Service shutting down")
+                raise
+            except HTTPException as e:
+                await self._finish(job_id, "failed", error=str(e.detail))
+            except Exception as e:
+                await self._finish(job_id, "failed", error=str(e))
+            else:
+                await self._finish(job_id, "done", result=result)
+            finally:
+                if cleanup:
+                    cleanup()
+                self.queue.task_done()
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.ttl, 300))
+            await asyncio.wrap_future(self._write(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - self.ttl,),
+            ))
+
+    async def events(self, job_id: str):
+        """Yield the current state, then every progress change until the job finishes."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(queue)
+        try:
+            job = await asyncio.to_thread(self.get, job_id)
+            if job is None:
+                return
+            yield {"id": job_id, "status": job["status"], "detail": job["detail"],
+                   **({"result": job["result"]} if job["result"] is not None else {}),
+                   **({"error": job["error"]} if job["error"] else {})}
+            if job["status"] in FINAL_STATES:
+                return
+            while True:
+                event = await queue.get()
+                yield event
+                if event["status"] in FINAL_STATES:
+                    return
+        finally:
+            self._subscribers[job_id].remove(queue)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {
+            "workers": self.workers,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "queueSize": self.queue_size,
+            "byStatus": dict(rows),
+        }
+
+
+def _report_write_error(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Job store write failed: {future.exception()}")
+
+
+job_manager = JobManager(JOB_DB_PATH, JOB_WORKERS, JOB_QUEUE_SIZE, JOB_TTL)
@@ -1,19 +1,60 @@
 import os
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
-import google.generativeai as genai
-from pypdf import PdfReader
 from dotenv import load_dotenv
 import json
-import io
+import hashlib
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Optional
+
+import metrics
+
+from document_cache import document_cache
+from docx_extraction import extract_docx
+import gemini_client
+from jobs import job_manager
+from mindmap_pipeline import MAX_DOCUMENT_CHARS, MINDMAP_CHUNK_CHARS, generate_mindmap_for_text
+from mindmap_repair import (
+    GraphRepairError, RepairResult, continuation_prompt, extend_graph, repair_graph, repair_stats,
+)
+from mindmap_repair import get_status as repair_status
+from mindmap_layout import LAYOUTS, layout_graph
+from mindmap_layout import get_status as layout_status
+from mindmap_stream import GraphStreamParser
+from pdf_extraction import extract_pdf_path, shutdown_pool, warm_pool
+import providers
+from providers import ProviderTimeout
+import scheduler
+from scheduler import Overloaded
+from semantic_cache import semantic_cache
+from singleflight import SingleFlight, SingleFlightTimeout
+from uploads import UPLOAD_OPENAPI, UploadSizeLimitMiddleware, discard, extraction_slot, receive_upload
 
 # Load environment variables from the parent directory or local .env
 load_dotenv(dotenv_path="../.env")
 load_dotenv() 
 
-app = FastAPI(title="Gyan.AI Mindmap Service", version="2.0")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    await job_manager.start()
+    # Startup itself stays fast; the warm-up runs in the background and /ready reports when it is done.
+    warmup = asyncio.create_task(run_in_threadpool(warm_up)) if WARMUP_ON_STARTUP else None
+    yield
+    if warmup:
+        warmup.cancel()
+    await job_manager.stop()
+    await providers.close()
+    shutdown_pool()
+    await semantic_cache.asave()
+
+app = FastAPI(title="Gyan.AI Mindmap Service", version="2.0", lifespan=lifespan)
 
 # Allow CORS for local development
 app.add_middleware(
@@ -24,58 +65,99 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure Gemini
-api_key = os.getenv("GEMINI_API_KEY") or os.getenv("VITE_GEMINI_API_KEY")
-if not api_key:
+# Reject oversize uploads before their body is buffered
+app.add_middleware(UploadSizeLimitMiddleware)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    # Gemini calls shed by the scheduler: tell the client when to come back
+    return JSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": str(exc.retry_after)})
+
+# Gemini is configured lazily by gemini_client on first use
+if not gemini_client.GEMINI_API_KEY:
     print("Warning: GEMINI_API_KEY not found in environment variables.")
 
-genai.configure(api_key=api_key)
+# Opt-in: import the SDK and parsers and start the PDF workers in the background after startup
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP") == "1"
+warmup_state = {"enabled": WARMUP_ON_STARTUP, "done": False, "seconds": None, "error": None}
 
 # Use Gemini 2.0 Flash for better performance
 MODEL_NAME = "gemini-2.0-flash"
 
+# A single prompt never carries more than this many characters of document text;
+# longer documents are split into chunks by mindmap_pipeline.
+MAX_TEXT_CHARS = 100000
+
+EXTRACTION_SECONDS = metrics.histogram("document_extraction_seconds", "Time to extract text from an upload.", ("kind",))
+PDF_PAGES = metrics.histogram(
+    "pdf_pages_extracted", "Pages read per PDF before extraction finished or stopped.", (),
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+PDF_STOPPED_EARLY = metrics.counter("pdf_extraction_stopped_early_total", "PDFs whose extraction stopped early.", ("reason",))
+DOCX_FALLBACKS = metrics.counter("docx_python_docx_fallback_total", "DOCX uploads the streaming parser could not read.", ())
+metrics.callback(
+    "mindmap_json_repair_total", "Mindmap responses by JSON repair outcome.",
+    lambda: dict(repair_stats), ("outcome",), kind="counter",
+)
+
+# Identical prompts arriving together (a class opening the same topic) share one Gemini call
+mindmap_flight = SingleFlight(wait_timeout=float(os.getenv("SINGLEFLIGHT_WAIT_TIMEOUT") or 120))
+# Seconds a shed bulk call keeps retrying before its job fails
+BULK_RETRY_SECONDS = float(os.getenv("BULK_RETRY_SECONDS") or 600)
+
 # Pydantic model for text-based mindmap generation
 class TextMindmapRequest(BaseModel):
     topic: str = None
     text: str = None
+    layout: Optional[str] = None  # "tree" or "radial" to get server-computed positions
+
+class LayoutRequest(BaseModel):
+    nodes: list
+    edges: list = []
+    layout: str = "tree"
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from PDF file."""
+async def extract_text_from_pdf(path: str) -> str:
+    """Extract text from PDF file in the worker pool, stopping once the document budget is full."""
     try:
-        reader = PdfReader(io.BytesIO(file_content))
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        result = await extract_pdf_path(path, max_chars=MAX_DOCUMENT_CHARS)
+        PDF_PAGES.observe(result.pages_extracted)
+        if result.stopped_early:
+            PDF_STOPPED_EARLY.inc(reason=result.stopped_early)
+            print(f"PDF extraction stopped early ({result.stopped_early}) after "
+                  f"{result.pages_extracted}/{result.pages_total} pages")
+        return result.text
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading PDF: {str(e)}")
 
-def extract_text_from_txt(file_content: bytes) -> str:
-    """Extract text from TXT file."""
+def extract_text_from_txt(path: str) -> str:
+    """Extract text from TXT file, reading no more than the document budget."""
     try:
-        return file_content.decode('utf-8')
+        with open(path, encoding="utf-8") as f:
+            return f.read(MAX_DOCUMENT_CHARS)
     except UnicodeDecodeError:
         try:
-            return file_content.decode('latin-1')
+            with open(path, encoding="latin-1") as f:
+                return f.read(MAX_DOCUMENT_CHARS)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error reading TXT file: {str(e)}")
 
-def extract_text_from_docx(file_content: bytes) -> str:
-    """Extract text from DOCX file."""
+def extract_text_from_docx(path: str) -> str:
+    """Extract paragraph and table text from a DOCX file, stopping once the document budget is full."""
     try:
-        from docx import Document
-        doc = Document(io.BytesIO(file_content))
-        text = ""
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-        return text
-    except ImportError:
-        raise HTTPException(status_code=500, detail="python-docx not installed. Cannot process DOCX files.")
+        result = extract_docx(path, max_chars=MAX_DOCUMENT_CHARS)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading DOCX file: {str(e)}")
+    if result.fallback:
+        DOCX_FALLBACKS.inc()
+    if result.stopped_early:
+        print(f"DOCX extraction stopped early ({result.stopped_early}) after {result.blocks} blocks")
+    return result.text
+
+def get_mindmap_prompt(text: str, is_topic: bool = False, part: tuple = None) -> str:
+    """Generate the prompt for Gemini to create a mindmap.
 
-def get_mindmap_prompt(text: str, is_topic: bool = False) -> str:
-    """Generate the prompt for Gemini to create a mindmap."""
+    ``part`` is ``(n, total)`` when ``text`` is one chunk of a larger document.
+    """
     if is_topic:
         base_prompt = f"""
 You are an expert educational AI helper. 
@@ -85,11 +167,17 @@ Create a detailed mindmap covering key concepts, subtopics, and relationships.
 """
     else:
         # Limit text length to avoid token limits
-        truncated_text = text[:100000]
+        truncated_text = text[:MAX_TEXT_CHARS]
+        part_note = ""
+        if part:
+            part_note = (
+                f"\nThis text is part {part[0]} of {part[1]} of a larger document. "
+                "Cover only the concepts in this part; use the part's main theme as the root node.\n"
+            )
         base_prompt = f"""
 You are an expert educational AI helper. 
 Analyze the following text and generate a hierarchical structure for a concept map / mind map.
-
+{part_note}
 Text to analyze:
 {truncated_text}
 """
@@ -122,79 +210,398 @@ IMPORTANT:
 3. Generate at least 8-15 nodes for a comprehensive mindmap.
 """
 
-def generate_with_gemini(prompt: str) -> dict:
-    """Call Gemini API and parse the response."""
+# Topic mindmaps in the semantic cache are only reused for the same model and topic prompt;
+# hashing the prompt template means editing it retires the old entries without a manual bump.
+TOPIC_CACHE_VERSION = "{}:{}".format(
+    MODEL_NAME, hashlib.sha256(get_mindmap_prompt("{topic}", is_topic=True).encode("utf-8")).hexdigest()[:12]
+)
+
+def parse_mindmap_text(response_text: str) -> RepairResult:
+    """Recover the graph from a Gemini response, repairing fences, prose and syntax damage."""
     try:
-        model = genai.GenerativeModel(MODEL_NAME)
-        response = model.generate_content(prompt)
-        
-        # Clean response if it contains markdown code blocks
-        response_text = response.text.strip()
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-            
-        data = json.loads(response_text.strip())
-        return data
-        
-    except json.JSONDecodeError as e:
+        return repair_graph(response_text)
+    except GraphRepairError as e:
         print(f"JSON Parse Error: {e}")
         print(f"Response was: {response_text[:500]}")
         raise HTTPException(status_code=500, detail="Failed to parse AI response as JSON")
+
+def complete_graph(result: RepairResult, continuation_text: str) -> dict:
+    """Merge a continuation answer into a truncated graph, keeping the truncated graph if it is unusable."""
+    try:
+        return extend_graph(result.graph, continuation_text)
+    except (GraphRepairError, ValueError) as e:
+        repair_stats["continuationFailures"] += 1
+        print(f"Continuation discarded: {e}")
+        return result.graph
+
+async def generate_mindmap_graph(prompt: str, priority: str = "standard", tenant: Optional[str] = None) -> dict:
+    """Get a mindmap from the provider chain, asking only for the missing part if it was cut off."""
+    try:
+        completion = await providers.complete(prompt, MODEL_NAME, "generate", priority, tenant)
+    except Overloaded:
+        raise
+    except ProviderTimeout as e:
+        print(f"AI Generation Timeout: {e}")
+        raise HTTPException(status_code=504, detail=f"Timed out generating mind map: {str(e)}")
     except Exception as e:
         print(f"AI Generation Error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate mind map: {str(e)}")
+    result = parse_mindmap_text(completion.text)
+    if result.complete:
+        return result.graph
+    return await continue_graph(prompt, result, priority, tenant)
+
+async def continue_graph(prompt: str, result: RepairResult, priority: str, tenant: Optional[str]) -> dict:
+    """Ask for the rest of a truncated graph; on any failure keep what we have."""
+    repair_stats["continuations"] += 1
+    try:
+        continuation = await providers.complete(
+            continuation_prompt(prompt, result.graph), MODEL_NAME, "continuation", priority, tenant
+        )
+        return complete_graph(result, continuation.text)
+    except Exception as e:
+        repair_stats["continuationFailures"] += 1
+        print(f"Continuation failed: {e}")
+        return result.graph
 
-@app.post("/generate-mindmap")
-async def generate_mindmap(file: UploadFile = File(...)):
+async def stream_mindmap_graph(prompt: str, priority: str = "interactive", tenant: Optional[str] = None):
+    """Stream a mindmap as node/edge events, ending with the full graph.
+
+    Gemini's answer is streamed through the provider chain, under the same
+    deadline and with the same fallbacks as a plain call. A continuation, if
+    one is needed, goes through the chain like any other call.
     """
-    Generate a mindmap from an uploaded file.
-    Supports: PDF, TXT, DOCX
+    parser = GraphStreamParser()
+    try:
+        async for text in providers.stream(prompt, MODEL_NAME, "stream", priority, tenant):
+            for kind, item in parser.feed(text):
+                yield {"type": kind, kind: item}
+    except Overloaded:
+        raise
+    except ProviderTimeout as e:
+        print(f"AI Generation Timeout: {e}")
+        raise HTTPException(status_code=504, detail=f"Timed out generating mind map: {str(e)}")
+    except Exception as e:
+        print(f"AI Generation Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate mind map: {str(e)}")
+    result = parse_mindmap_text(parser.text)
+    graph = result.graph
+    if not result.complete:
+        graph = await continue_graph(prompt, result, priority, tenant)
+        # Send whatever the continuation added; ids already streamed are not repeated.
+        sent_nodes = {str(node.get("id")) for node in parser.nodes}
+        for node in graph["nodes"]:
+            if node["id"] not in sent_nodes:
+                yield {"type": "node", "node": node}
+        for edge in graph["edges"][len(result.graph["edges"]):]:
+            yield {"type": "edge", "edge": edge}
+    yield {"type": "done", "graph": graph}
+
+async def generate_mindmap_coalesced(prompt: str, priority: str = "standard", tenant: Optional[str] = None) -> dict:
+    """Generate the mindmap for ``prompt``, sharing the call with identical in-flight prompts.
+
+    Calls queue for a provider slot at ``priority``, and only calls of the
+    same priority are shared, so an interactive request never waits behind a
+    bulk leader that is queued or retrying. Bulk (background job) calls that
+    are shed wait for the Retry-After delay and try again, since no client is
+    there to see a 429, for up to ``BULK_RETRY_SECONDS``.
     """
-    filename = file.filename.lower()
-    content = await file.read()
-    
-    # Determine file type and extract text
-    if filename.endswith('.pdf'):
-        text = extract_text_from_pdf(content)
-    elif filename.endswith('.txt'):
-        text = extract_text_from_txt(content)
-    elif filename.endswith('.docx'):
-        text = extract_text_from_docx(content)
-    else:
-        raise HTTPException(
-            status_code=400, 
-            detail="Unsupported file type. Please upload PDF, TXT, or DOCX files."
-        )
-    
+    key = hashlib.sha256(f"{MODEL_NAME}\0{priority}\0{prompt}".encode("utf-8")).hexdigest()
+    give_up_at = time.monotonic() + BULK_RETRY_SECONDS
+    while True:
+        try:
+            return await mindmap_flight.do(key, lambda: generate_mindmap_graph(prompt, priority, tenant))
+        except SingleFlightTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        except Overloaded as e:
+            if priority != "bulk" or time.monotonic() + e.retry_after > give_up_at:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+def _no_progress(stage: str, detail: dict = None) -> None:
+    pass
+
+def check_layout(layout: Optional[str]) -> None:
+    if layout and layout not in LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"Unknown layout '{layout}'. Use one of: {', '.join(LAYOUTS)}")
+
+def apply_layout(graph: dict, layout: Optional[str]) -> dict:
+    """Fill in node positions server-side when the client asked for a layout."""
+    if not layout:
+        return graph
+    with metrics.span("mindmap.layout", layout=layout, nodes=len(graph.get("nodes") or [])):
+        return layout_graph(graph, layout)
+
+async def mindmap_from_upload(
+    upload, progress=_no_progress, wait_for_slot: bool = False, priority: str = "standard", tenant: Optional[str] = None
+) -> dict:
+    """Build the mindmap for a spooled upload; the caller discards the temp file."""
+    # Re-uploads of the same document skip Gemini (mindmap hit) or at least the parse (text hit)
+    graph = await document_cache.aget_mindmap(upload.sha256, MODEL_NAME)
+    if graph is not None:
+        return {**graph, "cache": "mindmap"}
+
+    text = await document_cache.aget_text(upload.sha256)
+    cache_level = "text" if text is not None else "miss"
+    if text is None:
+        progress("extracting", {"kind": upload.kind, "bytes": upload.size})
+        async with extraction_slot(timeout=None) if wait_for_slot else extraction_slot():
+            started = time.perf_counter()
+            if upload.kind == "pdf":
+                text = await extract_text_from_pdf(upload.path)
+            elif upload.kind == "txt":
+                text = await run_in_threadpool(extract_text_from_txt, upload.path)
+            else:
+                text = await run_in_threadpool(extract_text_from_docx, upload.path)
+            EXTRACTION_SECONDS.observe(time.perf_counter() - started, kind=upload.kind)
+        if text.strip():
+            await document_cache.aput_text(upload.sha256, text)
+
     if not text.strip():
         raise HTTPException(status_code=400, detail="Could not extract any text from the file.")
-    
-    prompt = get_mindmap_prompt(text, is_topic=False)
-    return generate_with_gemini(prompt)
+
+    generate = partial(generate_mindmap_coalesced, priority=priority, tenant=tenant)
+    graph = await generate_mindmap_for_text(text, get_mindmap_prompt, generate, progress=progress)
+    await document_cache.aput_mindmap(upload.sha256, MODEL_NAME, graph)
+    return {**graph, "cache": cache_level}
+
+async def mindmap_from_request(
+    request: TextMindmapRequest, progress=_no_progress, priority: str = "interactive", tenant: Optional[str] = None
+) -> dict:
+    """Build the mindmap for a topic or a block of text."""
+    generate = partial(generate_mindmap_coalesced, priority=priority, tenant=tenant)
+    if request.topic:
+        # Rephrasings of a topic ("photosynthesis process", "Photosynthesis class 7") share one mindmap
+        hit = semantic_cache.lookup(request.topic, TOPIC_CACHE_VERSION)
+        if hit is not None:
+            graph, similarity, cached_topic = hit
+            return {**graph, "cache": "semantic", "similarity": round(similarity, 3), "cachedTopic": cached_topic}
+        progress("generating", {"chunksDone": 0, "chunks": 1})
+        prompt = get_mindmap_prompt(request.topic, is_topic=True)
+        graph = await generate(prompt)
+        await semantic_cache.aadd(request.topic, graph, TOPIC_CACHE_VERSION)
+        return {**graph, "cache": "miss"}
+    elif request.text:
+        return await generate_mindmap_for_text(request.text, get_mindmap_prompt, generate, progress=progress)
+    else:
+        raise HTTPException(status_code=400, detail="Please provide either 'topic' or 'text' in the request body.")
+
+@app.post("/generate-mindmap", openapi_extra=UPLOAD_OPENAPI)
+async def generate_mindmap(request: Request, layout: Optional[str] = None, x_tenant_id: Optional[str] = Header(None)):
+    """
+    Generate a mindmap from an uploaded file.
+    Supports: PDF, TXT, DOCX
+    """
+    check_layout(layout)
+    upload = await receive_upload(request)
+    try:
+        return apply_layout(await mindmap_from_upload(upload, tenant=x_tenant_id), layout)
+    finally:
+        discard(upload)
 
 @app.post("/generate-mindmap-from-text")
-async def generate_mindmap_from_text(request: TextMindmapRequest):
+async def generate_mindmap_from_text(request: TextMindmapRequest, x_tenant_id: Optional[str] = Header(None)):
     """
     Generate a mindmap from text or a topic name.
     Send either 'topic' for a topic-based mindmap, or 'text' for content-based mindmap.
     """
+    check_layout(request.layout)
+    return apply_layout(await mindmap_from_request(request, tenant=x_tenant_id), request.layout)
+
+@app.post("/layout-mindmap")
+async def layout_mindmap(request: LayoutRequest):
+    """Compute node positions for an existing mindmap graph."""
+    check_layout(request.layout)
+    return layout_graph({"nodes": request.nodes, "edges": request.edges}, request.layout)
+
+def graph_events(graph: dict, **done):
+    """Replay an already complete graph as stream events."""
+    for node in graph.get("nodes") or []:
+        yield {"type": "node", "node": node}
+    for edge in graph.get("edges") or []:
+        yield {"type": "edge", "edge": edge}
+    yield {"type": "done", "graph": graph, **done}
+
+async def stream_mindmap_events(request: TextMindmapRequest, tenant: Optional[str] = None):
+    async for event in _stream_mindmap_events(request, tenant):
+        if event["type"] == "done":
+            event["graph"] = apply_layout(event["graph"], request.layout)
+        yield event
+
+async def _stream_mindmap_events(request: TextMindmapRequest, tenant: Optional[str]):
     if request.topic:
-        prompt = get_mindmap_prompt(request.topic, is_topic=True)
-    elif request.text:
-        prompt = get_mindmap_prompt(request.text, is_topic=False)
+        hit = semantic_cache.lookup(request.topic, TOPIC_CACHE_VERSION)
+        if hit is not None:
+            graph, similarity, cached_topic = hit
+            for event in graph_events(graph, cache="semantic", similarity=round(similarity, 3), cachedTopic=cached_topic):
+                yield event
+            return
+        async for event in stream_mindmap_graph(get_mindmap_prompt(request.topic, is_topic=True), tenant=tenant):
+            if event["type"] == "done":
+                await semantic_cache.aadd(request.topic, event["graph"], TOPIC_CACHE_VERSION)
+                event["cache"] = "miss"
+            yield event
+    elif len(request.text) <= MINDMAP_CHUNK_CHARS:
+        async for event in stream_mindmap_graph(get_mindmap_prompt(request.text), tenant=tenant):
+            yield event
     else:
+        # Chunked documents are merged (and their node ids rewritten) at the end, so they arrive in one go.
+        generate = partial(generate_mindmap_coalesced, priority="interactive", tenant=tenant)
+        graph = await generate_mindmap_for_text(request.text, get_mindmap_prompt, generate)
+        for event in graph_events(graph):
+            yield event
+
+@app.post("/generate-mindmap-from-text/stream")
+async def stream_mindmap_from_text(request: TextMindmapRequest, x_tenant_id: Optional[str] = Header(None)):
+    """
+    Stream a mindmap as NDJSON: one {"type": "node"} or {"type": "edge"} line per item
+    as soon as Gemini has written it, then {"type": "done", "graph": ...} with the full graph.
+    """
+    if not request.topic and not request.text:
         raise HTTPException(status_code=400, detail="Please provide either 'topic' or 'text' in the request body.")
-    
-    return generate_with_gemini(prompt)
+    check_layout(request.layout)
+
+    events = stream_mindmap_events(request, x_tenant_id)
+    # Wait for the first event before sending headers, so a shed request is still a plain 429
+    try:
+        first = [await events.__anext__()]
+    except Overloaded:
+        raise
+    except StopAsyncIteration:
+        first = []
+    except Exception as e:
+        first, events = [e], None
+
+    async def ndjson():
+        # Headers are already sent once streaming starts, so failures become a final error event.
+        try:
+            for event in first:
+                if isinstance(event, Exception):
+                    raise event
+                yield json.dumps(event) + "\n"
+            if events is not None:
+                async for event in events:
+                    yield json.dumps(event) + "\n"
+        except HTTPException as e:
+            yield json.dumps({"type": "error", "detail": e.detail}) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.post("/jobs/generate-mindmap", status_code=202, openapi_extra=UPLOAD_OPENAPI)
+async def submit_mindmap_job(request: Request, layout: Optional[str] = None, x_tenant_id: Optional[str] = Header(None)):
+    """
+    Queue mindmap generation for an uploaded file and return a job id at once.
+    Poll GET /jobs/{id} or follow GET /jobs/{id}/events for progress and the result.
+    """
+    check_layout(layout)
+    upload = await receive_upload(request)
+
+    async def run(progress):
+        graph = await mindmap_from_upload(upload, progress, wait_for_slot=True, priority="bulk", tenant=x_tenant_id)
+        return apply_layout(graph, layout)
+
+    try:
+        job_id = await job_manager.submit(
+            "upload",
+            run,
+            cleanup=lambda: discard(upload),
+        )
+    except Exception:
+        discard(upload)
+        raise
+    return {"jobId": job_id, "status": "queued"}
+
+@app.post("/jobs/generate-mindmap-from-text", status_code=202)
+async def submit_text_mindmap_job(request: TextMindmapRequest, x_tenant_id: Optional[str] = Header(None)):
+    """Queue mindmap generation for a topic or text and return a job id at once."""
+    if not request.topic and not request.text:
+        raise HTTPException(status_code=400, detail="Please provide either 'topic' or 'text' in the request body.")
+    check_layout(request.layout)
+
+    async def run(progress):
+        graph = await mindmap_from_request(request, progress, priority="bulk", tenant=x_tenant_id)
+        return apply_layout(graph, request.layout)
+
+    job_id = await job_manager.submit("topic" if request.topic else "text", run)
+    return {"jobId": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Current status, progress detail, and (once done) the mindmap of a job."""
+    job = await run_in_threadpool(job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events with the job's progress; the stream ends when the job is done or failed."""
+    if await run_in_threadpool(job_manager.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+
+    async def stream():
+        async for event in job_manager.events(job_id):
+            yield f"event: {event['status']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def warm_up() -> None:
+    """Pay the lazy initialization cost before the first request does. Blocking; run it in a thread."""
+    started = time.perf_counter()
+    try:
+        gemini_client.warm_up(MODEL_NAME)
+        warm_pool()
+    except Exception as e:
+        # Requests still initialize lazily; readiness only reports the failure.
+        warmup_state["error"] = str(e)
+    finally:
+        warmup_state["seconds"] = round(time.perf_counter() - started, 3)
+        warmup_state["done"] = True
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "model": MODEL_NAME, "version": "2.0"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness for load balancers; unlike /health it is 503 until the opt-in warm-up finishes."""
+    readiness = {
+        "ready": warmup_state["done"] or not WARMUP_ON_STARTUP,
+        "warmup": dict(warmup_state),
+        "geminiLoaded": gemini_client.is_loaded(),
+    }
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+@app.get("/stats")
+async def stats():
+    """Request coalescing, cache and job queue counters."""
+    return {
+        "coalescing": mindmap_flight.get_status(),
+        "scheduler": scheduler.get_status(),
+        "documentCache": await run_in_threadpool(document_cache.get_status),
+        "semanticCache": semantic_cache.get_status(),
+        "jobs": await run_in_threadpool(job_manager.get_status),
+        "jsonRepair": repair_status(),
+        "layout": layout_status(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus text exposition of latency, token, extraction and repair metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = 5.0, interval: float = 0.005):
+    """Collapsed stacks from a short sampling run; only with PROFILER_ENABLED=1."""
+    if not metrics.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler disabled; set PROFILER_ENABLED=1")
+    stacks = await run_in_threadpool(metrics.sample_profile, seconds, interval)
+    if stacks is None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return stacks
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
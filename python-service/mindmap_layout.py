@@ -0,0 +1,176 @@
+"""
+Server-side mindmap layout.
+
+The prompt has the model write ``x: 0, y: 0`` everywhere and the frontend
+lays the graph out with d3, which is slow on low-end tablets for merged
+graphs of a hundred nodes or more. ``layout_graph`` fills in real
+positions instead, working on NumPy arrays end to end:
+
+1. a spanning tree is found breadth-first from the root (edges in their
+   written direction first; orphaned components hang off the root);
+2. siblings are ordered by barycenter sweeps over *all* edges, which keeps
+   cross-links between branches short and reduces crossings;
+3. every node gets a slot range proportional to its leaf count, and is
+   placed in the middle of it, either in layers (``tree``, left to right
+   like the frontend's d3 tree) or on concentric rings (``radial``).
+
+Results are cached by a hash of the graph structure.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+
+LAYOUTS = ("tree", "radial")
+LAYOUT_LAYER_GAP = float(os.getenv("LAYOUT_LAYER_GAP") or 380)    # d3 nodeSize width in MindMapGraph
+LAYOUT_SIBLING_GAP = float(os.getenv("LAYOUT_SIBLING_GAP") or 110)  # d3 nodeSize height in MindMapGraph
+LAYOUT_RING_GAP = float(os.getenv("LAYOUT_RING_GAP") or 260)
+LAYOUT_PASSES = int(os.getenv("LAYOUT_PASSES") or 2)
+LAYOUT_CACHE_SIZE = int(os.getenv("LAYOUT_CACHE_SIZE") or 512)
+
+_cache: "OrderedDict[str, List[Tuple[float, float]]]" = OrderedDict()
+layout_stats = {"hits": 0, "misses": 0}
+
+
+def graph_hash(graph: dict, algorithm: str) -> str:
+    """Hash of node ids and edges only, so labels and stale positions do not matter."""
+    structure = {
+        "a": algorithm,
+        "n": [str(node.get("id")) for node in graph.get("nodes") or []],
+        "e": [[str(edge.get("source")), str(edge.get("target"))] for edge in graph.get("edges") or []],
+    }
+    return hashlib.sha256(json.dumps(structure, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def _edge_arrays(graph: dict, index: dict) -> Tuple[np.ndarray, np.ndarray]:
+    pairs = [
+        (index[str(edge.get("source"))], index[str(edge.get("target"))])
+        for edge in graph.get("edges") or []
+        if str(edge.get("source")) in index and str(edge.get("target")) in index
+    ]
+    pairs = [(s, t) for s, t in pairs if s != t]
+    if not pairs:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    array = np.array(pairs, dtype=np.int64)
+    return array[:, 0], array[:, 1]
+
+
+def _root(graph: dict, targets: np.ndarray, count: int) -> int:
+    for i, node in enumerate(graph["nodes"]):
+        if node.get("type") in ("input", "root"):
+            return i
+    roots = np.flatnonzero(np.bincount(targets, minlength=count) == 0)
+    return int(roots[0]) if roots.size else 0
+
+
+def _spanning_tree(root: int, count: int, src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Breadth-first parents and depths; written-direction edges win over reversed ones."""
+    u = np.concatenate([src, dst])
+    v = np.concatenate([dst, src])
+    parent = np.full(count, -1, dtype=np.int64)
+    depth = np.full(count, -1, dtype=np.int64)
+    depth[root] = 0
+
+    def expand(frontier: np.ndarray) -> None:
+        while frontier.size:
+            mask = np.isin(u, frontier) & (depth[v] < 0)
+            children, first = np.unique(v[mask], return_index=True)
+            parent[children] = u[mask][first]
+            depth[children] = depth[parent[children]] + 1
+            frontier = children
+
+    expand(np.array([root]))
+    while True:
+        orphans = np.flatnonzero(depth < 0)
+        if not orphans.size:
+            return parent, depth
+        parent[orphans[0]] = root
+        depth[orphans[0]] = 1
+        expand(orphans[:1])
+
+
+def _slots(parent: np.ndarray, depth: np.ndarray, root: int, key: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Leaf-count width of every subtree and the slot where each subtree starts."""
+    count = parent.size
+    layers = [np.flatnonzero(depth == d) for d in range(int(depth.max()) + 1)]
+    width = np.ones(count)
+    child_total = np.zeros(count)
+    for layer in reversed(layers[1:]):
+        width[layer] = np.maximum(1, child_total[layer])
+        np.add.at(child_total, parent[layer], width[layer])
+    width[root] = max(1.0, child_total[root])
+
+    start = np.zeros(count)
+    for layer in layers[1:]:
+        order = layer[np.lexsort((key[layer], parent[layer]))]
+        parents = parent[order]
+        before = np.cumsum(width[order]) - width[order]
+        group_start = np.flatnonzero(np.r_[True, parents[1:] != parents[:-1]])
+        group_sizes = np.diff(np.r_[group_start, order.size])
+        start[order] = start[parents] + before - np.repeat(before[group_start], group_sizes)
+    return width, start
+
+
+def compute_positions(graph: dict, algorithm: str = "tree") -> np.ndarray:
+    """``(n, 2)`` array of x/y positions for ``graph["nodes"]`` in order."""
+    if algorithm not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{algorithm}'. Use one of: {', '.join(LAYOUTS)}")
+    nodes = graph.get("nodes") or []
+    count = len(nodes)
+    if not count:
+        return np.zeros((0, 2))
+    index = {str(node.get("id")): i for i, node in enumerate(nodes)}
+    src, dst = _edge_arrays(graph, index)
+    root = _root(graph, dst, count)
+    parent, depth = _spanning_tree(root, count, src, dst)
+
+    # Barycenter sweeps: order siblings by where their neighbours (across any edge) ended up last pass.
+    u = np.concatenate([src, dst])
+    v = np.concatenate([dst, src])
+    degree = np.bincount(u, minlength=count)
+    key = np.arange(count, dtype=np.float64)
+    for sweep in range(LAYOUT_PASSES + 1):
+        width, start = _slots(parent, depth, root, key)
+        center = start + width / 2
+        if sweep == LAYOUT_PASSES or not u.size:
+            break
+        bary = np.bincount(u, weights=center[v], minlength=count)
+        key = np.where(degree > 0, bary / np.maximum(degree, 1), center)
+
+    positions = np.zeros((count, 2))
+    if algorithm == "tree":
+        positions[:, 0] = depth * LAYOUT_LAYER_GAP
+        positions[:, 1] = (center - width[root] / 2) * LAYOUT_SIBLING_GAP
+    else:
+        angle = 2 * np.pi * center / width[root]
+        radius = depth * LAYOUT_RING_GAP
+        positions[:, 0] = radius * np.cos(angle)
+        positions[:, 1] = radius * np.sin(angle)
+    return np.round(positions, 1) + 0.0  # no "-0.0" in the JSON
+
+
+def layout_graph(graph: dict, algorithm: str = "tree") -> dict:
+    """Return a copy of ``graph`` with every node's ``position`` filled in."""
+    key = graph_hash(graph, algorithm)
+    positions = _cache.get(key)
+    if positions is not None:
+        _cache.move_to_end(key)
+        layout_stats["hits"] += 1
+    else:
+        layout_stats["misses"] += 1
+        positions = compute_positions(graph, algorithm).tolist()
+        _cache[key] = positions
+        if len(_cache) > LAYOUT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    nodes = [
+        {**node, "position": {"x": x, "y": y}}
+        for node, (x, y) in zip(graph.get("nodes") or [], positions)
+    ]
+    return {**graph, "nodes": nodes, "layout": algorithm}
+
+
+def get_status() -> dict:
+    return {**layout_stats, "entries": len(_cache), "capacity": LAYOUT_CACHE_SIZE}
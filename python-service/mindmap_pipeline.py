@@ -0,0 +1,180 @@
+"""
+Map-reduce mindmap generation for documents too large for one prompt.
+
+The text is split on section/paragraph boundaries, every chunk gets its own
+sub-graph generated concurrently, and the sub-graphs are merged into one
+graph: nodes with the same normalized label collapse into one, and every
+chunk's root hangs off a single document root.
+"""
+import asyncio
+import os
+import re
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import metrics
+from scheduler import Overloaded
+
+MINDMAP_CHUNK_CHARS = int(os.getenv("MINDMAP_CHUNK_CHARS") or 24000)
+MINDMAP_MAX_CHUNKS = int(os.getenv("MINDMAP_MAX_CHUNKS") or 12)
+MINDMAP_CHUNK_CONCURRENCY = int(os.getenv("MINDMAP_CHUNK_CONCURRENCY") or 4)
+
+# Longest document we will cover in full; extraction can stop once it has this much text.
+MAX_DOCUMENT_CHARS = MINDMAP_CHUNK_CHARS * MINDMAP_MAX_CHUNKS
+
+_SECTION_BREAK = re.compile(r"\n\s*\n|\n(?=(?:chapter|section|unit|lesson)\b|\d+(?:\.\d+)*\s+[A-Z])", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_text(text: str, chunk_chars: int = MINDMAP_CHUNK_CHARS) -> List[str]:
+    """Pack paragraphs into chunks of at most ``chunk_chars``, preferring section breaks."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+
+    def flush():
+        nonlocal current, size
+        if current:
+            chunks.append("\n\n".join(current))
+        current, size = [], 0
+
+    for block in _SECTION_BREAK.split(text):
+        block = block.strip()
+        if not block:
+            continue
+        # Oversized paragraphs fall back to sentence boundaries, then to a hard split.
+        pieces = [block] if len(block) <= chunk_chars else _split_long(block, chunk_chars)
+        for piece in pieces:
+            if size + len(piece) > chunk_chars:
+                flush()
+            current.append(piece)
+            size += len(piece) + 2
+    flush()
+    return chunks
+
+
+def _split_long(block: str, chunk_chars: int) -> List[str]:
+    pieces: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(block):
+        while len(sentence) > chunk_chars:
+            pieces.append(sentence[:chunk_chars])
+            sentence = sentence[chunk_chars:]
+        if len(current) + len(sentence) + 1 > chunk_chars and current:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def normalize_label(label: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", str(label).lower())).strip()
+
+
+def _find_root(graph: dict) -> Optional[str]:
+    nodes = graph.get("nodes") or []
+    for node in nodes:
+        if node.get("type") in ("input", "root"):
+            return str(node["id"])
+    targets = {str(edge.get("target")) for edge in graph.get("edges") or []}
+    for node in nodes:
+        if str(node["id"]) not in targets:
+            return str(node["id"])
+    return str(nodes[0]["id"]) if nodes else None
+
+
+def merge_graphs(graphs: List[dict]) -> dict:
+    """Merge chunk sub-graphs, deduplicating nodes by normalized label and re-rooting under one root."""
+    nodes: List[dict] = []
+    edges: List[dict] = []
+    by_label: Dict[str, str] = {}
+    seen_edges = set()
+    chunk_roots: List[str] = []
+
+    for index, graph in enumerate(graphs):
+        id_map: Dict[str, str] = {}
+        for node in graph.get("nodes") or []:
+            if "id" not in node:
+                continue
+            key = normalize_label(node.get("label", "")) or f"{index}:{node['id']}"
+            if key not in by_label:
+                merged_id = str(len(by_label) + 1)
+                by_label[key] = merged_id
+                nodes.append({**node, "id": merged_id, "position": {"x": 0, "y": 0}})
+            id_map[str(node["id"])] = by_label[key]
+
+        root = _find_root(graph)
+        if root is not None and root in id_map and id_map[root] not in chunk_roots:
+            chunk_roots.append(id_map[root])
+
+        for edge in graph.get("edges") or []:
+            source = id_map.get(str(edge.get("source")))
+            target = id_map.get(str(edge.get("target")))
+            if source is None or target is None or source == target or (source, target) in seen_edges:
+                continue
+            seen_edges.add((source, target))
+            edges.append({**edge, "id": f"e{len(edges) + 1}", "source": source, "target": target})
+
+    if not nodes:
+        return {"nodes": [], "edges": []}
+
+    root_id = chunk_roots[0] if chunk_roots else nodes[0]["id"]
+    for node in nodes:
+        if node["id"] == root_id:
+            node["type"] = "input"
+        elif node.get("type") in ("input", "root"):
+            node.pop("type")
+    # Attach the other chunk roots to the document root, and drop edges pointing back at it.
+    edges = [edge for edge in edges if edge["target"] != root_id]
+    for other in chunk_roots[1:]:
+        if (root_id, other) not in seen_edges:
+            edges.append({"id": f"e{len(edges) + 1}", "source": root_id, "target": other})
+    return {"nodes": nodes, "edges": edges}
+
+
+async def generate_mindmap_for_text(
+    text: str,
+    build_prompt: Callable[..., str],
+    generate: Callable[[str], Awaitable[dict]],
+    chunk_chars: int = MINDMAP_CHUNK_CHARS,
+    concurrency: int = MINDMAP_CHUNK_CONCURRENCY,
+    progress: Optional[Callable[[str, Optional[dict]], None]] = None,
+) -> dict:
+    """Generate one mindmap for ``text``, fanning out over chunks when it does not fit one prompt.
+
+    ``build_prompt(chunk, part=...)`` gets ``part=(n, total)`` for chunked calls and
+    ``None`` for a single-prompt document. Chunks that fail are left out of
+    the merge; only if every chunk fails is the first error raised. A chunk
+    shed by admission control (``Overloaded``) fails the whole document, since
+    a retry later beats a mindmap with sections silently missing.
+    ``progress(stage, detail)``, if given, is told about finished chunks and the merge.
+    """
+    report = progress or (lambda stage, detail=None: None)
+    chunks = split_text(text, chunk_chars)[:MINDMAP_MAX_CHUNKS] if len(text) > chunk_chars else [text]
+    report("generating", {"chunksDone": 0, "chunks": len(chunks)})
+    if len(chunks) == 1:
+        return await generate(build_prompt(chunks[0], part=None))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def run(index: int, chunk: str) -> dict:
+        nonlocal done
+        async with semaphore:
+            try:
+                return await generate(build_prompt(chunk, part=(index + 1, len(chunks))))
+            finally:
+                done += 1
+                report("generating", {"chunksDone": done, "chunks": len(chunks)})
+
+    results = await asyncio.gather(*(run(i, chunk) for i, chunk in enumerate(chunks)), return_exceptions=True)
+    shed = [result for result in results if isinstance(result, Overloaded)]
+    if shed:
+        raise shed[0]
+    graphs = [result for result in results if isinstance(result, dict)]
+    if not graphs:
+        raise results[0]
+    report("merging", {"chunks": len(chunks), "failedChunks": len(chunks) - len(graphs)})
+    with metrics.span("mindmap.merge", chunks=len(graphs)):
+        return merge_graphs(graphs)
@@ -0,0 +1,196 @@
+"""
+Repair and validation of model-written mindmap JSON.
+
+Gemini output is usually valid, but the failures that do happen are cheap
+to fix locally and expensive to regenerate: prose or code fences around
+the object, trailing commas, output cut off at the token limit, edges that
+point at node ids that were never written, duplicated ids. ``repair_graph``
+recovers a schema-valid ``{"nodes": [...], "edges": [...]}`` graph from
+such text and reports whether it is complete; when it is not (truncated
+output), callers can ask the model for just the missing part with
+``continuation_prompt`` and fold the answer in with ``extend_graph``.
+
+``repair_stats`` counts outcomes so /stats shows how many regenerations
+the repairs saved.
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+repair_stats: Dict[str, int] = {
+    "clean": 0,           # parsed as-is
+    "repaired": 0,        # syntax fixed locally, nothing lost
+    "truncated": 0,       # cut-off output closed locally
+    "continuations": 0,   # follow-up prompts sent for a missing part
+    "continuationFailures": 0,
+    "failed": 0,          # nothing usable; the request fails
+    "droppedEdges": 0,
+    "duplicateIds": 0,
+}
+
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_MISSING_COMMA = re.compile(r"([}\]\"])(\s*\n\s*)(?=[{\"])")
+
+
+class GraphRepairError(ValueError):
+    pass
+
+
+@dataclass
+class RepairResult:
+    graph: dict
+    status: str  # "clean", "repaired" or "truncated"
+
+    @property
+    def complete(self) -> bool:
+        return self.status != "truncated" and bool(self.graph["edges"] or len(self.graph["nodes"]) < 2)
+
+
+def extract_object(text: str) -> Tuple[str, bool]:
+    """Return the outermost ``{...}`` in ``text`` and whether it was closed."""
+    start = text.find("{")
+    if start < 0:
+        raise GraphRepairError("no JSON object in response")
+    depth = 0
+    in_string = escape = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1], True
+    return text[start:], False
+
+
+def fix_syntax(raw: str) -> str:
+    """Remove trailing commas and add commas missing between items on separate lines."""
+    raw = _TRAILING_COMMA.sub(r"\1", raw)
+    return _MISSING_COMMA.sub(r"\1,\2", raw)
+
+
+def close_truncated(raw: str) -> str:
+    """Cut ``raw`` back to its last complete value and close every container still open."""
+    stack: List[str] = []
+    in_string = escape = False
+    cut, cut_stack = None, None
+    for i, char in enumerate(raw):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            if char == "[":
+                # An empty array is a safe place to stop too.
+                cut, cut_stack = i + 1, list(stack)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            cut, cut_stack = i + 1, list(stack)
+    if cut is None:
+        raise GraphRepairError("response ends before any complete value")
+    return raw[:cut].rstrip().rstrip(",") + "".join(reversed(cut_stack))
+
+
+def validate_graph(data) -> dict:
+    """Coerce parsed JSON into the nodes/edges schema, dropping what cannot be used."""
+    if not isinstance(data, dict):
+        raise GraphRepairError("response is not a JSON object")
+    nodes: List[dict] = []
+    ids = set()
+    for node in data.get("nodes") or []:
+        if not isinstance(node, dict) or node.get("id") in (None, ""):
+            continue
+        node_id = str(node["id"])
+        if node_id in ids:
+            repair_stats["duplicateIds"] += 1
+            continue
+        ids.add(node_id)
+        nodes.append({**node, "id": node_id, "label": str(node.get("label") or node_id)})
+    if not nodes:
+        raise GraphRepairError("response has no usable nodes")
+
+    edges: List[dict] = []
+    seen = set()
+    for edge in data.get("edges") or []:
+        if not isinstance(edge, dict):
+            continue
+        source, target = str(edge.get("source")), str(edge.get("target"))
+        if source not in ids or target not in ids or source == target or (source, target) in seen:
+            repair_stats["droppedEdges"] += 1
+            continue
+        seen.add((source, target))
+        edges.append({**edge, "id": f"e{len(edges) + 1}", "source": source, "target": target})
+    return {"nodes": nodes, "edges": edges}
+
+
+def parse_graph_json(text: str) -> Tuple[dict, str]:
+    """Parse the JSON object in ``text``, trying the cheapest fix first; returns ``(data, status)``."""
+    raw, closed = extract_object(text)
+    try:
+        return json.loads(raw), "clean"
+    except json.JSONDecodeError:
+        pass
+    fixed = fix_syntax(raw)
+    try:
+        return json.loads(fixed), "repaired" if closed else "truncated"
+    except json.JSONDecodeError:
+        return json.loads(fix_syntax(close_truncated(fixed))), "truncated"
+
+
+def repair_graph(text: str) -> RepairResult:
+    """Recover a schema-valid graph from model output or raise ``GraphRepairError``."""
+    try:
+        data, status = parse_graph_json(text)
+        graph = validate_graph(data)
+    except (GraphRepairError, json.JSONDecodeError) as e:
+        repair_stats["failed"] += 1
+        raise GraphRepairError(str(e)) from e
+    repair_stats[status] += 1
+    return RepairResult(graph=graph, status=status)
+
+
+def continuation_prompt(original_prompt: str, graph: dict) -> str:
+    """Ask only for the part of the graph that was cut off."""
+    written = json.dumps([{"id": node["id"], "label": node["label"]} for node in graph["nodes"]])
+    return f"""{original_prompt}
+
+Your previous answer to this request was cut off. These nodes were already received:
+{written}
+
+Return ONLY a JSON object {{"nodes": [...], "edges": [...]}} where "nodes" holds any remaining
+nodes that were not received yet (new ids only) and "edges" connects ALL nodes, old and new.
+Do not repeat the nodes above.
+"""
+
+
+def extend_graph(graph: dict, continuation_text: str) -> dict:
+    """Fold a continuation answer into ``graph``; its edges may reference nodes on either side."""
+    extra, _ = parse_graph_json(continuation_text)
+    if not isinstance(extra, dict):
+        raise GraphRepairError("continuation is not a JSON object")
+    return validate_graph({
+        "nodes": graph["nodes"] + list(extra.get("nodes") or []),
+        "edges": graph["edges"] + list(extra.get("edges") or []),
+    })
+
+
+def get_status() -> dict:
+    return {**repair_stats, "regenerationsSaved": repair_stats["repaired"] + repair_stats["truncated"]}
@@ -0,0 +1,93 @@
+"""
+Incremental parsing of a streamed mindmap response.
+
+Gemini writes the graph as one JSON object with ``nodes`` and ``edges``
+arrays. ``GraphStreamParser`` is fed the text as it arrives and returns
+every node or edge object the moment its closing brace is seen, so the
+client can start drawing long before the whole object is complete. It
+tolerates a leading code fence or prose before the object.
+"""
+import json
+from typing import List, Optional, Tuple
+
+GRAPH_ARRAYS = ("nodes", "edges")
+
+
+class GraphStreamParser:
+    def __init__(self):
+        # Chunks are kept as a list and only the new one is scanned, so a long response costs
+        # linear time; an item or key that spans chunks is collected in its own parts list.
+        self._chunks: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_parts: Optional[List[str]] = None
+        self._last_key: Optional[str] = None
+        self._array: Optional[str] = None
+        self._item_parts: Optional[List[str]] = None
+        self.nodes: List[dict] = []
+        self.edges: List[dict] = []
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, chunk: str) -> List[Tuple[str, dict]]:
+        """Consume ``chunk`` and return the newly completed ``("node" | "edge", item)`` pairs."""
+        self._chunks.append(chunk)
+        items: List[Tuple[str, dict]] = []
+        item_start = 0 if self._item_parts is not None else None
+        key_start = 0 if self._key_parts is not None else None
+        for i, char in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_parts is not None:
+                        self._last_key = "".join(self._key_parts) + chunk[key_start:i]
+                        self._key_parts = key_start = None
+                continue
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._key_parts, key_start = [], i + 1
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 2 and char == "[" and self._last_key in GRAPH_ARRAYS:
+                    self._array = self._last_key
+                elif self._depth == 3 and char == "{" and self._array:
+                    self._item_parts, item_start = [], i
+            elif char in "}]":
+                if self._depth == 3 and char == "}" and self._item_parts is not None:
+                    item = self._parse_item("".join(self._item_parts) + chunk[item_start:i + 1])
+                    if item is not None:
+                        items.append(self._record(item))
+                    self._item_parts = item_start = None
+                elif self._depth == 2:
+                    self._array = None
+                self._depth = max(0, self._depth - 1)
+        if self._item_parts is not None:
+            self._item_parts.append(chunk[item_start:])
+        if self._key_parts is not None:
+            self._key_parts.append(chunk[key_start:])
+        return items
+
+    def _parse_item(self, raw: str) -> Optional[dict]:
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
+
+    def _record(self, item: dict) -> Tuple[str, dict]:
+        if self._array == "nodes":
+            self.nodes.append(item)
+            return "node", item
+        self.edges.append(item)
+        return "edge", item
@@ -0,0 +1,195 @@
+"""
+Parallel PDF text extraction.
+
+Pages are split into small ranges and extracted in a process pool so large
+textbooks neither block the event loop nor hold the GIL. Ranges are
+collected in page order and extraction stops early once enough text has
+been gathered for the prompt, or when the page/time limits are hit.
+
+Workers are started with forkserver (spawn where that is unavailable)
+rather than forked from the threaded server process. If a worker dies, the
+broken pool is replaced and the extraction is retried once on the new one.
+
+pypdf is imported on first use; ``warm_pool`` imports it and starts the
+workers ahead of the first upload.
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS") or min(4, os.cpu_count() or 1))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK") or 16)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES") or 1000)
+PDF_TIME_LIMIT = float(os.getenv("PDF_TIME_LIMIT") or 60)
+PDF_START_METHOD = os.getenv("PDF_START_METHOD") or (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# Per worker process: the most recently opened document, so consecutive
+# ranges of the same file do not re-parse the cross-reference table.
+_worker_reader: Tuple[Optional[tuple], Optional["PdfReader"]] = (None, None)
+
+
+@dataclass
+class ExtractionResult:
+    text: str
+    pages_total: int
+    pages_extracted: int
+    stopped_early: Optional[str] = None  # "char_budget", "page_limit" or "time_limit"
+
+
+def _get_reader(path: str) -> "PdfReader":
+    from pypdf import PdfReader
+
+    global _worker_reader
+    # Temp file names get reused, so key on the file identity rather than the path alone.
+    st = os.stat(path)
+    key = (path, st.st_ino, st.st_size, st.st_mtime_ns)
+    if _worker_reader[0] != key:
+        _worker_reader = (key, PdfReader(path))
+    return _worker_reader[1]
+
+
+def _count_pages(path: str) -> int:
+    return len(_get_reader(path).pages)
+
+
+def _extract_range(path: str, start: int, end: int) -> List[str]:
+    """Runs in a worker process. Pages without a text layer yield an empty string."""
+    reader = _get_reader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context(PDF_START_METHOD))
+    return _pool
+
+
+def _replace_pool(broken: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died, unless a concurrent extraction already replaced it."""
+    global _pool
+    if _pool is broken:
+        _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _import_pypdf() -> None:
+    import pypdf  # noqa: F401
+
+
+def warm_pool() -> None:
+    """Import pypdf and start every pool worker. Blocking; run it in a thread."""
+    pool = get_pool()
+    for future in [pool.submit(_import_pypdf) for _ in range(PDF_WORKERS)]:
+        future.result()
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def extract_pdf_path(
+    path: str,
+    max_chars: Optional[int] = None,
+    max_pages: int = PDF_MAX_PAGES,
+    time_limit: float = PDF_TIME_LIMIT,
+) -> ExtractionResult:
+    """Extract text from the PDF at ``path`` without blocking the event loop."""
+    deadline = time.monotonic() + time_limit
+    pool = get_pool()
+    try:
+        return await _extract(pool, path, max_chars, max_pages, deadline)
+    except BrokenProcessPool:
+        # A worker died (crash or OOM kill), possibly on another request's document.
+        _replace_pool(pool)
+    pool = get_pool()
+    try:
+        return await _extract(pool, path, max_chars, max_pages, deadline)
+    except BrokenProcessPool:
+        _replace_pool(pool)
+        raise
+
+
+async def _extract(
+    pool: ProcessPoolExecutor, path: str, max_chars: Optional[int], max_pages: int, deadline: float
+) -> ExtractionResult:
+    loop = asyncio.get_running_loop()
+    try:
+        pages_total = await asyncio.wait_for(
+            loop.run_in_executor(pool, _count_pages, path), max(deadline - time.monotonic(), 0)
+        )
+    except asyncio.TimeoutError:
+        return ExtractionResult(text="", pages_total=0, pages_extracted=0, stopped_early="time_limit")
+    page_count = min(pages_total, max_pages)
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+
+    results: Dict[int, List[str]] = {}
+    in_flight: Dict[asyncio.Future, int] = {}
+    next_range = 0
+    next_to_join = 0
+    parts: List[str] = []
+    collected = 0
+    stopped_early = "page_limit" if page_count < pages_total else None
+
+    try:
+        while next_to_join < len(ranges):
+            # Keep every worker busy, but never run far ahead of what we may still need.
+            while next_range < len(ranges) and len(in_flight) < PDF_WORKERS * 2:
+                start, end = ranges[next_range]
+                in_flight[loop.run_in_executor(pool, _extract_range, path, start, end)] = next_range
+                next_range += 1
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                stopped_early = "time_limit"
+                break
+            done, _ = await asyncio.wait(in_flight, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                results[in_flight.pop(future)] = future.result()
+
+            # Only the contiguous prefix counts toward the budget, so the text stays in page order.
+            while next_to_join in results:
+                for page_text in results.pop(next_to_join):
+                    parts.append(page_text)
+                    collected += len(page_text) + 1
+                next_to_join += 1
+            if max_chars is not None and collected >= max_chars:
+                stopped_early = "char_budget"
+                break
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+    return ExtractionResult(
+        text="\n".join(parts),
+        pages_total=pages_total,
+        pages_extracted=len(parts),
+        stopped_early=stopped_early,
+    )
+
+
+async def extract_pdf_bytes(content: bytes, **limits) -> ExtractionResult:
+    """Convenience wrapper for in-memory uploads: workers read the document from a temp file."""
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        return await extract_pdf_path(path, **limits)
+    finally:
+        os.unlink(path)
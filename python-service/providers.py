@@ -0,0 +1,288 @@
+"""
+Async mindmap completions with the backend's provider fallback chain.
+
+Gemini is tried first, through the shared model handle in ``gemini_client``,
+then OpenRouter's fallback models in the order the backend's ``ai_service``
+uses. No attempt blocks the event loop: Gemini goes through the SDK's async
+client and OpenRouter through one pooled ``httpx.AsyncClient``. Each attempt
+takes a slot from its provider's scheduler. All attempts for one request
+share a single deadline (``MINDMAP_TIMEOUT``), and the scheduler queue wait
+counts toward it. ``stream`` streams Gemini's answer under the same deadline
+and falls back to the rest of the chain.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+import httpx
+
+import gemini_client
+import metrics
+import scheduler
+from scheduler import Overloaded
+
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY") or os.getenv("VITE_OPENROUTER_API_KEY")
+OPENROUTER_BASE_URL = (os.getenv("OPENROUTER_BASE_URL") or "https://openrouter.ai/api/v1").rstrip("/")
+# Same chain as OPENROUTER_FALLBACK_MODELS in backend/python_ai_services/ai_service.py
+OPENROUTER_FALLBACK_MODELS = [
+    "google/gemini-2.0-flash-lite-preview-02-05:free",
+    "google/gemini-flash-1.5",
+    "google/gemini-pro",
+    "mistralai/mistral-7b-instruct:free",
+    "openai/gpt-3.5-turbo",
+]
+OPENROUTER_MAX_TOKENS = int(os.getenv("OPENROUTER_MAX_TOKENS") or 8192)
+
+# Seconds for one mindmap call, fallbacks included
+MINDMAP_TIMEOUT = float(os.getenv("MINDMAP_TIMEOUT") or 90)
+
+GEMINI_SECONDS = metrics.histogram(
+    "gemini_request_seconds", "Latency of Gemini mindmap calls.", ("model", "kind", "outcome")
+)
+GEMINI_TOKENS = metrics.counter("gemini_tokens_total", "Tokens reported in Gemini usage metadata.", ("model", "kind"))
+OPENROUTER_SECONDS = metrics.histogram(
+    "openrouter_request_seconds", "Latency of OpenRouter fallback mindmap calls.", ("model", "kind", "outcome")
+)
+FALLBACKS = metrics.counter(
+    "mindmap_provider_fallbacks_total", "Mindmap calls passed on to a fallback model.", ("provider", "model")
+)
+
+_client: Optional[httpx.AsyncClient] = None
+_STREAM_END = object()
+
+
+class ProviderTimeout(RuntimeError):
+    """The chain ran out of time before any provider answered."""
+
+
+@dataclass
+class Completion:
+    text: str
+    provider: str
+    model: str
+
+
+def record_gemini_call(model: str, kind: str, started: float, outcome: str, response: Any = None) -> None:
+    """Latency and token counts for one Gemini call; ``kind`` is generate, stream or continuation."""
+    GEMINI_SECONDS.observe(time.perf_counter() - started, model=model, kind=kind, outcome=outcome)
+    usage = getattr(response, "usage_metadata", None)
+    for label, field in (("prompt", "prompt_token_count"), ("completion", "candidates_token_count")):
+        count = getattr(usage, field, 0) if usage is not None else 0
+        if count:
+            GEMINI_TOKENS.inc(count, model=model, kind=label)
+
+
+def chunk_text(chunk: Any) -> str:
+    """Text of one streamed Gemini chunk; chunks without parts (usage, safety) carry none."""
+    if not getattr(chunk, "candidates", None) or not chunk.parts:
+        return ""
+    return chunk.text
+
+
+def _openrouter_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=OPENROUTER_BASE_URL,
+            timeout=httpx.Timeout(MINDMAP_TIMEOUT, connect=10),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            headers={
+                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+                "HTTP-Referer": "https://gyan-ai.com",
+                "X-Title": "GYAN AI Mindmap",
+            },
+        )
+    return _client
+
+
+async def close() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _gemini(prompt: str, model: str, kind: str) -> Completion:
+    started = time.perf_counter()
+    try:
+        response = await gemini_client.generate_async(model, prompt)
+        text = response.text
+    except asyncio.CancelledError:
+        record_gemini_call(model, kind, started, "cancelled")
+        raise
+    except Exception:
+        record_gemini_call(model, kind, started, "error")
+        raise
+    record_gemini_call(model, kind, started, "ok", response)
+    return Completion(text=text, provider="gemini", model=model)
+
+
+async def _openrouter(prompt: str, model: str, kind: str) -> Completion:
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        response = await _openrouter_client().post(
+            "/chat/completions",
+            json={
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": OPENROUTER_MAX_TOKENS,
+            },
+        )
+        if not response.is_success:
+            raise RuntimeError(f"OpenRouter Error: HTTP {response.status_code}: {response.text[:200]}")
+        data = response.json()
+        text = data.get("choices", [{}])[0].get("message", {}).get("content") or ""
+        outcome = "ok"
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        OPENROUTER_SECONDS.observe(time.perf_counter() - started, model=model, kind=kind, outcome=outcome)
+    return Completion(text=text, provider="openrouter", model=data.get("model") or model)
+
+
+def candidates(model: str) -> List[Tuple[str, str]]:
+    chain = []
+    if gemini_client.GEMINI_API_KEY:
+        chain.append(("gemini", model))
+    if OPENROUTER_API_KEY:
+        chain.extend(("openrouter", name) for name in OPENROUTER_FALLBACK_MODELS)
+    return chain
+
+
+async def _attempt(provider: str, model: str, prompt: str, kind: str, priority: str, tenant: Optional[str]) -> Completion:
+    async with scheduler.slot(provider, priority, tenant):
+        call = _gemini if provider == "gemini" else _openrouter
+        return await call(prompt, model, kind)
+
+
+async def complete(
+    prompt: str,
+    model: str,
+    kind: str = "generate",
+    priority: str = "standard",
+    tenant: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> Completion:
+    """The first answer from the chain: Gemini ``model``, then the OpenRouter fallbacks.
+
+    ``timeout`` defaults to ``MINDMAP_TIMEOUT``.
+
+    Raises ``Overloaded`` when every provider shed the call, ``ProviderTimeout``
+    when time ran out, and ``RuntimeError`` listing each failure otherwise.
+    """
+    chain = candidates(model)
+    if not chain:
+        raise RuntimeError("No AI provider configured. Set GEMINI_API_KEY or OPENROUTER_API_KEY")
+    timeout = MINDMAP_TIMEOUT if timeout is None else timeout
+    return await _run_chain(chain, prompt, kind, priority, tenant, timeout, time.monotonic() + timeout, [], [])
+
+
+async def _run_chain(
+    chain: List[Tuple[str, str]],
+    prompt: str,
+    kind: str,
+    priority: str,
+    tenant: Optional[str],
+    timeout: float,
+    expires_at: float,
+    errors: List[str],
+    overloaded: List[Overloaded],
+) -> Completion:
+    """``complete`` over ``chain``, after the failures already in ``errors``."""
+    for provider, name in chain:
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            raise ProviderTimeout("; ".join(errors + [f"deadline of {timeout:g}s exceeded"]))
+        if errors:
+            FALLBACKS.inc(provider=provider, model=name)
+        try:
+            return await asyncio.wait_for(_attempt(provider, name, prompt, kind, priority, tenant), remaining)
+        except Overloaded as e:
+            overloaded.append(e)
+            errors.append(f"{provider}/{name}: {e}")
+        except asyncio.TimeoutError:
+            errors.append(f"{provider}/{name}: timed out")
+        except Exception as e:
+            errors.append(f"{provider}/{name}: {e}")
+    if overloaded and len(overloaded) == len(errors):
+        raise overloaded[0]
+    if time.monotonic() >= expires_at:
+        raise ProviderTimeout("; ".join(errors))
+    raise RuntimeError("; ".join(errors))
+
+
+async def _stream_gemini(
+    prompt: str, model: str, kind: str, priority: str, tenant: Optional[str], queue: asyncio.Queue
+) -> None:
+    started = time.perf_counter()
+    chunk = None
+    try:
+        async with scheduler.slot("gemini", priority, tenant):
+            async for chunk in gemini_client.stream_async(model, prompt):
+                text = chunk_text(chunk)
+                if text:
+                    queue.put_nowait(text)
+    except asyncio.CancelledError:
+        record_gemini_call(model, kind, started, "cancelled")
+        raise
+    except Exception:
+        record_gemini_call(model, kind, started, "error")
+        raise
+    # The last streamed chunk carries the usage totals for the whole answer.
+    record_gemini_call(model, kind, started, "ok", chunk)
+
+
+async def stream(
+    prompt: str,
+    model: str,
+    kind: str = "stream",
+    priority: str = "interactive",
+    tenant: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """The answer's text as it arrives: streamed from Gemini ``model``, else from the fallbacks.
+
+    Gemini streams under the same single deadline as ``complete``. If it is
+    shed, fails or runs out of time before sending any text, the OpenRouter
+    fallbacks answer in one piece with the time left. If it breaks off after
+    sending text, the stream ends there; the caller holds a truncated answer
+    and asks for the rest as after any cut-off response. Raises like ``complete``.
+    """
+    chain = candidates(model)
+    if not chain:
+        raise RuntimeError("No AI provider configured. Set GEMINI_API_KEY or OPENROUTER_API_KEY")
+    timeout = MINDMAP_TIMEOUT if timeout is None else timeout
+    expires_at = time.monotonic() + timeout
+    errors: List[str] = []
+    overloaded: List[Overloaded] = []
+    if chain[0][0] == "gemini":
+        chain = chain[1:]
+        # The stream runs in its own task so the deadline never fires inside the caller's code.
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.ensure_future(
+            asyncio.wait_for(_stream_gemini(prompt, model, kind, priority, tenant, queue), timeout)
+        )
+        task.add_done_callback(lambda _: queue.put_nowait(_STREAM_END))
+        sent = False
+        try:
+            while (text := await queue.get()) is not _STREAM_END:
+                sent = True
+                yield text
+        finally:
+            if not task.cancel() and not task.cancelled():
+                task.exception()  # finished already; its error is read below or not needed
+        error = None if task.cancelled() else task.exception()
+        if sent:
+            return
+        if isinstance(error, Overloaded):
+            overloaded.append(error)
+        errors.append(
+            f"gemini/{model}: "
+            + ("timed out" if isinstance(error, asyncio.TimeoutError) else str(error or "empty response"))
+        )
+    completion = await _run_chain(chain, prompt, kind, priority, tenant, timeout, expires_at, errors, overloaded)
+    yield completion.text
@@ -0,0 +1,223 @@
+"""
+Priority-aware admission control for upstream LLM calls.
+
+Each provider has a ``ProviderScheduler`` that caps its in-flight calls.
+When every slot is taken, callers queue by priority class. Within a class
+they queue per tenant (a school or teacher) and tenants are served round
+robin, so one class-wide assignment cannot crowd out everyone else. A
+queued caller that is not admitted within its class deadline, or that
+arrives when the queue is full, gets ``Overloaded`` with a Retry-After
+estimate instead of piling up.
+
+The same module is used by both services, so keep the copies in sync.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+import metrics
+
+PRIORITIES = ("interactive", "standard", "bulk")
+DEFAULT_TENANT = "default"
+
+WAIT_SECONDS = metrics.histogram(
+    "scheduler_wait_seconds", "Time upstream calls spent queued for a provider slot.", ("provider", "priority")
+)
+REJECTED = metrics.counter(
+    "scheduler_rejected_total", "Calls shed by admission control.", ("provider", "priority", "reason")
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class Overloaded(Exception):
+    """Admission refused; callers should answer 429 with ``Retry-After: retry_after``."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def normalize_priority(priority: Optional[str], default: str = "standard") -> str:
+    return priority if priority in PRIORITIES else default
+
+
+_schedulers: Dict[str, "ProviderScheduler"] = {}
+
+metrics.callback(
+    "scheduler_queue_depth", "Calls queued for a provider slot.",
+    lambda: {(name, p): s._queued[p] for name, s in _schedulers.items() for p in PRIORITIES}, ("provider", "priority"),
+)
+metrics.callback(
+    "scheduler_in_flight", "Upstream calls holding a provider slot.",
+    lambda: {name: s.in_flight for name, s in _schedulers.items()}, ("provider",),
+)
+
+
+class ProviderScheduler:
+    def __init__(
+        self,
+        provider: str,
+        max_in_flight: int,
+        deadlines: Dict[str, float],
+        max_queue: int = 500,
+    ):
+        self.provider = provider
+        self.max_in_flight = max_in_flight
+        self.deadlines = deadlines
+        self.max_queue = max_queue
+        self.in_flight = 0
+        # priority -> tenant -> waiters; tenant order is the round-robin turn.
+        self._queues: Dict[str, "OrderedDict[str, Deque[asyncio.Future]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._queued = {p: 0 for p in PRIORITIES}
+        self._hold_seconds: Optional[float] = None
+        self.stats = {"admitted": 0, "waited": 0, "rejectedQueueFull": 0, "rejectedDeadline": 0}
+        _schedulers[provider] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    @property
+    def queued(self) -> int:
+        return sum(self._queued.values())
+
+    def retry_after(self, priority: str) -> int:
+        """Seconds until the callers now queued at or above ``priority`` should have drained."""
+        ahead = sum(self._queued[p] for p in PRIORITIES[: PRIORITIES.index(priority) + 1])
+        hold = self._hold_seconds if self._hold_seconds is not None else 1.0
+        return max(1, math.ceil((ahead + 1) * hold / max(self.max_in_flight, 1)))
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "standard", tenant: Optional[str] = None):
+        """Hold one of the provider's in-flight slots for the duration of the block."""
+        if not self.enabled:
+            yield
+            return
+        priority = normalize_priority(priority)
+        await self._acquire(priority, tenant or DEFAULT_TENANT)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - started
+            if self._hold_seconds is None:
+                self._hold_seconds = held
+            else:
+                self._hold_seconds += 0.2 * (held - self._hold_seconds)
+            self._release()
+
+    async def _acquire(self, priority: str, tenant: str) -> None:
+        if self.in_flight < self.max_in_flight:
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            WAIT_SECONDS.observe(0.0, provider=self.provider, priority=priority)
+            return
+        if self.queued >= self.max_queue:
+            self.stats["rejectedQueueFull"] += 1
+            REJECTED.inc(provider=self.provider, priority=priority, reason="queue_full")
+            raise Overloaded(f"{self.provider} queue is full", self.retry_after(priority))
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(tenant, deque()).append(waiter)
+        self._queued[priority] += 1
+        self.stats["waited"] += 1
+        queued_at = time.monotonic()
+        deadline = self.deadlines.get(priority, 30.0)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), deadline)
+        except asyncio.CancelledError:
+            if self._admitted(waiter):
+                self._release()
+            else:
+                self._forget(priority, tenant, waiter)
+            raise
+        except asyncio.TimeoutError:
+            # A slot handed over just as the deadline hit is still taken.
+            if not self._admitted(waiter):
+                self._forget(priority, tenant, waiter)
+                self.stats["rejectedDeadline"] += 1
+                REJECTED.inc(provider=self.provider, priority=priority, reason="deadline")
+                raise Overloaded(
+                    f"{self.provider} is busy; not admitted within {deadline:g}s", self.retry_after(priority)
+                ) from None
+        WAIT_SECONDS.observe(time.monotonic() - queued_at, provider=self.provider, priority=priority)
+        self.stats["admitted"] += 1
+
+    @staticmethod
+    def _admitted(waiter: asyncio.Future) -> bool:
+        return waiter.done() and not waiter.cancelled()
+
+    def _forget(self, priority: str, tenant: str, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        waiters = self._queues[priority].get(tenant)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self._queued[priority] -= 1
+            if not waiters:
+                del self._queues[priority][tenant]
+
+    def _release(self) -> None:
+        """Give the freed slot to the next waiter: highest class first, tenants in turn."""
+        for priority in PRIORITIES:
+            tenants = self._queues[priority]
+            while tenants:
+                tenant, waiters = tenants.popitem(last=False)
+                waiter = waiters.popleft()
+                self._queued[priority] -= 1
+                if waiters:
+                    tenants[tenant] = waiters  # back of the round-robin order
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self.in_flight -= 1
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "maxInFlight": self.max_in_flight,
+            "inFlight": self.in_flight,
+            "queued": dict(self._queued),
+            "tenantsQueued": {p: len(self._queues[p]) for p in PRIORITIES},
+            "avgHoldSeconds": round(self._hold_seconds, 3) if self._hold_seconds is not None else None,
+            "deadlines": self.deadlines,
+            **self.stats,
+        }
+
+
+# Per-provider in-flight caps; override with e.g. GEMINI_MAX_IN_FLIGHT (0 disables the scheduler).
+DEFAULT_IN_FLIGHT = {"gemini": 8, "openrouter": 32}
+DEFAULT_DEADLINES = {"interactive": 5.0, "standard": 30.0, "bulk": 120.0}
+
+
+def get_scheduler(provider: str) -> ProviderScheduler:
+    """The process-wide scheduler for ``provider``, created from the environment on first use.
+
+    Queue deadlines per class come from SCHEDULER_DEADLINE_INTERACTIVE/_STANDARD/_BULK.
+    """
+    scheduler = _schedulers.get(provider)
+    if scheduler is None:
+        scheduler = ProviderScheduler(
+            provider,
+            max_in_flight=int(_env_float(f"{provider.upper()}_MAX_IN_FLIGHT", DEFAULT_IN_FLIGHT.get(provider, 8))),
+            deadlines={p: _env_float(f"SCHEDULER_DEADLINE_{p.upper()}", d) for p, d in DEFAULT_DEADLINES.items()},
+            max_queue=int(_env_float("SCHEDULER_MAX_QUEUE", 500)),
+        )
+    return scheduler
+
+
+def slot(provider: str, priority: Optional[str] = None, tenant: Optional[str] = None):
+    """``async with slot("gemini", "interactive", tenant): ...`` around one upstream call."""
+    return get_scheduler(provider).slot(normalize_priority(priority), tenant)
+
+
+def get_status() -> Dict[str, Any]:
+    return {name: scheduler.get_status() for name, scheduler in _schedulers.items()}
@@ -0,0 +1,255 @@
+"""
+Near-duplicate cache for topic mindmaps.
+
+"Photosynthesis", "photosynthesis process" and "process of photosynthesis"
+should all reuse one generated mindmap. Topics are embedded locally (no
+network) as signed, hashed character n-gram vectors after dropping filler
+words, and looked up by cosine similarity against a NumPy matrix of cached
+topics.
+
+Character n-grams also rate "Organic chemistry" close to "Inorganic
+chemistry" and "World War 1" close to "World War 2", so a near match is only
+accepted when the topics' distinguishing tokens agree as well. Numbers and
+grade markers ("class 7" -> "grade7") must match exactly. Every other word
+must have a counterpart that is the same word up to a plural or a one-letter
+typo.
+
+Every entry also carries the ``version`` it was generated with (the model
+and prompt version), and a lookup only considers entries of its own version,
+so changing either stops old mindmaps from being served.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH") or os.path.join(
+    os.path.dirname(__file__), ".cache", "semantic_topics"
+)
+SEMANTIC_CACHE_CAPACITY = int(os.getenv("SEMANTIC_CACHE_CAPACITY") or 2000)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD") or 0.85)
+SEMANTIC_CACHE_SAVE_INTERVAL = float(os.getenv("SEMANTIC_CACHE_SAVE_INTERVAL") or 30)
+EMBEDDING_DIM = 512
+
+# How many of the most similar topics are checked for matching distinguishing tokens
+SEMANTIC_CACHE_CANDIDATES = 5
+
+_GRADE = re.compile(r"\b(?:class|grade|std|standard|level)\s*(\d+)(?:st|nd|rd|th)?\b")
+_SECTION = re.compile(r"\b(chapter|unit)\s*(\d+)\b")
+_FILLER = re.compile(
+    r"\b(?:the|a|an|of|and|in|on|for|to|about|what|is|are|explain|introduction|intro|"
+    r"basics|overview|process|concept|concepts|topic|notes)\b"
+)
+_ROMAN = re.compile(r"^(?:i|ii|iii|iv|v|vi|vii|viii|ix|x|xi|xii)$")
+
+
+def normalize_topic(topic: str) -> str:
+    text = re.sub(r"[^\w\s]", " ", topic.lower())
+    text = _GRADE.sub(r" grade\1 ", text)
+    text = _SECTION.sub(r" \1\2 ", text)
+    text = _FILLER.sub(" ", text)
+    words = text.split()
+    # Order rarely changes meaning for a topic name ("cell structure" / "structure of cell").
+    return " ".join(sorted(words)) if words else topic.lower().strip()
+
+
+def _is_marker(word: str) -> bool:
+    """Numbers, grade/chapter markers and roman numerals: tokens that must match exactly."""
+    return any(c.isdigit() for c in word) or bool(_ROMAN.match(word))
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _one_edit(a: str, b: str) -> bool:
+    """True when ``a`` and ``b`` differ by at most one insertion, deletion or substitution."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:] or (len(a) == len(b) and a[i + 1:] == b[i + 1:])
+
+
+def _close(a: str, b: str) -> bool:
+    a, b = _stem(a), _stem(b)
+    return a == b or (min(len(a), len(b)) >= 5 and _one_edit(a, b))
+
+
+def same_topic(a: str, b: str) -> bool:
+    """Whether two topics agree on every distinguishing token (see the module docstring)."""
+    words_a, words_b = normalize_topic(a).split(), normalize_topic(b).split()
+    if {w for w in words_a if _is_marker(w)} != {w for w in words_b if _is_marker(w)}:
+        return False
+    content_a = [w for w in words_a if not _is_marker(w)]
+    content_b = [w for w in words_b if not _is_marker(w)]
+    return all(any(_close(x, y) for y in content_b) for x in content_a) and all(
+        any(_close(y, x) for x in content_a) for y in content_b
+    )
+
+
+def embed(topic: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Unit-length hashed character 2-4-gram vector; crc32 keeps it stable across processes."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in normalize_topic(topic).split():
+        padded = f" {word} "
+        for n in (2, 3, 4):
+            for i in range(len(padded) - n + 1):
+                h = zlib.crc32(padded[i:i + n].encode("utf-8"))
+                vector[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Fixed-capacity cosine-similarity index with least-recently-used eviction."""
+
+    def __init__(self, path: Optional[str], capacity: int, threshold: float, dim: int = EMBEDDING_DIM):
+        self.path = path
+        self.capacity = capacity
+        self.threshold = threshold
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.topics: list = [None] * capacity
+        self.values: list = [None] * capacity
+        self.versions: list = [None] * capacity
+        # Per-slot version as a small integer, so lookups can mask other versions out in NumPy.
+        self.version_ids = np.zeros(capacity, dtype=np.int32)
+        self._version_codes: Dict[str, int] = {}
+        self.size = 0
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "rejectedNear": 0}
+        self._saving = False
+        if path:
+            self.load()
+
+    def _version_id(self, version: Optional[str]) -> int:
+        if version is None:
+            return 0
+        return self._version_codes.setdefault(version, len(self._version_codes) + 1)
+
+    def lookup(self, topic: str, version: str) -> Optional[Tuple[dict, float, str]]:
+        """Return ``(value, similarity, cached_topic)`` for the closest matching topic above the threshold."""
+        version_id = self._version_codes.get(version)
+        if self.size and version_id is not None:
+            scores = self.vectors[:self.size] @ embed(topic)
+            scores[self.version_ids[:self.size] != version_id] = -1.0
+            count = min(SEMANTIC_CACHE_CANDIDATES, self.size)
+            nearest = np.argpartition(-scores, count - 1)[:count]
+            for index in sorted(nearest.tolist(), key=lambda i: -scores[i]):
+                if scores[index] < self.threshold:
+                    break
+                if same_topic(topic, self.topics[index]):
+                    self.last_used[index] = time.time()
+                    self.stats["hits"] += 1
+                    return self.values[index], float(scores[index]), self.topics[index]
+                self.stats["rejectedNear"] += 1
+        self.stats["misses"] += 1
+        return None
+
+    def add(self, topic: str, value: dict, version: str) -> None:
+        if self.size < self.capacity:
+            slot = self.size
+            self.size += 1
+        else:
+            slot = int(np.argmin(self.last_used))
+            self.stats["evictions"] += 1
+        self.vectors[slot] = embed(topic)
+        self.last_used[slot] = time.time()
+        self.topics[slot] = topic
+        self.values[slot] = value
+        self.versions[slot] = version
+        self.version_ids[slot] = self._version_id(version)
+        self.dirty = True
+
+    async def aadd(self, topic: str, value: dict, version: str) -> None:
+        """``add``, then write the cache to disk in a thread if the save interval has passed."""
+        self.add(topic, value, version)
+        if time.monotonic() - self.saved_at > SEMANTIC_CACHE_SAVE_INTERVAL:
+            await self.asave()
+
+    def _snapshot(self) -> Tuple[np.ndarray, np.ndarray, List, List, List]:
+        # Copies taken on the caller's thread, so the loop can keep adding while they are written.
+        size = self.size
+        return (self.vectors[:size].copy(), self.last_used[:size].copy(), self.topics[:size], self.values[:size],
+                self.versions[:size])
+
+    def _write(self, snapshot: Tuple[np.ndarray, np.ndarray, List, List, List]) -> None:
+        vectors, last_used, topics, values, versions = snapshot
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        np.savez(self.path + ".tmp.npz", vectors=vectors, last_used=last_used)
+        with open(self.path + ".tmp.json", "w", encoding="utf-8") as f:
+            json.dump({"topics": topics, "values": values, "versions": versions}, f)
+        os.replace(self.path + ".tmp.npz", self.path + ".npz")
+        os.replace(self.path + ".tmp.json", self.path + ".json")
+
+    def save(self) -> None:
+        if not self.path or not self.dirty:
+            return
+        self._write(self._snapshot())
+        self.dirty = False
+        self.saved_at = time.monotonic()
+
+    async def asave(self) -> None:
+        """``save`` with the JSON and NumPy writes off the event loop."""
+        if not self.path or not self.dirty or self._saving:
+            return
+        self._saving = True
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        try:
+            await asyncio.to_thread(self._write, self._snapshot())
+        except BaseException:
+            self.dirty = True
+            raise
+        finally:
+            self._saving = False
+
+    def load(self) -> None:
+        try:
+            arrays = np.load(self.path + ".npz")
+            with open(self.path + ".json", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        count = min(len(entries["topics"]), len(arrays["vectors"]), self.capacity)
+        if count and arrays["vectors"].shape[1] != self.vectors.shape[1]:
+            return
+        # Keep the most recently used entries if the capacity shrank.
+        order = np.argsort(arrays["last_used"])[::-1][:count]
+        # Files written before entries were versioned load unversioned and never match a lookup.
+        versions = entries.get("versions") or [None] * count
+        for slot, index in enumerate(order):
+            self.vectors[slot] = arrays["vectors"][index]
+            self.last_used[slot] = arrays["last_used"][index]
+            self.topics[slot] = entries["topics"][index]
+            self.values[slot] = entries["values"][index]
+            self.versions[slot] = versions[index] if index < len(versions) else None
+            self.version_ids[slot] = self._version_id(self.versions[slot])
+        self.size = count
+
+    def get_status(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hitRate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": self.size,
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+        }
+
+
+semantic_cache = SemanticCache(SEMANTIC_CACHE_PATH, SEMANTIC_CACHE_CAPACITY, SEMANTIC_CACHE_THRESHOLD)
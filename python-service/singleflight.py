@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class SingleFlightTimeout(TimeoutError):
+    pass
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key onto one in-flight task.
+
+    The first caller for a key (the leader) starts the work; callers that
+    arrive while it is running (followers) await the same task and receive
+    its result or exception. The task is shielded, so a caller that goes
+    away does not cancel the work for everybody else.
+    """
+
+    def __init__(self, wait_timeout: Optional[float] = None):
+        self.wait_timeout = wait_timeout
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"leaders": 0, "coalesced": 0, "timeouts": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), self.wait_timeout)
+            except asyncio.TimeoutError as exc:
+                self.stats["timeouts"] += 1
+                raise SingleFlightTimeout(
+                    f"Timed out after {self.wait_timeout}s waiting for an identical in-flight request"
+                ) from exc
+
+        self.stats["leaders"] += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        # Mark the exception as retrieved in case every waiter has already gone away.
+        if not task.cancelled():
+            task.exception()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {**self.stats, "inFlight": len(self._inflight), "waitTimeout": self.wait_timeout}
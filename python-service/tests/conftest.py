@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# The service's modules import each other by bare name, as uvicorn runs them from this directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the job queue and caches of an imported ``main`` out of the source tree.
+_workdir = tempfile.mkdtemp(prefix="python-service-tests-")
+for _name, _file in (("JOB_DB_PATH", "jobs.sqlite"), ("DOCUMENT_CACHE_PATH", "documents.sqlite"),
+                     ("SEMANTIC_CACHE_PATH", "semantic")):
+    os.environ.setdefault(_name, os.path.join(_workdir, _file))
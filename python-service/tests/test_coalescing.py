@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+import main
+from scheduler import Overloaded
+
+
+def test_interactive_call_does_not_join_a_bulk_leader(monkeypatch):
+    calls = []
+
+    async def fake_generate(prompt, priority, tenant):
+        calls.append(priority)
+        await asyncio.sleep(0.05)
+        return {"priority": priority}
+
+    monkeypatch.setattr(main, "generate_mindmap_graph", fake_generate)
+
+    async def scenario():
+        return await asyncio.gather(
+            main.generate_mindmap_coalesced("same prompt", "bulk"),
+            main.generate_mindmap_coalesced("same prompt", "interactive"),
+            main.generate_mindmap_coalesced("same prompt", "interactive"),
+        )
+
+    bulk, first, second = asyncio.run(scenario())
+    assert sorted(calls) == ["bulk", "interactive"]
+    assert bulk == {"priority": "bulk"}
+    assert first == second == {"priority": "interactive"}
+
+
+def test_shed_bulk_call_stops_retrying_at_the_deadline(monkeypatch):
+    attempts = []
+
+    async def always_shed(prompt, priority, tenant):
+        attempts.append(priority)
+        raise Overloaded("queue full", retry_after=0)
+
+    monkeypatch.setattr(main, "generate_mindmap_graph", always_shed)
+    monkeypatch.setattr(main, "BULK_RETRY_SECONDS", 0.05)
+    with pytest.raises(Overloaded):
+        asyncio.run(main.generate_mindmap_coalesced("prompt", "bulk"))
+    assert len(attempts) > 1
+
+
+def test_shed_interactive_call_is_not_retried(monkeypatch):
+    attempts = []
+
+    async def always_shed(prompt, priority, tenant):
+        attempts.append(priority)
+        raise Overloaded("queue full", retry_after=0)
+
+    monkeypatch.setattr(main, "generate_mindmap_graph", always_shed)
+    with pytest.raises(Overloaded):
+        asyncio.run(main.generate_mindmap_coalesced("prompt", "interactive"))
+    assert attempts == ["interactive"]
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+from jobs import JobManager
+
+
+def test_job_store_writes_stay_off_the_event_loop(tmp_path, monkeypatch):
+    manager = JobManager(str(tmp_path / "jobs.sqlite"), workers=1, queue_size=10, ttl=3600)
+    connect = manager._connect
+    loop_threads = []
+
+    def tracked_connect():
+        if threading.current_thread() is threading.main_thread():
+            loop_threads.append(threading.current_thread().name)
+        return connect()
+
+    monkeypatch.setattr(manager, "_connect", tracked_connect)
+
+    async def job(progress):
+        for stage in ("extracting", "generating", "layout"):
+            progress(stage, {"stage": stage})
+            await asyncio.sleep(0)
+        return {"nodes": []}
+
+    async def scenario():
+        await manager.start()
+        try:
+            job_id = await manager.submit("text", job)
+            events = [event["status"] async for event in manager.events(job_id)]
+            return events, await asyncio.to_thread(manager.get, job_id)
+        finally:
+            await manager.stop()
+
+    events, stored = asyncio.run(scenario())
+    assert loop_threads == []
+    assert events[-1] == "done"
+    # The final event is only published once the row says so.
+    assert stored["status"] == "done"
+    assert stored["result"] == {"nodes": []}
+
+
+def test_failed_job_is_stored_before_its_event(tmp_path):
+    manager = JobManager(str(tmp_path / "jobs.sqlite"), workers=1, queue_size=10, ttl=3600)
+
+    async def job(progress):
+        progress("extracting", None)
+        raise RuntimeError("boom")
+
+    async def scenario():
+        await manager.start()
+        try:
+            job_id = await manager.submit("text", job)
+            async for event in manager.events(job_id):
+                if event["status"] == "failed":
+                    return manager.get(job_id)
+        finally:
+            await manager.stop()
+
+    stored = asyncio.run(scenario())
+    assert stored["status"] == "failed"
+    assert stored["error"] == "boom"
@@ -0,0 +1,82 @@
+"""Simultaneous mindmap requests must not hold the event loop, whichever provider answers."""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import gemini_client
+import main
+import providers
+import scheduler
+from benchmarks.fixtures import FakeGeminiModel, openrouter_transport
+
+REQUESTS = 20
+LATENCY = 0.2
+TIMEOUT = 0.6
+
+
+@pytest.fixture
+def mock_providers(monkeypatch):
+    """Gemini and the OpenRouter chain answer after LATENCY, with scheduler caps lifted."""
+    monkeypatch.setattr(gemini_client, "GEMINI_API_KEY", "test")
+    monkeypatch.setattr(gemini_client, "GEMINI_API_ENDPOINT", None)
+    monkeypatch.setattr(gemini_client, "_genai", gemini_client._genai or object())
+    monkeypatch.setattr(providers, "OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(providers, "MINDMAP_TIMEOUT", TIMEOUT)
+    client = httpx.AsyncClient(base_url="http://openrouter.test", transport=openrouter_transport(LATENCY))
+    monkeypatch.setattr(providers, "_client", client)
+    for provider in ("gemini", "openrouter"):
+        monkeypatch.setattr(scheduler.get_scheduler(provider), "max_in_flight", 0)
+
+    def use_gemini(model):
+        monkeypatch.setattr(gemini_client, "get_model", lambda name: model)
+
+    return use_gemini
+
+
+async def burst(path: str, bodies):
+    """Send every body at once while polling /health; (statuses, seconds, slowest /health)."""
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=TIMEOUT * 4) as client:
+        stalls = []
+        running = True
+
+        async def probe_health():
+            while running:
+                started = time.perf_counter()
+                await client.get("/health")
+                stalls.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        probe = asyncio.create_task(probe_health())
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.post(path, json=body) for body in bodies))
+        elapsed = time.perf_counter() - started
+        running = False
+        await probe
+    return sorted({response.status_code for response in responses}), elapsed, max(stalls)
+
+
+@pytest.mark.parametrize("scenario, expected_status, expected_seconds", [
+    ("gemini", 200, LATENCY),
+    ("fallback", 200, LATENCY),
+    ("timeout", 504, TIMEOUT),
+])
+def test_concurrent_mindmaps_finish_in_one_upstream_call(mock_providers, scenario, expected_status, expected_seconds):
+    gemini_latency = TIMEOUT + LATENCY if scenario == "timeout" else LATENCY
+    mock_providers(FakeGeminiModel(gemini_latency, fail=scenario == "fallback"))
+    bodies = [{"text": f"{scenario} lesson {i} on the water cycle"} for i in range(REQUESTS)]
+    statuses, elapsed, slowest_health = asyncio.run(burst("/generate-mindmap-from-text", bodies))
+    assert statuses == [expected_status]
+    assert elapsed < expected_seconds * 2 + 0.2
+    assert slowest_health < 0.1
+
+
+def test_concurrent_streams_do_not_block_health(mock_providers):
+    mock_providers(FakeGeminiModel(LATENCY))
+    bodies = [{"text": f"streamed lesson {i} on the water cycle"} for i in range(REQUESTS)]
+    statuses, elapsed, slowest_health = asyncio.run(burst("/generate-mindmap-from-text/stream", bodies))
+    assert statuses == [200]
+    assert elapsed < LATENCY * 2 + 0.2
+    assert slowest_health < 0.1
@@ -0,0 +1,35 @@
+import json
+
+from mindmap_stream import GraphStreamParser
+
+GRAPH = {
+    "title": 'Cells "and" {braces}',
+    "nodes": [{"id": str(i), "label": f'Node {i} \\" }} {{', "data": {"tags": [i, {"x": i}]}} for i in range(5)],
+    "edges": [{"source": str(i), "target": str(i + 1)} for i in range(4)],
+}
+RESPONSE = "Here is the map:\n```json\n" + json.dumps(GRAPH, indent=1) + "\n```"
+
+
+def feed_all(parser, pieces):
+    return [item for piece in pieces for item in parser.feed(piece)]
+
+
+def test_items_are_the_same_however_the_stream_is_split():
+    expected = [("node", node) for node in GRAPH["nodes"]] + [("edge", edge) for edge in GRAPH["edges"]]
+    for size in (1, 2, 7, 64, len(RESPONSE)):
+        parser = GraphStreamParser()
+        pieces = [RESPONSE[i:i + size] for i in range(0, len(RESPONSE), size)]
+        assert feed_all(parser, pieces) == expected
+        assert parser.text == RESPONSE
+        assert (parser.nodes, parser.edges) == (GRAPH["nodes"], GRAPH["edges"])
+
+
+def test_a_long_stream_in_small_chunks_is_not_copied_per_chunk():
+    graph = {"nodes": [{"id": str(i), "label": "x" * 200} for i in range(2000)], "edges": []}
+    text = json.dumps(graph)
+    parser = GraphStreamParser()
+    feed_all(parser, (text[i:i + 16] for i in range(0, len(text), 16)))
+    assert len(parser.nodes) == 2000
+    # Nothing is joined until someone asks for the whole text.
+    assert len(parser._chunks) > 1
+    assert parser.text == text
@@ -0,0 +1,40 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+import pdf_extraction
+from benchmarks.fixtures import make_pdf
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = os.path.join(tmp_path, "doc.pdf")
+    with open(path, "wb") as f:
+        f.write(make_pdf(20, lines_per_page=5))
+    yield path
+    pdf_extraction.shutdown_pool()
+
+
+def test_extracts_every_page(pdf_path):
+    result = asyncio.run(pdf_extraction.extract_pdf_path(pdf_path))
+    assert result.pages_total == result.pages_extracted == 20
+    assert result.stopped_early is None and result.text
+
+
+def test_dead_worker_is_replaced(pdf_path):
+    pool = pdf_extraction.get_pool()
+    pool.submit(os.getpid).result()  # start the workers
+    for pid in list(pool._processes):
+        os.kill(pid, signal.SIGKILL)
+
+    result = asyncio.run(pdf_extraction.extract_pdf_path(pdf_path))
+    assert result.pages_extracted == 20
+    assert pdf_extraction.get_pool() is not pool
+
+
+def test_page_count_is_bounded_by_the_time_limit(pdf_path):
+    result = asyncio.run(pdf_extraction.extract_pdf_path(pdf_path, time_limit=0))
+    assert result.stopped_early == "time_limit"
+    assert result.pages_extracted == 0
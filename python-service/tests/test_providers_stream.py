@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import gemini_client
+import providers
+
+
+class Chunk:
+    def __init__(self, text=None):
+        self.candidates = [object()] if text is not None else []
+        self.parts = [text] if text else []
+        self.text = text
+        self.usage_metadata = None
+
+
+def fake_stream(*chunks, fail=None, hang=0.0):
+    async def stream_async(name, prompt):
+        for chunk in chunks:
+            yield chunk
+        await asyncio.sleep(hang)
+        if fail:
+            raise fail
+
+    return stream_async
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    """Gemini plus one OpenRouter fallback that answers "fallback"; returns the OpenRouter call log."""
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "fallback"}}]})
+
+    monkeypatch.setattr(gemini_client, "GEMINI_API_KEY", "test")
+    monkeypatch.setattr(providers, "OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(providers, "OPENROUTER_FALLBACK_MODELS", ["test/fallback"])
+    client = httpx.AsyncClient(base_url="http://openrouter.test", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(providers, "_client", client)
+    return calls
+
+
+def collect(**kwargs):
+    async def run():
+        return [text async for text in providers.stream("prompt", "gemini-test", **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_chunks_without_parts_are_skipped(chain, monkeypatch):
+    chunks = Chunk('{"nodes"'), Chunk(), Chunk(""), Chunk(": []}")
+    monkeypatch.setattr(gemini_client, "stream_async", fake_stream(*chunks))
+    assert collect() == ['{"nodes"', ": []}"]
+    assert not chain
+
+
+def test_gemini_failing_before_any_text_falls_back(chain, monkeypatch):
+    monkeypatch.setattr(gemini_client, "stream_async", fake_stream(Chunk(), fail=RuntimeError("503 overloaded")))
+    assert collect() == ["fallback"]
+    assert len(chain) == 1
+
+
+def test_stream_breaking_off_after_text_just_ends(chain, monkeypatch):
+    monkeypatch.setattr(gemini_client, "stream_async", fake_stream(Chunk("{\"nodes\": ["), fail=RuntimeError("reset")))
+    assert collect() == ['{"nodes": [']
+    assert not chain
+
+
+def test_hanging_stream_is_bounded_by_the_deadline(chain, monkeypatch):
+    monkeypatch.setattr(providers, "OPENROUTER_API_KEY", None)
+    monkeypatch.setattr(gemini_client, "stream_async", fake_stream(hang=5))
+    started = time.monotonic()
+    with pytest.raises(providers.ProviderTimeout):
+        collect(timeout=0.1)
+    assert time.monotonic() - started < 1
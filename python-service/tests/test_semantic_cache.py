@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from semantic_cache import SemanticCache, normalize_topic, same_topic
+
+GRAPH = {"nodes": [{"id": "root", "label": "cached"}], "edges": []}
+VERSION = "gemini-2.0-flash:abc123"
+
+
+def cache_with(topic, path=None):
+    cache = SemanticCache(path, capacity=16, threshold=0.85)
+    cache.add(topic, GRAPH, VERSION)
+    return cache
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("WW1", "WW2"),
+    ("World War 1", "World War 2"),
+    ("Organic chemistry", "Inorganic chemistry"),
+    ("Fractions class 3", "Fractions class 10"),
+    ("Algebra chapter 2", "Algebra chapter 3"),
+    ("Photosynthesis", "Respiration"),
+])
+def test_distinct_topics_miss(cached, asked):
+    assert not same_topic(cached, asked)
+    assert cache_with(cached).lookup(asked, VERSION) is None
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Photosynthesis", "photosynthesis process"),
+    ("Photosynthesis", "Process of Photosynthesis"),
+    ("cell structure", "Structure of the cell"),
+    ("Fractions class 3", "fractions grade 3"),
+    ("Fractions class 3", "Fraction Class 3rd"),
+])
+def test_rephrased_topics_hit(cached, asked):
+    hit = cache_with(cached).lookup(asked, VERSION)
+    assert hit is not None
+    assert hit[0] == GRAPH and hit[2] == cached
+
+
+def test_one_letter_typo_is_the_same_topic():
+    assert same_topic("Photosynthesis", "photosynthsis")
+    assert not same_topic("Organic", "Inorganic")
+
+
+def test_grade_markers_stay_in_the_key():
+    assert normalize_topic("Fractions class 3") == "fractions grade3"
+    assert normalize_topic("Fractions std 10") == "fractions grade10"
+
+
+def test_near_miss_does_not_hide_a_real_match():
+    cache = SemanticCache(None, capacity=16, threshold=0.85)
+    cache.add("World War 1", {"war": 1}, VERSION)
+    cache.add("World War 2", {"war": 2}, VERSION)
+    assert cache.lookup("world war 2", VERSION)[0] == {"war": 2}
+
+
+def test_asave_writes_off_the_loop_and_reloads(tmp_path):
+    path = os.path.join(tmp_path, "semantic")
+    cache = cache_with("Photosynthesis", path)
+    asyncio.run(cache.asave())
+    assert not cache.dirty
+    reloaded = SemanticCache(path, capacity=16, threshold=0.85)
+    assert reloaded.lookup("photosynthesis process", VERSION)[0] == GRAPH
+    assert reloaded.lookup("photosynthesis process", "gemini-2.5-flash:abc123") is None
+
+
+def test_entries_of_another_model_or_prompt_are_not_served():
+    cache = SemanticCache(None, capacity=16, threshold=0.85)
+    cache.add("Photosynthesis", {"model": "old"}, "gemini-1.5-flash:abc123")
+    assert cache.lookup("Photosynthesis", VERSION) is None
+    cache.add("Photosynthesis", GRAPH, VERSION)
+    assert cache.lookup("Photosynthesis", VERSION)[0] == GRAPH
+    assert cache.lookup("Photosynthesis", "gemini-2.0-flash:def456") is None
+
+
+def test_unversioned_entries_from_an_older_file_never_match(tmp_path):
+    path = os.path.join(tmp_path, "semantic")
+    cache = cache_with("Photosynthesis", path)
+    cache.save()
+    with open(path + ".json", encoding="utf-8") as f:
+        entries = json.load(f)
+    del entries["versions"]
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+    assert SemanticCache(path, capacity=16, threshold=0.85).lookup("Photosynthesis", VERSION) is None
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import os
+import tracemalloc
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import main
+import uploads
+
+BOUNDARY = "test-boundary"
+PIECE = 64 * 1024
+
+
+class StreamedBody:
+    """ASGI ``receive`` for a multipart upload whose file content arrives in pieces."""
+
+    def __init__(self, filename, pieces):
+        self.pieces = iter(pieces)
+        self.head = (
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        self.tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+        self.received = 0
+        self.done = False
+
+    async def __call__(self):
+        if self.head:
+            body, self.head = self.head, b""
+        else:
+            body = next(self.pieces, None)
+            if body is None:
+                self.done = True
+                return {"type": "http.request", "body": self.tail, "more_body": False}
+            self.received += len(body)
+        return {"type": "http.request", "body": body, "more_body": True}
+
+    def request(self):
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/generate-mindmap",
+            "headers": [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())],
+        }
+        return Request(scope, self)
+
+
+def pieces(first, total, filler=b"x"):
+    yield first
+    sent = len(first)
+    while sent < total:
+        piece = filler * min(PIECE, total - sent)
+        sent += len(piece)
+        yield piece
+
+
+def receive(body):
+    return asyncio.run(uploads.receive_upload(body.request()))
+
+
+@pytest.fixture
+def temp_files(monkeypatch):
+    """Paths of the temp files receive_upload created."""
+    created = []
+    mkstemp = uploads.tempfile.mkstemp
+
+    def tracking_mkstemp(*args, **kwargs):
+        fd, path = mkstemp(*args, **kwargs)
+        created.append(path)
+        return fd, path
+
+    monkeypatch.setattr(uploads.tempfile, "mkstemp", tracking_mkstemp)
+    return created
+
+
+def test_file_is_written_once_with_its_hash(temp_files):
+    content = b"%PDF-1.4\n" + os.urandom(3 * 1024 * 1024)
+    body = StreamedBody("notes.pdf", [content[i:i + PIECE] for i in range(0, len(content), PIECE)])
+    upload = receive(body)
+    try:
+        assert (upload.kind, upload.size) == ("pdf", len(content))
+        assert upload.sha256 == hashlib.sha256(content).hexdigest()
+        with open(upload.path, "rb") as f:
+            assert f.read() == content
+        assert temp_files == [upload.path]
+    finally:
+        uploads.discard(upload)
+
+
+def test_oversize_upload_is_rejected_while_streaming(monkeypatch, temp_files):
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 2 * 1024 * 1024)
+    body = StreamedBody("big.pdf", pieces(b"%PDF-1.4\n", 20 * 1024 * 1024))
+    with pytest.raises(HTTPException) as error:
+        receive(body)
+    assert error.value.status_code == 413
+    assert body.received < 3 * 1024 * 1024
+    assert temp_files and not any(os.path.exists(path) for path in temp_files)
+
+
+def test_wrong_magic_bytes_are_rejected_before_anything_is_written(temp_files):
+    body = StreamedBody("fake.pdf", pieces(b"MZ\x90\x00", 20 * 1024 * 1024))
+    with pytest.raises(HTTPException) as error:
+        receive(body)
+    assert error.value.status_code == 400
+    assert body.received <= uploads.UPLOAD_CHUNK_BYTES + PIECE
+    assert temp_files == []
+
+
+def test_unsupported_type_is_rejected_before_its_content():
+    body = StreamedBody("virus.exe", pieces(b"MZ", 4 * 1024 * 1024))
+    with pytest.raises(HTTPException) as error:
+        receive(body)
+    assert error.value.status_code == 400
+    assert body.received <= PIECE
+
+
+def test_memory_stays_bounded_by_the_chunk_size():
+    body = StreamedBody("large.txt", pieces(b"lesson notes ", 40 * 1024 * 1024))
+    tracemalloc.start()
+    try:
+        upload = receive(body)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    uploads.discard(upload)
+    assert upload.size == 40 * 1024 * 1024
+    assert peak < 4 * uploads.UPLOAD_CHUNK_BYTES
+
+
+def test_upload_endpoint_rejects_a_mislabelled_file():
+    async def post():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/generate-mindmap", files={"file": ("notes.pdf", b"plain text", "application/pdf")})
+
+    response = asyncio.run(post())
+    assert response.status_code == 400
+    assert "PDF" in response.json()["detail"]
+
+
+def test_concurrent_uploads_each_hold_about_one_chunk():
+    uploads_at_once = 4
+
+    async def receive_all():
+        bodies = [StreamedBody(f"large-{i}.txt", pieces(b"lesson notes ", 16 * 1024 * 1024))
+                  for i in range(uploads_at_once)]
+        return await asyncio.gather(*(uploads.receive_upload(body.request()) for body in bodies))
+
+    tracemalloc.start()
+    try:
+        received = asyncio.run(receive_all())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    for upload in received:
+        uploads.discard(upload)
+    assert [upload.size for upload in received] == [16 * 1024 * 1024] * uploads_at_once
+    assert peak < uploads_at_once * 3 * uploads.UPLOAD_CHUNK_BYTES
+
+
+def test_extraction_slots_shed_with_503_past_the_limit(monkeypatch):
+    monkeypatch.setattr(uploads, "_extraction_semaphore", asyncio.Semaphore(uploads.EXTRACTION_CONCURRENCY))
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with uploads.extraction_slot(timeout=0.05):
+                await release.wait()
+
+        holders = [asyncio.create_task(hold()) for _ in range(uploads.EXTRACTION_CONCURRENCY)]
+        while not uploads._extraction_semaphore.locked():
+            await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as error:
+            async with uploads.extraction_slot(timeout=0.05):
+                pass
+        release.set()
+        await asyncio.gather(*holders)
+        async with uploads.extraction_slot(timeout=0.05):
+            pass
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert "Retry-After" in error.headers
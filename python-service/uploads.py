@@ -0,0 +1,265 @@
+"""
+Bounded-memory handling of document uploads.
+
+- ``UploadSizeLimitMiddleware`` rejects oversize request bodies with 413
+  before (or while) they are received, using Content-Length when present
+  and counting streamed bytes otherwise.
+- ``receive_upload`` parses the multipart body as it arrives and writes the
+  file part straight to a named temp file, hashing as it goes, so extractors
+  get a path instead of an in-memory copy and the file is written to disk
+  once. The file type is checked from its name before any content is read,
+  magic bytes on the first chunk before anything is written, and the size
+  on every chunk.
+- ``extraction_slot`` caps concurrent extractions and sheds load with 503.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB") or 50) * 1024 * 1024
+EXTRACTION_CONCURRENCY = int(os.getenv("EXTRACTION_CONCURRENCY") or 2)
+EXTRACTION_QUEUE_TIMEOUT = float(os.getenv("EXTRACTION_QUEUE_TIMEOUT") or 5)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Multipart framing (boundaries, part headers) on top of the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+UPLOAD_PATHS = ("/generate-mindmap", "/jobs/generate-mindmap")
+
+# The upload endpoints read the body themselves; this documents the form they expect.
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+_extraction_semaphore = asyncio.Semaphore(EXTRACTION_CONCURRENCY)
+
+
+@dataclass
+class SpooledUpload:
+    path: str
+    size: int
+    kind: str  # "pdf", "docx" or "txt"
+    sha256: str
+
+
+def file_kind(filename: str) -> str:
+    for kind in ("pdf", "docx", "txt"):
+        if filename.lower().endswith("." + kind):
+            return kind
+    raise HTTPException(status_code=400, detail="Unsupported file type. Please upload PDF, TXT, or DOCX files.")
+
+
+def check_magic(kind: str, head: bytes) -> None:
+    if kind == "pdf":
+        ok = b"%PDF-" in head[:1024]
+    elif kind == "docx":
+        ok = head.startswith(b"PK\x03\x04")
+    else:
+        ok = b"\x00" not in head
+    if not ok:
+        raise HTTPException(status_code=400, detail=f"File content does not look like a {kind.upper()} file.")
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413, detail=f"File too large. Maximum upload size is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+    )
+
+
+class _FileReceiver:
+    """Multipart parser callbacks that collect one file field and write it to a temp file."""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.kind: Optional[str] = None
+        self.path: Optional[str] = None
+        self.size = 0
+        self.complete = False
+        self.digest = hashlib.sha256()
+        self.pending: List[bytes] = []
+        self.pending_bytes = 0
+        self._target = None
+        self._reading = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._name = b""
+        self._value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self) -> None:
+        self._headers = {}
+
+    def _header_field(self, data: bytes, start: int, end: int) -> None:
+        self._name += data[start:end]
+
+    def _header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def _header_end(self) -> None:
+        self._headers[self._name.lower()] = self._value
+        self._name = self._value = b""
+
+    def _headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name") != self.field.encode() or b"filename" not in options or self.kind:
+            return
+        self.kind = file_kind(options[b"filename"].decode("utf-8", "replace"))
+        self._reading = True
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._reading:
+            return
+        self.size += end - start
+        if self.size > MAX_UPLOAD_BYTES:
+            raise _too_large()
+        self.pending.append(data[start:end])
+        self.pending_bytes += end - start
+
+    def _part_end(self) -> None:
+        if self._reading:
+            self._reading = False
+            self.complete = True
+
+    def flush(self) -> None:
+        """Write pending file data. Blocking; run it in a thread."""
+        if not self.pending:
+            return
+        data = b"".join(self.pending)
+        self.pending, self.pending_bytes = [], 0
+        if self._target is None:
+            check_magic(self.kind, data)
+            fd, self.path = tempfile.mkstemp(suffix="." + self.kind)
+            self._target = os.fdopen(fd, "wb")
+        self.digest.update(data)
+        self._target.write(data)
+
+    def close(self) -> None:
+        if self._target is not None:
+            self._target.close()
+
+    def discard(self) -> None:
+        self.close()
+        if self.path:
+            os.unlink(self.path)
+
+
+async def receive_upload(request: Request, field: str = "file") -> SpooledUpload:
+    """Stream the multipart ``field`` file of ``request`` to a temp file; the caller must ``discard`` it."""
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Please upload the file as multipart/form-data.")
+    receiver = _FileReceiver(field)
+    parser = MultipartParser(options[b"boundary"], receiver.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            # Held in memory until a full chunk (or the whole file) is there, so the magic check sees enough.
+            if receiver.pending_bytes >= UPLOAD_CHUNK_BYTES or (receiver.complete and receiver.pending):
+                await asyncio.to_thread(receiver.flush)
+        parser.finalize()
+        if not receiver.complete:
+            raise HTTPException(status_code=400, detail=f"Please upload a file in the '{field}' form field.")
+        await asyncio.to_thread(receiver.flush)
+        if receiver.path is None:
+            raise HTTPException(status_code=400, detail="The uploaded file is empty.")
+    except BaseException:
+        receiver.discard()
+        raise
+    receiver.close()
+    return SpooledUpload(path=receiver.path, size=receiver.size, kind=receiver.kind, sha256=receiver.digest.hexdigest())
+
+
+def discard(upload: SpooledUpload) -> None:
+    try:
+        os.unlink(upload.path)
+    except FileNotFoundError:
+        pass
+
+
+@asynccontextmanager
+async def extraction_slot(timeout: Optional[float] = EXTRACTION_QUEUE_TIMEOUT):
+    """Hold one of EXTRACTION_CONCURRENCY slots, or fail fast with 503 once the queue wait runs out.
+
+    Background jobs pass ``timeout=None`` to wait for a slot instead of being shed.
+    """
+    try:
+        await asyncio.wait_for(_extraction_semaphore.acquire(), timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many documents are being processed right now. Please retry shortly.",
+            headers={"Retry-After": str(max(1, int(EXTRACTION_QUEUE_TIMEOUT)))},
+        )
+    try:
+        yield
+    finally:
+        _extraction_semaphore.release()
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware that stops oversize upload bodies at the door."""
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in UPLOAD_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside request parsing, so FastAPI turns it into a normal 413 response.
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send):
+        body = b'{"detail":"File too large. Maximum upload size is %d MB."}' % (MAX_UPLOAD_BYTES // (1024 * 1024))
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})